@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from extraction.extractor import Extractor
+from benchmarks.parser_benchmark import DATA_DIR_ARXIV, sample_files
+
+def synthetic_paper(paragraphs, items, seed=42):
+    """
+    Return (paragraph records, tables, figures) of a synthetic paper with a Zipf-like vocabulary.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+    records = [(" ".join(rng.choices(vocabulary, weights, k=rng.randint(40, 200))), []) for _ in range(paragraphs)]
+    captions = [" ".join(rng.choices(vocabulary, weights, k=rng.randint(8, 25))) for _ in range(items)]
+    tables = [{"table_id": f"T{i}", "caption": caption} for i, caption in enumerate(captions[:items // 2])]
+    figures = [{"figure_id": f"F{i}", "caption": caption} for i, caption in enumerate(captions[items // 2:])]
+    return records, tables, figures
+
+def arxiv_papers(data_dir, limit):
+    """
+    Return (paragraph records, tables, figures) of sample arXiv papers, with the context
+    mapping inputs captured from the Extractor.
+    """
+    papers = []
+
+    class Capture(Extractor):
+        def _map_context(self, paper_id, full_text, tables, figures, records):
+            papers.append((list(records), tables, figures))
+            return {}
+
+    capture = Capture(parser_backend="lxml")
+    for filepath in sample_files(data_dir, limit):
+        capture.process_file(filepath)
+    return papers
+
+def time_mode(extractor, papers, repeat):
+    """
+    Time the context mapping of every paper, returning (best times in seconds, mean context paragraphs per item).
+    """
+    timings = []
+    sizes = []
+    for records, tables, figures in papers:
+        best = None
+        for _ in range(repeat):
+            items = [dict(item) for item in tables], [dict(item) for item in figures]
+            start = time.perf_counter()
+            result = extractor._map_context("paper", "", items[0], items[1], records)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+        sizes.extend(len(item["context_paragraphs"]) for item in result["tables"] + result["figures"])
+    return timings, statistics.mean(sizes) if sizes else 0
+
+def main():
+    """
+    Compare the keyword-overlap and TF-IDF context mapping of the Extractor
+    (tables and figures to paragraphs), on arXiv papers or synthetic large papers.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the context paragraph modes of the Extractor.")
+    parser.add_argument("--data-dir", default=DATA_DIR_ARXIV, help="Directory with the arXiv HTML files")
+    parser.add_argument("--limit", type=int, default=20, help="Number of sample files")
+    parser.add_argument("--synthetic", action="store_true", help="Use synthetic papers instead of the corpus")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Paragraphs per synthetic paper")
+    parser.add_argument("--items", type=int, default=60, help="Tables + figures per synthetic paper")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per paper (best time is kept)")
+    parser.add_argument("--top-k", type=int, default=5, help="Context paragraphs per item in tfidf mode")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Minimum similarity in tfidf mode")
+    args = parser.parse_args()
+
+    if args.synthetic or not os.path.exists(args.data_dir) or not sample_files(args.data_dir, 1):
+        papers = [synthetic_paper(args.paragraphs, args.items, seed) for seed in range(3)]
+        print(f"Synthetic papers: {len(papers)} x {args.paragraphs} paragraphs, {args.items} tables/figures.\n")
+    else:
+        papers = arxiv_papers(args.data_dir, args.limit)
+        print(f"arXiv papers: {len(papers)} from {args.data_dir}.\n")
+
+    results = {}
+    for mode in Extractor.CONTEXT_MODES:
+        extractor = Extractor(context_mode=mode, context_top_k=args.top_k, context_threshold=args.threshold)
+        results[mode] = time_mode(extractor, papers, args.repeat)
+        timings, size = results[mode]
+        print(f"[{mode:<8}] total: {sum(timings) * 1000:9.1f} ms | median/paper: {statistics.median(timings) * 1000:8.1f} ms | "
+              f"context paragraphs/item: {size:6.1f}")
+    keywords, tfidf = results["keywords"][0], results["tfidf"][0]
+    print(f"\ntfidf vs keywords: {sum(keywords) / sum(tfidf):.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+from elasticsearch import helpers
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from search.search_engine import SearchEngine, SEARCH_PROFILES
+from indexing.embeddings import Embedder, embedding_text, DEFAULT_MODEL
+from benchmarks.search_benchmark import DEFAULT_QUERIES, percentile
+
+def synthetic_texts(count, seed=42):
+    """
+    Return `count` caption-like texts of 20-120 words built from the query vocabulary.
+    """
+    rng = random.Random(seed)
+    words = " ".join(DEFAULT_QUERIES).replace(" AND ", " ").split()
+    return [f"Figure {i}: " + " ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) for i in range(count)]
+
+def index_texts(es, count):
+    """
+    Return up to `count` embedding texts (see embedding_text) of the indexed documents.
+    """
+    texts = []
+    for index_name in SEARCH_PROFILES:
+        hits = helpers.scan(es, index=index_name, query={"query": {"match_all": {}},
+                            "_source": ["title", "abstract", "caption", "context_paragraphs"]})
+        for hit in hits:
+            text = embedding_text(index_name, hit["_source"])
+            if text:
+                texts.append(text)
+            if len(texts) >= count:
+                return texts
+    return texts
+
+def time_queries(engine, index, queries, repeat, page_size, hybrid):
+    """
+    Run every query `repeat` times, returning (latencies in ms, top hit IDs per query).
+    """
+    latencies = []
+    top_ids = {}
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            page = engine.search_page(index=index, query=query, page_size=page_size, hybrid=hybrid)
+            latencies.append((time.perf_counter() - start) * 1000)
+        top_ids[query] = [hit['_id'] for hit in page["hits"]]
+    return latencies, top_ids
+
+def main():
+    """
+    Measure the embedding throughput of the indexing stage (per batch size, without
+    and with the content-hash cache) and compare the query latency of keyword (BM25)
+    and hybrid (BM25 + kNN) search on the indexed corpus.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput and hybrid search latency.")
+    parser.add_argument("--model", default=None, help="Embedding model (default: SCISEARCH_EMBEDDING_MODEL)")
+    parser.add_argument("--texts", type=int, default=1000, help="Texts embedded per run")
+    parser.add_argument("--from-index", action="store_true", help="Embed texts of the indexed documents instead of synthetic ones")
+    parser.add_argument("--batch-size", type=int, action="append", help="Batch size (repeatable, default: 8, 32, 128)")
+    parser.add_argument("--skip-search", action="store_true", help="Only measure the embedding throughput")
+    parser.add_argument("--index", action="append", help="Index to search (repeatable, default: tables, figures)")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in workload)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    parser.add_argument("--page-size", type=int, default=10, help="Hits per search")
+    args = parser.parse_args()
+
+    # Load the model once: every run below shares it
+    model_embedder = Embedder(args.model or os.environ.get("SCISEARCH_EMBEDDING_MODEL", DEFAULT_MODEL), cache_path=None)
+    try:
+        dims = model_embedder.dims
+    except ImportError as e:
+        print(e)
+        return
+    model = model_embedder.model
+    engine = SearchEngine(cache=False)
+
+    if args.from_index:
+        texts = index_texts(engine.es, args.texts)
+    else:
+        texts = synthetic_texts(args.texts)
+    if not texts:
+        print("No texts to embed.")
+        return
+    chars = statistics.mean(len(text) for text in texts)
+    print(f"Embedding {len(texts)} texts (mean {chars:.0f} chars) with {model_embedder.model_name} ({dims} dims).\n")
+
+    for batch_size in args.batch_size or [8, 32, 128]:
+        with tempfile.TemporaryDirectory() as tmp:
+            embedder = Embedder(model_embedder.model_name, cache_path=os.path.join(tmp, "cache.sqlite"),
+                                batch_size=batch_size, model=model)
+            start = time.perf_counter()
+            embedder.embed(texts)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            embedder.embed(texts)
+            cached = time.perf_counter() - start
+            embedder.conn.close()
+        print(f"[batch {batch_size:<4}] model: {len(texts) / cold:9.1f} texts/s | cached: {len(texts) / cached:9.1f} texts/s "
+              f"({cold / cached:.0f}x)")
+
+    if args.skip_search:
+        return
+    if not engine.es.ping():
+        print("\nThe search backend is not reachable: skipping the query benchmark.")
+        return
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    # No query embedding cache: hybrid latencies include encoding the query
+    engines = {
+        "bm25": (engine, False),
+        "hybrid": (SearchEngine(cache=False, embedder=Embedder(model_embedder.model_name, cache_path=None, model=model,
+                                                                 query_cache_size=0)), True)
+    }
+    print(f"\nSearching {len(queries)} queries x {args.repeat} runs per index.\n")
+    for index in args.index or ["tables", "figures"]:
+        results = {}
+        for name, (search_engine, hybrid) in engines.items():
+            time_queries(search_engine, index, queries, 1, args.page_size, hybrid)
+            results[name] = time_queries(search_engine, index, queries, args.repeat, args.page_size, hybrid)
+            latencies = results[name][0]
+            print(f"[{index:<8}|{name:<6}] p50: {percentile(latencies, 50):8.1f} ms | p95: {percentile(latencies, 95):8.1f} ms | "
+                  f"mean: {statistics.mean(latencies):8.1f} ms")
+
+        bm25, hybrid = results["bm25"][1], results["hybrid"][1]
+        # Share of the keyword results kept in the hybrid top-k, and hits only kNN found
+        overlaps = [len(set(bm25[q]) & set(hybrid[q])) / len(bm25[q]) for q in queries if bm25[q]]
+        added = sum(len(set(hybrid[q]) - set(bm25[q])) for q in queries)
+        print(f"  -> hybrid/bm25 p50: {percentile(results['hybrid'][0], 50) / percentile(results['bm25'][0], 50):.2f}x, "
+              f"top-{args.page_size} overlap: {statistics.mean(overlaps) * 100 if overlaps else 0:.0f}%, "
+              f"semantic-only hits: {added}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlencode
+
+import aiohttp
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.search_benchmark import DEFAULT_QUERIES, percentile
+
+def search_paths(queries, indices):
+    """
+    Return the /api/search request paths of the workload (every query on every index).
+    """
+    return [
+        "/api/search?" + urlencode({"query": query, "index_type": index})
+        for query in queries for index in indices
+    ]
+
+async def run_load(base_url, paths, total, concurrency, timeout):
+    """
+    Send `total` GET requests (paths drawn at random) with `concurrency` requests in flight.
+
+    Returns:
+        tuple: (latencies in ms of the successful requests, error count, wall time in seconds)
+    """
+    latencies = []
+    errors = 0
+    remaining = total
+    rng = random.Random(42)
+
+    async def worker(session):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            try:
+                async with session.get(base_url + path) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def main():
+    """
+    Compare the throughput and latency of the Flask (app.py) and ASGI (asgi_app.py)
+    servers under concurrent load. Both servers must already be running, e.g.:
+
+        python src/search/app.py                                       (port 5000)
+        uvicorn search.asgi_app:app --app-dir src --port 8000          (port 8000)
+    """
+    parser = argparse.ArgumentParser(description="Load test the Flask and ASGI search servers.")
+    parser.add_argument("--flask-url", default="http://localhost:5000", help="Base URL of the Flask server ('' to skip)")
+    parser.add_argument("--asgi-url", default="http://localhost:8000", help="Base URL of the ASGI server ('' to skip)")
+    parser.add_argument("--endpoint", choices=["search", "stats", "paper"], default="search", help="Endpoint to load")
+    parser.add_argument("--paper-id", action="append", help="Paper IDs for --endpoint paper (repeatable)")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in workload)")
+    parser.add_argument("--index", action="append", help="Index to search (repeatable, default: articles)")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per server and concurrency level")
+    parser.add_argument("--concurrency", type=int, action="append", help="Requests in flight (repeatable, default: 1, 10, 100)")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests per server before measuring")
+    args = parser.parse_args()
+
+    if args.endpoint == "search":
+        queries = DEFAULT_QUERIES
+        if args.queries:
+            with open(args.queries, 'r', encoding='utf-8') as f:
+                queries = [line.strip() for line in f if line.strip()]
+        paths = search_paths(queries, args.index or ["articles"])
+    elif args.endpoint == "paper":
+        if not args.paper_id:
+            parser.error("--endpoint paper requires at least one --paper-id")
+        paths = [f"/paper/{paper_id}" for paper_id in args.paper_id]
+    else:
+        paths = ["/api/stats"]
+
+    servers = {name: url.rstrip('/') for name, url in (("flask", args.flask_url), ("asgi", args.asgi_url)) if url}
+    levels = args.concurrency or [1, 10, 100]
+    print(f"Load testing /{args.endpoint} with {args.requests} requests per run.\n")
+
+    results = {}
+    for name, base_url in servers.items():
+        asyncio.run(run_load(base_url, paths, args.warmup, min(10, max(levels)), args.timeout))
+        for concurrency in levels:
+            latencies, errors, elapsed = asyncio.run(run_load(base_url, paths, args.requests, concurrency, args.timeout))
+            throughput = len(latencies) / elapsed if elapsed else 0
+            results[(name, concurrency)] = throughput
+            if not latencies:
+                print(f"[{name:<5}| c={concurrency:<4}] all {errors} requests failed")
+                continue
+            print(f"[{name:<5}| c={concurrency:<4}] {throughput:8.1f} req/s | p50: {percentile(latencies, 50):8.1f} ms | "
+                  f"p95: {percentile(latencies, 95):8.1f} ms | mean: {statistics.mean(latencies):8.1f} ms | errors: {errors}")
+
+    if len(servers) == 2:
+        print()
+        for concurrency in levels:
+            flask, asgi = results.get(("flask", concurrency)), results.get(("asgi", concurrency))
+            if flask and asgi:
+                print(f"  -> c={concurrency}: ASGI/Flask throughput {asgi / flask:.2f}x")
+
+if __name__ == "__main__":
+    main()
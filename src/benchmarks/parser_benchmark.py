@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from extraction.extractor import Extractor
+
+DATA_DIR_ARXIV = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'html_arxiv')
+
+def sample_files(data_dir, limit):
+    """
+    Return a fixed (sorted) sample of HTML files, so that runs are comparable.
+    """
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith('.html'))
+    return [os.path.join(data_dir, f) for f in files[:limit]]
+
+def time_backend(backend, files, repeat):
+    """
+    Time Extractor.process_file on every file with the given parser backend.
+
+    Returns:
+        tuple: (per-file best times in seconds, outputs serialized as JSON)
+    """
+    extractor = Extractor(parser_backend=backend)
+    timings = []
+    outputs = []
+    for filepath in files:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = extractor.process_file(filepath)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+        outputs.append(json.dumps(result, sort_keys=True, ensure_ascii=False))
+    return timings, outputs
+
+def main():
+    """
+    Compare the HTML parser backends of the Extractor on a fixed set of sample files.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Extractor HTML parser backends.")
+    parser.add_argument("--data-dir", default=DATA_DIR_ARXIV, help="Directory with the arXiv HTML files")
+    parser.add_argument("--limit", type=int, default=20, help="Number of sample files")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file (best time is kept)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_dir):
+        print(f"Directory {args.data_dir} does not exist.")
+        return
+    files = sample_files(args.data_dir, args.limit)
+    total_mb = sum(os.path.getsize(f) for f in files) / (1024 * 1024)
+    print(f"Benchmarking {len(files)} files ({total_mb:.1f} MB), best of {args.repeat} runs each.\n")
+
+    results = {}
+    for backend in Extractor.HTML_PARSER_BACKENDS:
+        results[backend] = time_backend(backend, files, args.repeat)
+        timings = results[backend][0]
+        print(f"[{backend:<12}] total: {sum(timings):7.2f}s | median/file: {statistics.median(timings) * 1000:8.1f} ms | "
+              f"throughput: {total_mb / sum(timings):6.2f} MB/s")
+
+    reference, baseline = Extractor.HTML_PARSER_BACKENDS[0], results[Extractor.HTML_PARSER_BACKENDS[0]]
+    for backend, (timings, outputs) in results.items():
+        if backend == reference:
+            continue
+        identical = sum(1 for a, b in zip(baseline[1], outputs) if a == b)
+        print(f"\n{backend} vs {reference}: {sum(baseline[0]) / sum(timings):.2f}x speedup, "
+              f"{identical}/{len(files)} files with identical output.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from search.search_engine import SearchEngine, SEARCH_PROFILES
+
+# Default workload: short keyword and boolean queries typical of the UI
+DEFAULT_QUERIES = [
+    "transformer", "speech recognition", "entity resolution", "attention AND encoder",
+    "cancer", "coffee consumption", "hazard ratio", "neural network", "accuracy",
+    "clinical trial", "gene expression", "reinforcement learning", "results", "dataset"
+]
+
+def percentile(values, p):
+    """
+    Return the p-th percentile (nearest-rank) of a list of values.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+def time_engine(engine, index, queries, repeat, page_size):
+    """
+    Run every query `repeat` times, returning (latencies in ms, response bytes, top hit IDs per query).
+    """
+    latencies = []
+    payload = 0
+    top_ids = {}
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = engine.search(index=index, query=query, size=page_size)
+            latencies.append((time.perf_counter() - start) * 1000)
+        payload += len(json.dumps(hits))
+        top_ids[query] = [hit['_id'] for hit in hits]
+    return latencies, payload, top_ids
+
+def main():
+    """
+    Compare the latency of the per-index search profiles with the legacy
+    query_string over "*" and highlight on "*".
+    """
+    parser = argparse.ArgumentParser(description="Benchmark search profiles against the legacy '*' search.")
+    parser.add_argument("--index", action="append", help="Index to benchmark (repeatable, default: all profiled indices)")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in workload)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    parser.add_argument("--page-size", type=int, default=10, help="Hits per search")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per query before measuring")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    # No result cache: every run must hit Elasticsearch
+    engines = {
+        "legacy": SearchEngine(cache=False, profiles={}),
+        "profiled": SearchEngine(cache=False)
+    }
+    if not engines["legacy"].es.ping():
+        print("Elasticsearch is not reachable.")
+        return
+
+    print(f"Benchmarking {len(queries)} queries x {args.repeat} runs per index.\n")
+    for index in args.index or list(SEARCH_PROFILES):
+        results = {}
+        for name, engine in engines.items():
+            for query in queries:
+                for _ in range(args.warmup):
+                    engine.search(index=index, query=query, size=args.page_size)
+            results[name] = time_engine(engine, index, queries, args.repeat, args.page_size)
+            latencies, payload = results[name][0], results[name][1]
+            print(f"[{index:<8}|{name:<8}] p50: {percentile(latencies, 50):8.1f} ms | p95: {percentile(latencies, 95):8.1f} ms | "
+                  f"mean: {statistics.mean(latencies):8.1f} ms | payload: {payload / 1024:9.1f} KB")
+
+        legacy, profiled = results["legacy"], results["profiled"]
+        # Overlap of the top results: boosting is expected to reorder, not to lose matches
+        overlaps = [
+            len(set(legacy[2][q]) & set(profiled[2][q])) / max(1, len(legacy[2][q]))
+            for q in queries if legacy[2][q]
+        ]
+        print(f"  -> p50 speedup: {percentile(legacy[0], 50) / percentile(profiled[0], 50):.2f}x, "
+              f"p95 speedup: {percentile(legacy[0], 95) / percentile(profiled[0], 95):.2f}x, "
+              f"top-{args.page_size} overlap: {statistics.mean(overlaps) * 100 if overlaps else 0:.0f}%\n")
+
+if __name__ == "__main__":
+    main()
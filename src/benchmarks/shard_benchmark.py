@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from extraction.extractor import Extractor
+from indexing.indexer import DATA_DIRS, extract_paper
+from indexing.shard_store import ShardStore
+
+def sample_tasks(limit):
+    """
+    Return up to `limit` (filepath, data_dir) pairs per data directory, in sorted order.
+    """
+    tasks = []
+    for data_dir in DATA_DIRS:
+        if not os.path.exists(data_dir):
+            continue
+        files = sorted(f for f in os.listdir(data_dir) if f.endswith('.html') or f.endswith('.xml'))
+        tasks.extend((os.path.join(data_dir, f), data_dir) for f in files[:limit])
+    return tasks
+
+def directory_size(root):
+    return sum(os.path.getsize(os.path.join(path, f)) for path, _, files in os.walk(root) for f in files)
+
+def main():
+    """
+    Compare the cost of producing the papers to index by extracting the HTML/XML files
+    and by reading them back from the shard store (all papers, one source, a date range).
+    """
+    parser = argparse.ArgumentParser(description="Benchmark re-indexing from the shard store against extraction.")
+    parser.add_argument("--limit", type=int, default=200, help="Files per data directory")
+    parser.add_argument("--parser", default="lxml", choices=Extractor.HTML_PARSER_BACKENDS, help="HTML parser backend")
+    parser.add_argument("--copies", type=int, default=10, help="Copies of every paper stored (a bigger store from few files)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per read (best kept)")
+    args = parser.parse_args()
+
+    tasks = sample_tasks(args.limit)
+    if not tasks:
+        print("No HTML/XML files found in the data directories.")
+        return
+    extractor = Extractor(parser_backend=args.parser)
+    start = time.perf_counter()
+    papers = [data for _, data, error in (extract_paper(extractor, *task) for task in tasks) if error is None]
+    extraction = (time.perf_counter() - start) / len(tasks)
+    source_bytes = sum(os.path.getsize(filepath) for filepath, _ in tasks)
+    print(f"Extraction: {len(tasks)} files, {1 / extraction:8.1f} papers/s ({source_bytes / 1e6:.1f} MB of HTML/XML)\n")
+
+    dates = sorted(data.get("date") or "" for data in papers)
+    since = dates[len(dates) // 2]
+    sources = sorted({data["source"] for data in papers})
+    formats = ["parquet", "jsonl"]
+    try:
+        import pyarrow
+    except ImportError:
+        formats = ["jsonl"]
+    for shard_format in formats:
+        with tempfile.TemporaryDirectory() as root:
+            start = time.perf_counter()
+            with ShardStore(root, shard_format=shard_format) as store:
+                for copy in range(args.copies):
+                    for data in papers:
+                        store.add(dict(data, paper_id=f"{data['paper_id']}~{copy}" if copy else data['paper_id']))
+            write = (time.perf_counter() - start) / (len(papers) * args.copies)
+            size = directory_size(root)
+
+            reads = {"all": {}, f"source={sources[0]}": {"sources": sources[:1]}, f"since {since[:10] or '-'}": {"since": since}}
+            print(f"[{shard_format:<7}] write: {1 / write:9.1f} papers/s | size: {size / 1e6:7.1f} MB "
+                  f"({size / (source_bytes * args.copies) * 100:.0f}% of the source files)")
+            for name, filters in reads.items():
+                best, count = None, 0
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    count = sum(1 for _ in store.read(**filters))
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                rate = count / best if best else 0
+                print(f"  read {name:<18}: {count:6d} papers, {rate:9.1f} papers/s "
+                      f"({rate * extraction:.0f}x extraction)")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 import os
+import sys
 from bs4 import BeautifulSoup
-import re
+from lxml import etree
 import json
+from collections import Counter
+from itertools import chain
+import numpy as np
+
+# Ensure internal modules can be imported when run as a script
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from extraction.tokenizer import Tokenizer
 
 class Extractor:
     """
@@ -14,13 +23,43 @@ class Extractor:
     for context extraction.
     """
     
-    def __init__(self):
-        # Basic stop words list (Italian + English common scientific terms) used for keyword extraction
-        self.stop_words = set([
-            "the", "a", "an", "in", "on", "at", "for", "to", "of", "and", "or", "is", "are", "was", "were", 
-            "be", "been", "this", "that", "these", "those", "it", "we", "can", "as", "by", "from", "with",
-            "il", "lo", "la", "i", "gli", "le", "un", "uno", "una", "di", "a", "da", "in", "con", "su", "per", "tra", "fra"
-        ])
+    # BeautifulSoup tree builders usable for HTML (arXiv) files.
+    # 'lxml' is a C parser and is several times faster on large LaTeXML pages,
+    # 'html.parser' is the pure-Python reference backend.
+    HTML_PARSER_BACKENDS = ("html.parser", "lxml")
+    
+    # How context paragraphs are chosen for tables and figures:
+    # 'keywords' keeps the paragraphs sharing at least 2 keywords with the caption (document order),
+    # 'tfidf' ranks paragraphs by TF-IDF cosine similarity to the caption (best first, see _tfidf_context).
+    CONTEXT_MODES = ("keywords", "tfidf")
+    
+    def __init__(self, parser_backend="html.parser", stream_xml=False, context_mode="keywords",
+                 context_top_k=5, context_threshold=0.1):
+        """
+        Initialize the Extractor.
+        
+        Args:
+            parser_backend (str): Tree builder used for HTML files, one of HTML_PARSER_BACKENDS.
+                                  XML files are always parsed with the lxml XML builder.
+            stream_xml (bool): Extract PubMed XML files incrementally (see _process_pubmed_stream)
+                               instead of loading the whole document tree.
+            context_mode (str): Context paragraph selection, one of CONTEXT_MODES.
+            context_top_k (int): With 'tfidf', maximum number of context paragraphs per item.
+            context_threshold (float): With 'tfidf', minimum cosine similarity of a context paragraph.
+        """
+        if parser_backend not in self.HTML_PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{parser_backend}'. Choose one of: {', '.join(self.HTML_PARSER_BACKENDS)}")
+        if context_mode not in self.CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode '{context_mode}'. Choose one of: {', '.join(self.CONTEXT_MODES)}")
+        self.parser_backend = parser_backend
+        self.stream_xml = stream_xml
+        self.context_mode = context_mode
+        self.context_top_k = context_top_k
+        self.context_threshold = context_threshold
+        
+        # Keyword tokenizer (stop words: Italian + English common scientific terms)
+        self.tokenizer = Tokenizer()
+        self.stop_words = self.tokenizer.stop_words
     
     def extract_keywords(self, text):
         """
@@ -31,15 +70,9 @@ class Extractor:
             text (str): Input text.
             
         Returns:
-            set: A set of keywords.
+            set: A set of keywords (memoized for the current paper: do not modify it).
         """
-        if not text:
-            return set()
-        # Clean and tokenize: remove non-alphanumeric char
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        tokens = text.split()
-        keywords = {t for t in tokens if t not in self.stop_words and len(t) > 2}
-        return keywords
+        return self.tokenizer.keywords(text)
 
     def process_file(self, filepath):
         """
@@ -51,13 +84,17 @@ class Extractor:
         Returns:
             dict: Structured dictionary containing paper_id, full_text, tables, and figures.
         """
+        if self.stream_xml and filepath.endswith('.xml'):
+            paper_id = os.path.basename(filepath).replace('.xml', '')
+            return self._process_pubmed_stream(filepath, paper_id)
+            
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
             
         if filepath.endswith('.xml'):
             soup = BeautifulSoup(content, 'xml')
         else:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = BeautifulSoup(content, self.parser_backend)
 
         paper_id = os.path.basename(filepath).replace('.html', '').replace('.xml', '')
         
@@ -154,68 +191,131 @@ class Extractor:
         figures = []
         
         # 2. Extract Tables (XML: <table-wrap>)
-        table_wraps = soup.find_all('table-wrap')
-        for i, wrap in enumerate(table_wraps):
-            table_id = wrap.get('id', f"tab_{i}")
-            
-            # Caption
-            caption = wrap.find('caption')
-            caption_text = caption.get_text(strip=True) if caption else ""
-            
-            # Body
-            tbl = wrap.find('table')
-            body_text = tbl.get_text(separator=' ', strip=True) if tbl else ""
-            
-            tables.append({
-                "table_id": table_id,
-                "caption": caption_text,
-                "body": body_text,
-                "html": str(tbl) if tbl else "",
-                "mentions": [],
-                "context_paragraphs": []
-            })
+        for i, wrap in enumerate(soup.find_all('table-wrap')):
+            tables.append(self._pubmed_table(wrap, i))
             
         # 3. Extract Figures (XML: <fig>)
-        fig_wraps = soup.find_all('fig')
-        for i, wrap in enumerate(fig_wraps):
-            fig_id = wrap.get('id', f"fig_{i}")
-            
-            # Caption
-            caption = wrap.find('caption')
-            caption_text = caption.get_text(strip=True) if caption else ""
-            
-            # Image URL in XML: <graphic xlink:href="..."/>
-            # The href is usually a local filename reference, e.g. "nihms-15000-f0001.jpg"
-            # We construct a full URL if possible, or just keep the reference.
-            # PMC full text URL: https://www.ncbi.nlm.nih.gov/pmc/articles/{paper_id}/bin/{href}.jpg
-            # Note: The extension might vary (.jpg, .gif), but usuall 'jpg' is safe guess for web or we leave as is.
-            graphic = wrap.find('graphic')
-            img_href = graphic.get('xlink:href') if graphic else ""
-            
-            if img_href:
-                img_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{paper_id}/bin/{img_href}.jpg"
-            else:
-                img_url = ""
-            
-            figures.append({
-                "figure_id": fig_id,
-                "url": img_url,
-                "caption": caption_text,
-                "mentions": [],
-                "context_paragraphs": []
-            })
+        for i, wrap in enumerate(soup.find_all('fig')):
+            figures.append(self._pubmed_figure(wrap, i, paper_id))
             
         return self._post_process_context(paper_id, full_text, tables, figures, paragraphs)
 
+    def _pubmed_table(self, wrap, i):
+        """
+        Build the table dictionary of a PubMed <table-wrap> element.
+        
+        Args:
+            wrap (Tag): The <table-wrap> element.
+            i (int): Position of the table in the document (used for the fallback ID).
+        """
+        table_id = wrap.get('id', f"tab_{i}")
+        
+        # Caption
+        caption = wrap.find('caption')
+        caption_text = caption.get_text(strip=True) if caption else ""
+        
+        # Body
+        tbl = wrap.find('table')
+        body_text = tbl.get_text(separator=' ', strip=True) if tbl else ""
+        
+        return {
+            "table_id": table_id,
+            "caption": caption_text,
+            "body": body_text,
+            "html": str(tbl) if tbl else "",
+            "mentions": [],
+            "context_paragraphs": []
+        }
+
+    def _pubmed_figure(self, wrap, i, paper_id):
+        """
+        Build the figure dictionary of a PubMed <fig> element.
+        
+        Args:
+            wrap (Tag): The <fig> element.
+            i (int): Position of the figure in the document (used for the fallback ID).
+            paper_id (str): PMC ID of the paper (used to build the image URL).
+        """
+        fig_id = wrap.get('id', f"fig_{i}")
+        
+        # Caption
+        caption = wrap.find('caption')
+        caption_text = caption.get_text(strip=True) if caption else ""
+        
+        # Image URL in XML: <graphic xlink:href="..."/>
+        # The href is usually a local filename reference, e.g. "nihms-15000-f0001.jpg"
+        # We construct a full URL if possible, or just keep the reference.
+        # PMC full text URL: https://www.ncbi.nlm.nih.gov/pmc/articles/{paper_id}/bin/{href}.jpg
+        # Note: The extension might vary (.jpg, .gif), but usuall 'jpg' is safe guess for web or we leave as is.
+        graphic = wrap.find('graphic')
+        img_href = graphic.get('xlink:href') if graphic else ""
+        
+        if img_href:
+            img_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{paper_id}/bin/{img_href}.jpg"
+        else:
+            img_url = ""
+        
+        return {
+            "figure_id": fig_id,
+            "url": img_url,
+            "caption": caption_text,
+            "mentions": [],
+            "context_paragraphs": []
+        }
+
+    def _process_pubmed_stream(self, filepath, paper_id, chunk_size=1 << 16):
+        """
+        Streaming variant of _process_pubmed for large JATS XML files.
+        
+        The file is fed incrementally to an lxml parser target that never builds the
+        document tree: text runs are accumulated for the full text and paragraphs,
+        and only <table-wrap> and <fig> subtrees are materialized (one at a time) to
+        reuse _pubmed_table/_pubmed_figure. Peak memory therefore depends on the
+        largest table or figure, not on the whole document. The output is the same
+        as the one of _process_pubmed on the 'xml' soup.
+        
+        Args:
+            filepath (str): Path to the XML file.
+            paper_id (str): PMC ID of the paper.
+            chunk_size (int): Bytes read from the file at each step.
+        """
+        target = _PubmedStreamTarget(self, paper_id)
+        parser = etree.XMLParser(target=target, recover=True, strip_cdata=False)
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                parser.feed(chunk)
+        parser.close()
+        
+        full_text = ' '.join(target.full_text)
+        return self._map_context(paper_id, full_text, target.tables, target.figures, target.paragraphs)
+
     def _post_process_context(self, paper_id, full_text, tables, figures, paragraphs):
         # Common logic for Mentions and Context
+        records = (self._paragraph_record(p) for p in paragraphs)
+        return self._map_context(paper_id, full_text, tables, figures, records)
+
+    def _paragraph_record(self, p):
+        """
+        Return the (text, link hrefs) record of a paragraph tag.
+        """
+        return p.get_text(strip=True), [link['href'] for link in p.find_all('a', href=True)]
+
+    def _map_context(self, paper_id, full_text, tables, figures, records):
+        # Read, tokenize and scan every paragraph only once per paper: tables and figures
+        # are then resolved through lookups instead of rescanning all the paragraphs.
+        self.tokenizer.reset()
+        context_index = self._build_context_index(records)
+        
+        # Scores of every caption against every paragraph, computed at once
+        items = [(item, True) for item in tables] + [(item, False) for item in figures]
+        if self.context_mode == "tfidf":
+            ranked = self._tfidf_context(context_index, [item.get("caption", "") for item, _ in items])
+        else:
+            ranked = [None] * len(items)
         
         # Helper to process list (modify in place)
-        for item in tables:
-            self._fill_context(item, paragraphs, is_table=True)
-            
-        for item in figures:
-            self._fill_context(item, paragraphs, is_table=False)
+        for (item, is_table), context in zip(items, ranked):
+            self._fill_context(item, context_index, is_table=is_table, context=context)
 
         return {
             "paper_id": paper_id,
@@ -224,45 +324,251 @@ class Extractor:
             "figures": figures
         }
 
-    def _fill_context(self, item, paragraphs, is_table=True):
+    def _build_context_index(self, records):
+        """
+        Build the per-paper lookup structures used to map tables and figures to paragraphs.
+        
+        Args:
+            records (iterable): (text, link hrefs) of every paragraph, in document order.
+            
+        Returns:
+            dict: 'texts' (paragraph texts), 'anchors' (link target id -> paragraph positions)
+                  and 'postings' (keyword -> paragraph positions).
+        """
+        records = list(records)
+        texts = [p_text for p_text, _ in records]
+        anchors = {}
+        postings = {}
+        
+        for pos, ((p_text, hrefs), keywords) in enumerate(zip(records, self.tokenizer.keywords_batch(texts))):
+            # A. Link targets: a link mentions item X when its href ends with "#X",
+            # so each href is indexed under every suffix following a '#'.
+            for href in hrefs:
+                start = href.find('#')
+                while start != -1:
+                    positions = anchors.setdefault(href[start + 1:], [])
+                    if not positions or positions[-1] != pos:
+                        positions.append(pos)
+                    start = href.find('#', start + 1)
+            
+            # B. Keyword postings
+            for keyword in keywords:
+                postings.setdefault(keyword, []).append(pos)
+                
+        return {
+            "texts": texts,
+            "anchors": anchors,
+            "postings": postings
+        }
+
+    def _tfidf_context(self, context_index, captions):
+        """
+        Rank the paragraphs of a paper for every caption by TF-IDF cosine similarity.
+        
+        The keyword postings of the paper are the columns of a sparse paragraph x term
+        matrix (binary term frequency weighted by smoothed IDF); the captions form a sparse
+        caption x term matrix. Their product is computed in one pass over the postings of
+        the caption terms, accumulated with np.bincount into a dense caption x paragraph
+        matrix (captions and paragraphs of a single paper).
+        
+        Args:
+            context_index (dict): Output of _build_context_index.
+            captions (list): Caption texts of the tables and figures.
+            
+        Returns:
+            list: For every caption, the positions of its top context_top_k paragraphs with a
+                  similarity of at least context_threshold, best first.
+        """
+        postings = context_index["postings"]
+        n_paragraphs = len(context_index["texts"])
+        if not captions or not n_paragraphs:
+            return [[] for _ in captions]
+        
+        # Paragraph matrix, stored by column: the postings of term j are rows[indptr[j]:indptr[j + 1]]
+        columns = {term: j for j, term in enumerate(postings)}
+        lengths = np.fromiter(map(len, postings.values()), np.int64, len(postings))
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        rows = np.fromiter(chain.from_iterable(postings.values()), np.int64, int(indptr[-1]))
+        idf = np.log((1 + n_paragraphs) / (1 + lengths)) + 1
+        paragraph_norms = np.sqrt(np.bincount(rows, weights=np.repeat(idf ** 2, lengths), minlength=n_paragraphs))
+        
+        # Caption matrix (only terms occurring in some paragraph can contribute)
+        items, cols = [], []
+        for n, caption in enumerate(captions):
+            for keyword in self.extract_keywords(caption):
+                j = columns.get(keyword)
+                if j is not None:
+                    items.append(n)
+                    cols.append(j)
+        if not cols:
+            return [[] for _ in captions]
+        items = np.array(items, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        caption_norms = np.sqrt(np.bincount(items, weights=idf[cols] ** 2, minlength=len(captions)))
+        
+        # Product: every (caption, term) entry meets the postings of its term
+        counts = lengths[cols]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit_rows = rows[np.repeat(indptr[cols], counts) + offsets]
+        hit_items = np.repeat(items, counts)
+        weights = np.repeat(idf[cols] ** 2, counts)
+        scores = np.bincount(hit_items * n_paragraphs + hit_rows, weights=weights,
+                             minlength=len(captions) * n_paragraphs).reshape(len(captions), n_paragraphs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.nan_to_num(scores / np.outer(caption_norms, paragraph_norms))
+        
+        ranked = []
+        k = min(self.context_top_k, n_paragraphs)
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k < n_paragraphs else np.arange(n_paragraphs)
+            top = top[row[top] >= max(self.context_threshold, np.finfo(float).tiny)]
+            # Best first; ties keep the document order
+            ranked.append([int(pos) for pos in top[np.lexsort((top, -row[top]))]])
+        return ranked
+
+    def _fill_context(self, item, context_index, is_table=True, context=None):
+        """
+        Set the mentions and context paragraphs of a table or figure.
+        
+        Args:
+            item (dict): Table or figure dictionary (modified in place).
+            context_index (dict): Output of _build_context_index.
+            is_table (bool): Whether the item is a table (else a figure).
+            context (list): Positions of the context paragraphs chosen by _tfidf_context
+                            (default: the shared-keywords heuristic).
+        """
         item_id = item.get("table_id") if is_table else item.get("figure_id")
         caption_text = item.get("caption", "")
+        texts = context_index["texts"]
+        
+        # A. Explicit Mentions
+        # ArXiv uses #id, PMC often uses #id too internally
+        mentions = [texts[pos] for pos in context_index["anchors"].get(f"{item_id}", [])]
+        
+        # B. Semantic Context: paragraphs sharing at least 2 keywords with the caption
+        if context is None:
+            keywords = self.extract_keywords(caption_text)
+            overlap = Counter()
+            postings = context_index["postings"]
+            for keyword in keywords:
+                overlap.update(postings.get(keyword, ()))
+            context = sorted(pos for pos, shared in overlap.items() if shared >= 2)
+        context_paragraphs = [texts[pos] for pos in context]
+        
+        item["mentions"] = mentions
+        item["context_paragraphs"] = context_paragraphs
+
+class _PubmedStreamTarget:
+    """
+    lxml parser target used by Extractor._process_pubmed_stream.
+    
+    Receives the SAX-like events of a JATS document and mirrors what BeautifulSoup
+    computes on the full tree: text runs (split at tags, comments and processing
+    instructions) give the full text and the paragraph texts, while <table-wrap>
+    and <fig> subtrees are rebuilt in isolation and handed to the Extractor.
+    """
+    CAPTURED = ("table-wrap", "fig")
+    
+    def __init__(self, extractor, paper_id):
+        self.extractor = extractor
+        self.paper_id = paper_id
+        self.full_text = []
+        self.paragraphs = []
+        self.tables = []
+        self.figures = []
+        self._run = []
+        self._open_paragraphs = []
+        self._captures = []
+        self._namespaces = [{}]
         
-        keywords = self.extract_keywords(caption_text)
+    @staticmethod
+    def _local_name(tag):
+        return tag.rsplit('}', 1)[-1]
         
-        mentions = []
-        context_paragraphs = []
+    def _flush(self):
+        # A text run ends at every tag, comment or processing instruction
+        if not self._run:
+            return
+        text = ''.join(self._run).strip()
+        self._run = []
+        if text:
+            self.full_text.append(text)
+            for record in self._open_paragraphs:
+                record[0].append(text)
+                
+    def start(self, tag, attrib, nsmap=None):
+        self._flush()
+        new_namespaces = dict(nsmap or {})
+        self._namespaces.append({**self._namespaces[-1], **new_namespaces})
+        name = self._local_name(tag)
         
-        for p in paragraphs:
-            p_text = p.get_text(strip=True)
+        if name == 'p':
+            record = ([], [])
+            self.paragraphs.append(record)
+            self._open_paragraphs.append(record)
+        elif name == 'a' and 'href' in attrib:
+            for record in self._open_paragraphs:
+                record[1].append(attrib['href'])
+                
+        for capture in self._captures:
+            capture["depth"] += 1
+            capture["builder"].start(tag, dict(attrib), new_namespaces)
             
-            # A. Explicit Mentions
-            # Check for ID in any links within paragraph
-            links = p.find_all('a', href=True)
-            is_mentioned = False
-            for link in links:
-                href = link['href']
-                # ArXiv uses #id, PMC often uses #id too internally
-                if href.endswith(f"#{item_id}") or href == f"#{item_id}":
-                    is_mentioned = True
-                    break
+        if name in self.CAPTURED:
+            # Reserve the slot now: items are numbered in document (start) order
+            items = self.tables if name == 'table-wrap' else self.figures
+            items.append(None)
+            builder = etree.TreeBuilder()
+            builder.start(tag, dict(attrib), self._namespaces[-1])
+            self._captures.append({"name": name, "slot": len(items) - 1, "builder": builder, "depth": 0})
             
-            if is_mentioned:
-                mentions.append(p_text)
+    def end(self, tag):
+        self._flush()
+        self._namespaces.pop()
+        name = self._local_name(tag)
+        
+        for capture in list(self._captures):
+            capture["builder"].end(tag)
+            if capture["depth"] > 0:
+                capture["depth"] -= 1
+                continue
+            self._captures.remove(capture)
+            self._finish_capture(capture)
+            
+        if name == 'p':
+            self._open_paragraphs.pop()
+            
+    def _finish_capture(self, capture):
+        element = capture["builder"].close()
+        wrap = BeautifulSoup(etree.tostring(element), 'xml').find(capture["name"])
+        i = capture["slot"]
+        if capture["name"] == 'table-wrap':
+            self.tables[i] = self.extractor._pubmed_table(wrap, i)
+        else:
+            self.figures[i] = self.extractor._pubmed_figure(wrap, i, self.paper_id)
             
-            # B. Semantic Context
-            p_keywords = self.extract_keywords(p_text)
-            intersection = keywords.intersection(p_keywords)
+    def data(self, content):
+        self._run.append(content)
+        for capture in self._captures:
+            capture["builder"].data(content)
             
-            if len(intersection) >= 2:
-                context_paragraphs.append(p_text)
+    def comment(self, text):
+        self._flush()
+        for capture in self._captures:
+            capture["builder"].comment(text)
+            
+    def pi(self, target, data=None):
+        self._flush()
+        # Processing instructions are part of the captured <table-wrap>/<fig> markup ('html' field)
+        for capture in self._captures:
+            capture["builder"].pi(target, data)
         
-        item["mentions"] = mentions
-        item["context_paragraphs"] = context_paragraphs
+    def close(self):
+        self._flush()
+        self.paragraphs = [(''.join(parts), hrefs) for parts, hrefs in self.paragraphs]
 
 if __name__ == "__main__":
     # Test execution block
-    import sys
     base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'html_arxiv')
     files = [f for f in os.listdir(base_dir) if f.endswith('.html')]
     if files:
@@ -0,0 +1,88 @@
+import re
+import sys
+
+# Everything that is neither a word character nor whitespace is dropped before splitting
+# ("e.g." -> "eg", "state-of-the-art" -> "stateoftheart")
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Basic stop words list (Italian + English common scientific terms) used for keyword extraction
+STOP_WORDS = frozenset(sys.intern(word) for word in (
+    "the", "a", "an", "in", "on", "at", "for", "to", "of", "and", "or", "is", "are", "was", "were",
+    "be", "been", "this", "that", "these", "those", "it", "we", "can", "as", "by", "from", "with",
+    "il", "lo", "la", "i", "gli", "le", "un", "uno", "una", "di", "a", "da", "in", "con", "su", "per", "tra", "fra"
+))
+
+class Tokenizer:
+    """
+    Keyword tokenizer of the Extractor: lowercases a text, removes punctuation and keeps
+    the words longer than `min_length - 1` characters that are not stop words.
+
+    The punctuation pattern is compiled once (re.sub with a pattern string looks it up in
+    the re cache at every call), keywords_batch() tokenizes a whole list of paragraphs in
+    one loop with the lookups hoisted out of it, and the keywords of every text are memoized
+    until reset(): the Extractor resets at every paper, so a paragraph or caption tokenized
+    again within a paper costs a dictionary lookup and the cache stays small.
+    """
+    def __init__(self, stop_words=STOP_WORDS, min_length=3):
+        """
+        Initialize the Tokenizer.
+
+        Args:
+            stop_words (iterable): Words never returned as keywords.
+            min_length (int): Minimum length of a keyword.
+        """
+        self.stop_words = frozenset(stop_words)
+        self.min_length = min_length
+        self.memo = {}
+
+    def reset(self):
+        """
+        Forget the memoized keywords (call between papers).
+        """
+        self.memo.clear()
+
+    def keywords(self, text):
+        """
+        Extract the keywords of a text.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            set: A set of keywords (the memoized set: do not modify it).
+        """
+        if not text:
+            return set()
+        keywords = self.memo.get(text)
+        if keywords is None:
+            stop_words = self.stop_words
+            shortest = self.min_length
+            keywords = self.memo[text] = {
+                t for t in PUNCTUATION.sub('', text.lower()).split() if len(t) >= shortest and t not in stop_words
+            }
+        return keywords
+
+    def keywords_batch(self, texts):
+        """
+        Extract the keywords of a list of texts (e.g. all the paragraphs of a paper) in one pass.
+
+        Args:
+            texts (list): Input texts.
+
+        Returns:
+            list: A set of keywords per text, in the same order.
+        """
+        memo = self.memo
+        sub = PUNCTUATION.sub
+        stop_words = self.stop_words
+        shortest = self.min_length
+        result = []
+        for text in texts:
+            if not text:
+                result.append(set())
+                continue
+            keywords = memo.get(text)
+            if keywords is None:
+                keywords = memo[text] = {t for t in sub('', text.lower()).split() if len(t) >= shortest and t not in stop_words}
+            result.append(keywords)
+        return result
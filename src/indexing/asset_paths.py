@@ -0,0 +1,47 @@
+import os
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'assets')
+# Map of the downloaded URLs to their files, in the root of the asset store
+ASSETS_INDEX = 'index.json'
+
+def resolve_figure_url(paper_id, raw_url):
+    """
+    Turn the figure URL stored by the Extractor into an absolute URL.
+
+    arXiv figures keep the (relative) src of the <img> tag, resolved against the HTML
+    rendering of the paper; PubMed URLs are already absolute but older extractions
+    appended '.jpg' to references that already had an extension.
+
+    Args:
+        paper_id (str): ID of the paper the figure belongs to.
+        raw_url (str): The 'url' field of the figure.
+
+    Returns:
+        str: The absolute URL ('' if the figure has no image).
+    """
+    if not raw_url:
+        return ""
+    url = raw_url
+    if url.endswith('.jpg.jpg') or url.endswith('.png.jpg'):
+        url = url[:-4]
+    if not url.startswith('http') and paper_id and not paper_id.startswith("PMC"):
+        url = f"https://arxiv.org/html/{paper_id}/{url}"
+    return url
+
+def prepare_figure(src, paper_id, assets_url="/assets"):
+    """
+    Resolve the image URLs of a figure document for the UI: the absolute source URL
+    and, when the figure is in the local asset store, the local image and thumbnail.
+
+    Args:
+        src (dict): The _source of a figure (updated in place).
+        paper_id (str): ID of the paper the figure belongs to.
+        assets_url (str): URL prefix under which the web application serves the store.
+
+    Returns:
+        dict: The same dictionary, with 'url', 'local_url' and 'thumbnail_url' set.
+    """
+    src['url'] = resolve_figure_url(paper_id, src.get('url', ''))
+    src['local_url'] = f"{assets_url}/{src['local_path']}" if src.get('local_path') else None
+    src['thumbnail_url'] = f"{assets_url}/{src['thumbnail_path']}" if src.get('thumbnail_path') else src['local_url']
+    return src
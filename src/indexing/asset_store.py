@@ -0,0 +1,180 @@
+import os
+import io
+import json
+import hashlib
+import mimetypes
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from PIL import Image, UnidentifiedImageError
+
+from scrapers.arxiv_scraper import TokenBucket, make_session, fetch
+from indexing.asset_paths import ASSETS_DIR, ASSETS_INDEX, resolve_figure_url
+
+# arXiv/NCBI reject the default python-requests User-Agent
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+class AssetStore:
+    """
+    Local, content-addressed store of figure images and their thumbnails.
+
+    Each image is downloaded once and saved as originals/<hh>/<sha256>.<ext>, with a
+    downscaled JPEG in thumbnails/<hh>/<sha256>.jpg (paths relative to the store root,
+    which the web application serves under /assets/). Identical images referenced by
+    several URLs are stored once. index.json maps every downloaded URL to its files,
+    so later runs skip URLs already in the store.
+    """
+    def __init__(self, root=ASSETS_DIR, thumbnail_size=320, concurrency=8, rate=5.0):
+        """
+        Initialize the AssetStore.
+
+        Args:
+            root (str): Directory of the store.
+            thumbnail_size (int): Maximum width/height of the thumbnails in pixels.
+            concurrency (int): Number of parallel downloads.
+            rate (float): Maximum downloads per second (shared by all the workers).
+        """
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+        self.concurrency = concurrency
+        self.session = make_session(concurrency)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.bucket = TokenBucket(rate, capacity=concurrency)
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(root, ASSETS_INDEX)
+        self.urls = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.urls = json.load(f)
+        self.downloaded = self.failed = 0
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _thumbnail(self, content):
+        """
+        Return the JPEG thumbnail of an image, or None if Pillow cannot decode it (e.g. SVG).
+        """
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                if image.mode in ("RGBA", "LA", "P"):
+                    # JPEG has no alpha channel: flatten transparent figures on white
+                    rgba = image.convert("RGBA")
+                    image = Image.new("RGB", rgba.size, "white")
+                    image.paste(rgba, mask=rgba.getchannel("A"))
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, "JPEG", quality=85, optimize=True)
+                return buffer.getvalue()
+        except (UnidentifiedImageError, OSError, ValueError):
+            return None
+
+    def get(self, url):
+        """
+        Return the stored files of a URL ({"local_path", "thumbnail_path"}), or None.
+        """
+        return self.urls.get(url)
+
+    def download(self, url):
+        """
+        Download a single image into the store (no-op if the URL is already stored).
+
+        Returns:
+            dict: {"local_path", "thumbnail_path"} (thumbnail_path is None if the image
+                  cannot be thumbnailed), or None if the download failed.
+        """
+        if url in self.urls:
+            return self.urls[url]
+        try:
+            response = fetch(self.session, url, self.bucket)
+        except Exception as e:
+            print(f"  -> Asset download failed for {url}: {e}")
+            with self.lock:
+                self.failed += 1
+            return None
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if response.status_code != 200 or not content_type.startswith("image/"):
+            print(f"  -> Asset not available: {url} ({response.status_code} {content_type})")
+            with self.lock:
+                self.failed += 1
+            return None
+
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        extension = mimetypes.guess_extension(content_type) or os.path.splitext(url)[1] or ".bin"
+        entry = {"local_path": f"originals/{digest[:2]}/{digest}{extension}", "thumbnail_path": None}
+        self._write(entry["local_path"], content)
+
+        thumbnail = self._thumbnail(content)
+        if thumbnail is not None:
+            entry["thumbnail_path"] = f"thumbnails/{digest[:2]}/{digest}.jpg"
+            self._write(entry["thumbnail_path"], thumbnail)
+
+        with self.lock:
+            self.urls[url] = entry
+            self.downloaded += 1
+        return entry
+
+    def attach(self, papers, lookahead=32, download=True):
+        """
+        Download the figures of a stream of papers and record their local files.
+
+        Downloads run in a thread pool while the stream keeps flowing: up to `lookahead`
+        papers are in flight, and each paper is yielded (in the original order) as soon
+        as all its figures are done, with 'local_path' and 'thumbnail_path' set on every
+        figure (None when the image could not be stored).
+
+        Args:
+            papers (iterable): Extracted paper dictionaries.
+            lookahead (int): Maximum number of papers waiting for their downloads.
+            download (bool): Download missing images; if False, only the images already
+                             in the store are attached (re-indexing keeps its local paths).
+
+        Yields:
+            dict: The same paper dictionaries, with the asset paths filled in.
+        """
+        pending = deque()
+
+        def finish(data, futures):
+            wait(futures.values())
+            for fig in data.get("figures", []):
+                url = fig["_asset_url"]
+                entry = futures[url].result() if url in futures else self.get(url)
+                del fig["_asset_url"]
+                fig["local_path"] = entry["local_path"] if entry else None
+                fig["thumbnail_path"] = entry["thumbnail_path"] if entry else None
+            return data
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for data in papers:
+                futures = {}
+                for fig in data.get("figures", []):
+                    url = resolve_figure_url(data["paper_id"], fig.get("url", ""))
+                    fig["_asset_url"] = url
+                    if download and url and url not in futures:
+                        futures[url] = executor.submit(self.download, url)
+                pending.append((data, futures))
+                while len(pending) > lookahead:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+
+    def save(self):
+        """
+        Write the URL index to disk atomically.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.urls, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,252 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from collections import deque, OrderedDict
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'embedding_cache.sqlite')
+
+# Small English sentence-transformers model: 384 dimensions, fast on a CPU
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Field holding the document vector in every index (dense_vector mapping, see IndexManager)
+EMBEDDING_FIELD = "embedding"
+# Texts longer than this are truncated before embedding (the model truncates to ~256 tokens anyway)
+MAX_TEXT_CHARS = 2000
+
+WORD = re.compile(r"\w+")
+
+def embedding_text(index_name, doc):
+    """
+    Return the text embedded for a document: title and abstract for articles, caption
+    and context paragraphs for tables and figures.
+
+    Args:
+        index_name (str): 'articles', 'tables' or 'figures'.
+        doc (dict): The paper (articles) or the table/figure dictionary.
+
+    Returns:
+        str: The text, possibly empty.
+    """
+    if index_name == "articles":
+        parts = [doc.get("title", ""), doc.get("abstract", "")]
+    else:
+        parts = [doc.get("caption", "")] + list(doc.get("context_paragraphs") or [])
+    return "\n".join(part for part in parts if part)[:MAX_TEXT_CHARS]
+
+class HashingModel:
+    """
+    Deterministic stand-in for a sentence-transformers model (SCISEARCH_EMBEDDING_MODEL=hashing):
+    unigrams and bigrams hashed into a fixed-size, L2-normalized vector.
+
+    It only captures word overlap, not meaning: it exists so that the pipeline can be
+    exercised in tests and CI without downloading a model.
+    """
+    def __init__(self, dims=256):
+        self.dims = dims
+
+    def get_sentence_embedding_dimension(self):
+        return self.dims
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False):
+        vectors = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.md5(feature.encode('utf-8')).digest()
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, int.from_bytes(digest[:4], 'little') % self.dims] += sign
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+        return vectors
+
+class Embedder:
+    """
+    Computes text embeddings on the CPU with a local sentence-transformers model.
+
+    Document texts are encoded in batches and every vector is cached in SQLite under the
+    SHA-256 of (model, text): re-indexing unchanged papers does not run the model again.
+    Search queries (embed_query) are only kept in a bounded in-memory LRU, so the disk
+    cache does not grow with every distinct query. Vectors are L2-normalized float32
+    (cosine similarity = dot product).
+    """
+    def __init__(self, model_name=DEFAULT_MODEL, cache_path=EMBEDDING_CACHE_PATH, batch_size=32, model=None,
+                 query_cache_size=1024):
+        """
+        Initialize the Embedder.
+
+        Args:
+            model_name (str): sentence-transformers model name or path, or 'hashing' (see HashingModel).
+            cache_path (str): SQLite file of the vector cache (None disables the cache).
+            batch_size (int): Texts encoded per model call.
+            model: Already loaded model (default: loaded on first use).
+            query_cache_size (int): Query vectors kept in memory by embed_query (0 disables it).
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = model
+        self.lock = threading.Lock()
+        self.conn = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self.conn.commit()
+        self.computed = self.cached = 0
+        self.query_cache_size = query_cache_size
+        self.query_vectors = OrderedDict()
+
+    @classmethod
+    def from_env(cls, model_name=None, batch_size=None):
+        """
+        Build the embedder configured through environment variables:
+        SCISEARCH_EMBEDDING_MODEL, SCISEARCH_EMBEDDING_CACHE and SCISEARCH_EMBEDDING_BATCH.
+
+        Args:
+            model_name (str): Model overriding SCISEARCH_EMBEDDING_MODEL.
+            batch_size (int): Batch size overriding SCISEARCH_EMBEDDING_BATCH.
+        """
+        return cls(
+            model_name=model_name or os.environ.get("SCISEARCH_EMBEDDING_MODEL", DEFAULT_MODEL),
+            cache_path=os.environ.get("SCISEARCH_EMBEDDING_CACHE", EMBEDDING_CACHE_PATH),
+            batch_size=batch_size or int(os.environ.get("SCISEARCH_EMBEDDING_BATCH", 32))
+        )
+
+    def _load_model(self):
+        with self.lock:
+            if self.model is None:
+                if self.model_name == "hashing":
+                    self.model = HashingModel()
+                else:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError:
+                        raise ImportError("Embeddings require the sentence-transformers package (pip install sentence-transformers)")
+                    self.model = SentenceTransformer(self.model_name, device="cpu")
+            return self.model
+
+    @property
+    def dims(self):
+        """
+        Number of dimensions of the vectors (loads the model).
+        """
+        return self._load_model().get_sentence_embedding_dimension()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def embed(self, texts):
+        """
+        Return the embeddings of a list of texts.
+
+        Args:
+            texts (list): Strings to embed (empty strings get a zero vector).
+
+        Returns:
+            numpy.ndarray: float32 array of shape (len(texts), dims).
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        if self.conn is not None:
+            unique = list(dict.fromkeys(keys))
+            with self.lock:
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    rows = self.conn.execute(
+                        f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    for key, blob in rows:
+                        vectors[key] = np.frombuffer(blob, dtype=np.float32)
+        self.cached += sum(1 for key in keys if key in vectors)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and text:
+                missing.setdefault(key, text)
+        if missing:
+            model = self._load_model()
+            items = list(missing.items())
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                encoded = model.encode([text for _, text in batch], batch_size=self.batch_size,
+                                       normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+                for (key, _), vector in zip(batch, np.asarray(encoded, dtype=np.float32)):
+                    vectors[key] = vector
+            self.computed += len(missing)
+            if self.conn is not None:
+                with self.lock:
+                    self.conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                                          [(key, vectors[key].tobytes()) for key in missing])
+                    self.conn.commit()
+
+        dims = next(iter(vectors.values())).shape[0] if vectors else self.dims
+        zero = np.zeros(dims, dtype=np.float32)
+        return np.stack([vectors.get(key, zero) for key in keys]) if keys else np.zeros((0, dims), dtype=np.float32)
+
+    def embed_query(self, query):
+        """
+        Return the embedding of a search query, from the in-memory LRU when possible
+        (query vectors are never written to the SQLite cache).
+
+        Args:
+            query (str): The query text.
+
+        Returns:
+            numpy.ndarray: float32 vector (zero for an empty query).
+        """
+        with self.lock:
+            vector = self.query_vectors.get(query)
+            if vector is not None:
+                self.query_vectors.move_to_end(query)
+                return vector
+        if not query:
+            return np.zeros(self.dims, dtype=np.float32)
+        encoded = self._load_model().encode([query], batch_size=1, normalize_embeddings=True,
+                                            convert_to_numpy=True, show_progress_bar=False)
+        vector = np.asarray(encoded, dtype=np.float32)[0]
+        if self.query_cache_size > 0:
+            with self.lock:
+                self.query_vectors[query] = vector
+                while len(self.query_vectors) > self.query_cache_size:
+                    self.query_vectors.popitem(last=False)
+        return vector
+
+    def attach(self, papers, batch_papers=16):
+        """
+        Compute the embeddings of a stream of papers, in batches of `batch_papers` papers.
+
+        Sets EMBEDDING_FIELD on every paper (title and abstract) and on each of its tables
+        and figures (caption and context paragraphs); documents without text get no vector.
+
+        Args:
+            papers (iterable): Extracted paper dictionaries.
+            batch_papers (int): Papers whose texts are embedded together.
+
+        Yields:
+            dict: The same paper dictionaries, in the original order.
+        """
+        pending = deque()
+
+        def flush():
+            targets = []
+            for data in pending:
+                targets.append(("articles", data))
+                targets.extend(("tables", table) for table in data.get("tables", []))
+                targets.extend(("figures", figure) for figure in data.get("figures", []))
+            texts = [embedding_text(index_name, doc) for index_name, doc in targets]
+            vectors = self.embed(texts)
+            for (_, doc), text, vector in zip(targets, texts, vectors):
+                if text:
+                    doc[EMBEDDING_FIELD] = vector.tolist()
+            while pending:
+                yield pending.popleft()
+
+        for data in papers:
+            pending.append(data)
+            if len(pending) >= batch_papers:
+                yield from flush()
+        if pending:
+            yield from flush()
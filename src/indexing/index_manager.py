@@ -1,17 +1,109 @@
-from elasticsearch import Elasticsearch, helpers
+import os
+import re
+import json
+from collections import deque, Counter
+from itertools import groupby
+from contextlib import contextmanager
+from elasticsearch import helpers
+from search.es_client import get_client
+from search.local_backend import LocalStore
+from indexing.embeddings import EMBEDDING_FIELD
+
+# Child indices and the field identifying a document inside its paper
+CHILD_INDICES = {"tables": "table_id", "figures": "figure_id"}
+
+# Large text fields that get highlighting data stored at index time (see HIGHLIGHT_STORAGE)
+HIGHLIGHT_FIELDS = {
+    "articles": ["abstract", "full_text"],
+    "tables": ["body", "mentions", "context_paragraphs"],
+    "figures": ["mentions", "context_paragraphs"]
+}
+# Opt-in mapping profiles: store offsets so that highlighting does not re-analyze the text.
+# 'offsets' keeps them in the postings (unified highlighter, smaller index),
+# 'term_vectors' stores full term vectors (fast vector highlighter, fastest on long fields).
+HIGHLIGHT_STORAGE = {
+    "offsets": {"index_options": "offsets"},
+    "term_vectors": {"term_vector": "with_positions_offsets"}
+}
+
+# Physical indices are versioned ("articles_v2") behind an alias with the logical name
+VERSIONED_INDEX = re.compile(r"^(?P<name>.+)_v(?P<version>\d+)$")
+
+def logical_index_name(index_name):
+    """
+    Return the logical name of a concrete index (e.g. "articles_v2" -> "articles").
+    """
+    match = VERSIONED_INDEX.match(index_name)
+    return match.group("name") if match else index_name
+
+def child_doc_id(paper_id, child_id, ordinal=0):
+    """
+    Build the deterministic document ID of a table or figure.
+    
+    Args:
+        paper_id (str): ID of the parent paper.
+        child_id (str): table_id / figure_id of the object inside the paper.
+        ordinal (int): Occurrence number, to disambiguate objects sharing the same child_id in a paper.
+        
+    Returns:
+        str: Document ID (e.g. "2306.12020v1:S4.T1", "2306.12020v1:S4.T1#1").
+    """
+    doc_id = f"{paper_id}:{child_id}"
+    return f"{doc_id}#{ordinal}" if ordinal else doc_id
+
+def _content_key(source):
+    """
+    Serialize the content of a table/figure document, without the fields that depend
+    on the indexing run (embedding, local asset files).
+    """
+    return json.dumps({k: v for k, v in source.items() if k not in (EMBEDDING_FIELD, "local_path", "thumbnail_path")},
+                      sort_keys=True)
+
+def child_doc_ids(paper_id, child_field, sources):
+    """
+    Build the document IDs of the tables or figures of a paper.
+    
+    Objects sharing the same child_id get ordinals in the order of their content (then
+    of their position), so the IDs do not depend on the order the objects are read in:
+    re-indexing a paper (IndexManager._paper_actions) and the ID migration
+    (IndexManager.dedupe_children) give the same content the same ID.
+    
+    Args:
+        paper_id (str): ID of the parent paper.
+        child_field (str): 'table_id' or 'figure_id'.
+        sources (list): The table/figure documents of the paper.
+        
+    Returns:
+        list: Document IDs, in the order of `sources`.
+    """
+    keys = [_content_key(source) for source in sources]
+    seen = Counter()
+    ids = [None] * len(sources)
+    for position in sorted(range(len(sources)), key=lambda i: (keys[i], i)):
+        child_id = sources[position].get(child_field)
+        ids[position] = child_doc_id(paper_id, child_id, seen[child_id])
+        seen[child_id] += 1
+    return ids
 
 class IndexManager:
     """
     Manages Elasticsearch indices and handles the bulk indexing of data.
     """
-    def __init__(self, es_host="http://localhost:9200"):
+    def __init__(self, es_host=None, highlight_storage=None, embedding_dims=None):
         """
         Initialize the IndexManager.
         
         Args:
-            es_host (str): Elasticsearch server URL.
+            es_host (str): Elasticsearch server URL (default: the shared client, see es_client).
+            highlight_storage (str): Optional mapping profile for the large text fields
+                                     (a key of HIGHLIGHT_STORAGE), used when indices are created.
+            embedding_dims (int): Dimensions of the document embeddings (see indexing.embeddings).
+                                  If set, every index gets a dense_vector field for kNN search.
         """
-        self.es = Elasticsearch(es_host)
+        if highlight_storage is not None and highlight_storage not in HIGHLIGHT_STORAGE:
+            raise ValueError(f"Unknown highlight storage '{highlight_storage}', expected one of {list(HIGHLIGHT_STORAGE)}")
+        self.es = get_client(es_host)
+        self.highlight_storage = highlight_storage
         
         # Define index schemas (mappings) for articles, tables, and figures
         self.indices = {
@@ -47,6 +139,9 @@ class IndexManager:
                         "paper_id": {"type": "keyword"},
                         "figure_id": {"type": "keyword"},
                         "url": {"type": "keyword"},
+                        # Files in the local asset store (see AssetStore), served by the web app
+                        "local_path": {"type": "keyword", "index": False},
+                        "thumbnail_path": {"type": "keyword", "index": False},
                         "caption": {"type": "text"},
                         "mentions": {"type": "text"},
                         "context_paragraphs": {"type": "text"},
@@ -55,75 +150,564 @@ class IndexManager:
                 }
             }
         }
+        
+        if highlight_storage:
+            for index_name, fields in HIGHLIGHT_FIELDS.items():
+                for field in fields:
+                    self.indices[index_name]["mappings"]["properties"][field].update(HIGHLIGHT_STORAGE[highlight_storage])
+
+        if embedding_dims:
+            # Normalized vectors: cosine similarity, searched through the HNSW graph of the field
+            for config in self.indices.values():
+                config["mappings"]["properties"][EMBEDDING_FIELD] = {
+                    "type": "dense_vector", "dims": embedding_dims, "index": True, "similarity": "cosine"
+                }
+
+    def target(self):
+        """
+        Identify the indexed target for the manifest: the Elasticsearch cluster.
+        A manifest written for another target is not used (see Manifest).
+        """
+        return f"elasticsearch:{self.es.info()['cluster_uuid']}"
+
+    def count_existing(self, index_name, doc_ids):
+        """
+        Return how many of the given document IDs exist in an index.
+
+        Args:
+            index_name (str): Logical index name.
+            doc_ids (list): Document IDs.
+        """
+        if not doc_ids:
+            return 0
+        return self.es.count(index=index_name, query={"ids": {"values": list(doc_ids)}}, ignore_unavailable=True)["count"]
 
     def create_indices(self):
         """
         Create indices in Elasticsearch if they do not exist.
+        
+        New indices are created as "<name>_v1" behind an alias "<name>", so that they
+        can later be rebuilt with reindex() without downtime.
         """
         for index_name, config in self.indices.items():
             if not self.es.indices.exists(index=index_name):
-                self.es.indices.create(index=index_name, body=config)
+                self.es.indices.create(index=f"{index_name}_v1", body=dict(config, aliases={index_name: {}}))
                 print(f"Created index: {index_name}")
             else:
                 print(f"Index {index_name} already exists.")
+                self._add_missing_fields(index_name, config["mappings"]["properties"])
 
-    def index_data(self, data):
+    def _add_missing_fields(self, index_name, properties):
         """
-        Prepare and bulk index data for a single paper (Article + Tables + Figures).
+        Add to an existing index the fields introduced after it was created.
+        (Changing an existing field requires reindex() instead.)
+        """
+        response = self.es.indices.get_mapping(index=index_name)
+        for concrete_name, config in response.items():
+            existing = config["mappings"].get("properties", {})
+            missing = {field: mapping for field, mapping in properties.items() if field not in existing}
+            if missing:
+                self.es.indices.put_mapping(index=concrete_name, body={"properties": missing})
+                print(f"Added fields to {concrete_name}: {', '.join(missing)}")
+
+    def _rebuilt_mapping(self, index_name, live_mappings):
+        """
+        Return the mapping of a rebuilt index: the live mapping, with the fields added
+        since it was created and, if highlight_storage is set, the highlighted fields
+        switched to it. Fields of the live index not enabled in this run (embeddings,
+        offsets or term vectors) are kept, so a reindex never drops them.
         
         Args:
-            data (dict): Unified dictionary containing paper content and metadata.
+            index_name (str): Logical index name.
+            live_mappings (list): "mappings" of the concrete indices being replaced.
+        """
+        requested = self.indices[index_name]["mappings"]
+        properties = {}
+        for mappings in live_mappings:
+            properties.update(mappings.get("properties", {}))
+        for field, mapping in requested["properties"].items():
+            live = properties.get(field)
+            if live and mapping.get("type") == "dense_vector" and live.get("dims") != mapping["dims"]:
+                raise ValueError(f"Index {index_name} stores {live.get('dims')}-dimensional embeddings, "
+                                 f"not {mapping['dims']}: re-create it to change the embedding model")
+            if live is None or (self.highlight_storage and field in HIGHLIGHT_FIELDS.get(index_name, [])):
+                properties[field] = mapping
+        return dict(requested, properties=properties)
+
+    def reindex(self, index_name, keep_old=False):
+        """
+        Rebuild an index with the current mapping (e.g. after enabling highlight_storage)
+        without interrupting searches.
+        
+        The documents are copied server-side into a new "<name>_v<N+1>" index, then the
+        alias "<name>" is switched to it in a single atomic update: searches hit the old
+        index until the copy is complete and the new one afterwards. An index created
+        before aliases were used (a concrete index called "<name>") is replaced by the
+        alias in the same atomic update. Do not run the indexer meanwhile: writes made
+        during the copy would be lost. The new mapping is built by _rebuilt_mapping(), and
+        the new index is deleted if the copy fails.
+        
+        Args:
+            index_name (str): Logical index name (a key of self.indices).
+            keep_old (bool): Keep the previous versioned index instead of deleting it
+                             (a legacy concrete index is always removed by the switch).
+            
+        Returns:
+            str: Name of the new concrete index.
+        """
+        if self.es.indices.exists_alias(name=index_name):
+            current = list(self.es.indices.get_alias(name=index_name))
+        elif self.es.indices.exists(index=index_name):
+            current = []  # legacy concrete index
+        else:
+            raise ValueError(f"Index {index_name} does not exist: nothing to reindex")
+            
+        versions = [int(VERSIONED_INDEX.match(name).group("version")) for name in current if VERSIONED_INDEX.match(name)]
+        new_name = f"{index_name}_v{max(versions, default=0) + 1}"
+        source = ",".join(current) if current else index_name
+        
+        # Bulk-load settings while copying; the new index then gets those of the index it replaces
+        previous = next(iter(self._tuning_settings(source).values()))
+        live_mappings = [config["mappings"] for config in self.es.indices.get_mapping(index=source).values()]
+        config = {
+            "mappings": self._rebuilt_mapping(index_name, live_mappings),
+            "settings": {"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+        }
+        self.es.indices.create(index=new_name, body=config)
+        print(f"Reindexing {source} into {new_name}...")
+        try:
+            result = self.es.options(request_timeout=3600).reindex(
+                body={"source": {"index": source}, "dest": {"index": new_name}},
+                slices="auto", wait_for_completion=True
+            )
+            if result.get("failures"):
+                raise RuntimeError(f"Reindex of {index_name} failed: {result['failures'][:3]}")
+            self.es.indices.put_settings(index=new_name, body={"index": previous})
+            self.es.indices.refresh(index=new_name)
+        except Exception:
+            # Otherwise the next attempt would collide on the same versioned name
+            self.es.indices.delete(index=new_name, ignore_unavailable=True)
+            raise
+        
+        # Atomic switch: the alias never points to zero or two indices
+        if current:
+            actions = [{"add": {"index": new_name, "alias": index_name}}]
+            actions += [{"remove": {"index": name, "alias": index_name}} for name in current]
+        else:
+            actions = [{"remove_index": {"index": index_name}}, {"add": {"index": new_name, "alias": index_name}}]
+        self.es.indices.update_aliases(body={"actions": actions})
+        print(f"Alias {index_name} -> {new_name} ({result.get('total', 0)} documents copied).")
+        
+        if current and not keep_old:
+            self.es.indices.delete(index=",".join(current))
+            print(f"Deleted previous index: {', '.join(current)}")
+        return new_name
+
+    def _tuning_settings(self, index):
+        """
+        Return the refresh interval and number of replicas of the concrete indices behind
+        `index`, as {concrete_name: settings} (None means "not set", i.e. the cluster default).
+        """
+        previous = {}
+        for concrete_name, config in self.es.indices.get_settings(index=index).items():
+            settings = config["settings"]["index"]
+            previous[concrete_name] = {
+                "refresh_interval": settings.get("refresh_interval"),
+                "number_of_replicas": settings.get("number_of_replicas")
+            }
+        return previous
+
+    @contextmanager
+    def bulk_load(self, force_merge=False):
+        """
+        Context manager tuning the indices for a massive ingestion.
+        
+        Disables periodic refresh and replicas while the block runs, then restores the
+        previous settings (even if the block raises), performs a single refresh and,
+        if requested and the block succeeded, force-merges each index to one segment.
+        
+        Args:
+            force_merge (bool): Force-merge the indices after a successful load.
         """
-        actions = []
+        # Remember the current values
+        previous = {}
+        for index_name in self.indices:
+            previous.update(self._tuning_settings(index_name))
+                
+        targets = ",".join(previous)
+        succeeded = False
+        try:
+            for concrete_name in previous:
+                self.es.indices.put_settings(index=concrete_name, body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+            print(f"Bulk-load mode enabled on: {targets}")
+            yield
+            succeeded = True
+        finally:
+            for concrete_name, settings in previous.items():
+                self.es.indices.put_settings(index=concrete_name, body={"index": settings})
+            if previous:
+                self.es.indices.refresh(index=targets)
+                print(f"Bulk-load mode disabled, settings restored on: {targets}")
+            
+        if force_merge and succeeded and previous:
+            print("Force-merging indices...")
+            self.es.indices.forcemerge(index=targets, max_num_segments=1)
+
+    def _paper_actions(self, data):
+        """
+        Yield the bulk actions for a single paper (Article + Tables + Figures).
         
+        Args:
+            data (dict): Unified dictionary containing paper content and metadata.
+        """
         # 1. Prepare Article Document
-        article_doc = {
+        yield {
             "_index": "articles",
             "_id": data["paper_id"],
-            "_source": {
+            "_source": self._with_embedding(data, {
                 "title": data.get("title", ""),
                 "authors": data.get("authors", []),
                 "date": data.get("date", ""),
                 "abstract": data.get("abstract", ""),
                 "full_text": data.get("full_text", ""),
                 "source": data.get("source", "arxiv")
-            }
+            })
         }
-        actions.append(article_doc)
         
         # 2. Prepare Table Documents
-        for tbl in data.get("tables", []):
-            table_doc = {
-                "_index": "tables",
-                "_source": {
-                    "paper_id": data["paper_id"],
-                    "table_id": tbl["table_id"],
-                    "caption": tbl["caption"],
-                    "body": tbl["body"],
-                    "mentions": tbl["mentions"],
-                    "context_paragraphs": tbl["context_paragraphs"],
-                    "source": data.get("source", "arxiv")
-                }
-            }
-            actions.append(table_doc)
+        tables = [self._with_embedding(tbl, {
+            "paper_id": data["paper_id"],
+            "table_id": tbl["table_id"],
+            "caption": tbl["caption"],
+            "body": tbl["body"],
+            "mentions": tbl["mentions"],
+            "context_paragraphs": tbl["context_paragraphs"],
+            "source": data.get("source", "arxiv")
+        }) for tbl in data.get("tables", [])]
             
         # 3. Prepare Figure Documents
-        for fig in data.get("figures", []):
-            fig_doc = {
-                "_index": "figures",
-                "_source": {
-                    "paper_id": data["paper_id"],
-                    "figure_id": fig["figure_id"],
-                    "url": fig["url"],
-                    "caption": fig["caption"],
-                    "mentions": fig["mentions"],
-                    "context_paragraphs": fig["context_paragraphs"],
-                    "source": data.get("source", "arxiv")
-                }
-            }
-            actions.append(fig_doc)
+        figures = [self._with_embedding(fig, {
+            "paper_id": data["paper_id"],
+            "figure_id": fig["figure_id"],
+            "url": fig["url"],
+            "local_path": fig.get("local_path"),
+            "thumbnail_path": fig.get("thumbnail_path"),
+            "caption": fig["caption"],
+            "mentions": fig["mentions"],
+            "context_paragraphs": fig["context_paragraphs"],
+            "source": data.get("source", "arxiv")
+        }) for fig in data.get("figures", [])]
+        
+        # Deterministic IDs for tables and figures: re-indexing a paper replaces its
+        # children instead of duplicating them (see child_doc_ids).
+        for index_name, sources in (("tables", tables), ("figures", figures)):
+            for doc_id, source in zip(child_doc_ids(data["paper_id"], CHILD_INDICES[index_name], sources), sources):
+                yield {"_index": index_name, "_id": doc_id, "_source": source}
+
+    @staticmethod
+    def _with_embedding(doc, source):
+        """
+        Add the embedding computed for a document (see Embedder.attach), if any, to its _source.
+        """
+        if doc.get(EMBEDDING_FIELD) is not None:
+            source[EMBEDDING_FIELD] = doc[EMBEDDING_FIELD]
+        return source
+
+    def index_data(self, data):
+        """
+        Prepare and bulk index data for a single paper (Article + Tables + Figures).
+        
+        Re-indexing a paper replaces its previous version: tables and figures have
+        deterministic IDs and the ones not produced anymore are deleted.
+        
+        Args:
+            data (dict): Unified dictionary containing paper content and metadata.
+        """
+        actions = list(self._paper_actions(data))
             
         # Execute Bulk Indexing
         if actions:
             helpers.bulk(self.es, actions)
             # print(f"Indexed {len(actions)} documents for paper {data['paper_id']}")
+            
+        # Upsert semantics: drop the children of a previous version that no longer exist
+        child_ids = [action["_id"] for action in actions if action["_index"] in CHILD_INDICES]
+        self.es.delete_by_query(
+            index=",".join(CHILD_INDICES),
+            body={"query": {"bool": {
+                "filter": [{"term": {"paper_id": data["paper_id"]}}],
+                "must_not": [{"ids": {"values": child_ids}}]
+            }}},
+            conflicts="proceed"
+        )
+
+    def index_stream(self, papers, chunk_size=500, max_chunk_bytes=100 * 1024 * 1024, thread_count=1):
+        """
+        Index a stream of papers through a single bulk pipeline.
+        
+        Documents of consecutive papers are packed into the same bulk requests, so the
+        number of HTTP round trips depends on the corpus size in bytes/documents and not
+        on the number of papers. Errors never interrupt the stream: they are reported
+        per document to the caller.
+        
+        Args:
+            papers (iterable): Extracted paper dictionaries (as accepted by index_data).
+            chunk_size (int): Maximum number of documents per bulk request.
+            max_chunk_bytes (int): Maximum size of a bulk request in bytes.
+            thread_count (int): Number of parallel bulk requests (1 uses streaming_bulk, more uses parallel_bulk).
+            
+        Yields:
+            tuple: (paper_id, ok, info) for every document, in submission order.
+                   'info' is the bulk response item, e.g. {"index": {"_index": ..., "_id": ..., "status": ...}}.
+        """
+        # Bulk helpers report results in submission order: remember which paper every action belongs to
+        owners = deque()
+        
+        def actions():
+            for data in papers:
+                for action in self._paper_actions(data):
+                    owners.append(data["paper_id"])
+                    yield action
+                    
+        options = {
+            "chunk_size": chunk_size,
+            "max_chunk_bytes": max_chunk_bytes,
+            "raise_on_error": False,
+            "raise_on_exception": False
+        }
+        if thread_count > 1:
+            results = helpers.parallel_bulk(self.es, actions(), thread_count=thread_count, **options)
+        else:
+            results = helpers.streaming_bulk(self.es, actions(), **options)
+            
+        for ok, info in results:
+            yield owners.popleft(), ok, info
+
+    def delete_documents(self, doc_ids):
+        """
+        Delete documents by ID through the bulk API. Documents already missing are ignored.
+        
+        Args:
+            doc_ids (dict): {index_name: [ids]} of the documents to delete.
+            
+        Returns:
+            int: Number of documents that could not be deleted.
+        """
+        actions = (
+            {"_op_type": "delete", "_index": index_name, "_id": doc_id}
+            for index_name, ids in doc_ids.items() for doc_id in ids
+        )
+        failed = 0
+        for ok, info in helpers.streaming_bulk(self.es, actions, raise_on_error=False, raise_on_exception=False):
+            if not ok and info["delete"].get("status") != 404:
+                failed += 1
+                print(f"Failed to delete document: {self.describe_error(info)}")
+        return failed
+
+    def dedupe_children(self, current=None):
+        """
+        Migrate tables and figures indexed with random IDs to deterministic IDs.
+        
+        Documents are scanned paper by paper; copies with identical content (left by
+        repeated indexing runs) collapse into one document stored under child_doc_ids(),
+        and every document not stored under its deterministic ID is deleted. When the
+        latest indexing run of a paper is known, the copies it did not produce (earlier
+        versions of changed tables/figures) are deleted instead of being kept under a
+        new ordinal.
+        
+        Args:
+            current (dict): Document IDs produced by the latest run of every paper,
+                as {index_name: set(ids)} (e.g. from the manifest).
+        
+        Returns:
+            dict: Mapping old document ID -> new document ID, per index ({index_name: {old: new}}).
+        """
+        remapped = {}
+        for index_name, child_field in CHILD_INDICES.items():
+            mapping = remapped.setdefault(index_name, {})
+            live = (current or {}).get(index_name) or set()
+            dropped = []
+            hits = helpers.scan(
+                self.es, index=index_name, preserve_order=True,
+                query={"query": {"match_all": {}}, "sort": [{"paper_id": "asc"}, {child_field: "asc"}]}
+            )
+            
+            def actions():
+                for paper_id, paper_hits in groupby(hits, key=lambda h: h["_source"].get("paper_id")):
+                    paper_hits = list(paper_hits)
+                    # Deletes go first: an old random ID may coincide with another target ID
+                    deletes = []
+                    inserts = []
+                    if any(hit["_id"] in live for hit in paper_hits):
+                        for hit in paper_hits:
+                            if hit["_id"] not in live:
+                                dropped.append(hit["_id"])
+                                deletes.append({"_op_type": "delete", "_index": index_name, "_id": hit["_id"]})
+                        paper_hits = [hit for hit in paper_hits if hit["_id"] in live]
+                        # The latest run is known: every document left is one object of the paper
+                        groups = [[hit] for hit in paper_hits]
+                    else:
+                        # Copies with identical content (left by repeated runs) collapse into one
+                        contents = {}
+                        for hit in paper_hits:
+                            key = (hit["_source"].get(child_field), _content_key(hit["_source"]))
+                            contents.setdefault(key, []).append(hit)
+                        groups = list(contents.values())
+                    # Same numbering as a re-index of the paper
+                    targets = child_doc_ids(paper_id, child_field, [copies[0]["_source"] for copies in groups])
+                    for target, copies in zip(targets, groups):
+                        if all(hit["_id"] != target for hit in copies):
+                            inserts.append({"_index": index_name, "_id": target, "_source": copies[0]["_source"]})
+                        for hit in copies:
+                            if hit["_id"] != target:
+                                mapping[hit["_id"]] = target
+                                deletes.append({"_op_type": "delete", "_index": index_name, "_id": hit["_id"]})
+                    yield from deletes
+                    yield from inserts
+                                    
+            failed = 0
+            for ok, info in helpers.streaming_bulk(self.es, actions(), raise_on_error=False, raise_on_exception=False):
+                if not ok:
+                    failed += 1
+                    print(f"Migration error: {self.describe_error(info)}")
+            print(f"Index {index_name}: {len(mapping)} documents migrated to deterministic IDs, "
+                  f"{len(dropped)} stale copies deleted ({failed} errors).")
+        return remapped
+
+    @staticmethod
+    def describe_error(info):
+        """
+        Return a short human readable description of a failed bulk item.
+        
+        Args:
+            info (dict): Bulk response item as yielded by index_stream.
+        """
+        op, result = next(iter(info.items()))
+        error = result.get("error", result.get("status"))
+        if isinstance(error, dict):
+            error = f"{error.get('type')}: {error.get('reason')}"
+        return f"{op} {result.get('_index')}/{result.get('_id', '-')} failed ({error})"
+
+class LocalIndexManager(IndexManager):
+    """
+    IndexManager for the embedded search backend (SCISEARCH_BACKEND=local, see search.local_backend).
+
+    Documents are written to a LocalStore instead of Elasticsearch, with the same IDs and
+    sources. The BM25 index of the changed indices is rebuilt when a batch of changes is
+    complete (at the end of index_stream, index_data and delete_documents, or once at the
+    end of a bulk_load block), which makes them searchable like an Elasticsearch refresh.
+    """
+    def __init__(self, root=None, highlight_storage=None, embedding_dims=None):
+        """
+        Initialize the LocalIndexManager.
+
+        Args:
+            root (str): Directory of the embedded backend (default: SCISEARCH_LOCAL_INDEX_DIR).
+            highlight_storage (str): Accepted for compatibility; the local index does not store offsets.
+            embedding_dims (int): Dimensions of the document embeddings (see IndexManager).
+        """
+        super().__init__(highlight_storage=highlight_storage, embedding_dims=embedding_dims)
+        self.store = LocalStore(root)
+        self.deferred = False
+
+    def target(self):
+        """
+        Identify the indexed target for the manifest: the directory of the local store.
+        """
+        return f"local:{os.path.abspath(self.store.root)}"
+
+    def count_existing(self, index_name, doc_ids):
+        """
+        Return how many of the given document IDs exist in a local index.
+        """
+        return self.store.existing(index_name, doc_ids)
+
+    def _commit(self):
+        if not self.deferred:
+            self.store.commit()
+
+    def create_indices(self):
+        """
+        Create the local indices that do not exist yet.
+        """
+        for index_name, config in self.indices.items():
+            if self.store.put_mapping(index_name, config):
+                print(f"Creating local index: {index_name}")
+        self._commit()
+
+    def reindex(self, index_name, keep_old=False):
+        """
+        Rebuild a local index with the current mapping (merged with the live one, see
+        IndexManager._rebuilt_mapping).
+        """
+        live = self.store.mapping(index_name)
+        mappings = self._rebuilt_mapping(index_name, [live.get("mappings", {})] if live else [])
+        self.store.put_mapping(index_name, dict(self.indices[index_name], mappings=mappings))
+        self.store.commit([index_name])
+
+    @contextmanager
+    def bulk_load(self, force_merge=False):
+        """
+        Context manager deferring the index rebuilds to the end of the block
+        (a local index is always a single segment: force_merge is implied).
+        """
+        self.deferred = True
+        try:
+            yield
+        finally:
+            self.deferred = False
+            self._commit()
+
+    def index_data(self, data):
+        """
+        Store a single paper, replacing its previous version (see IndexManager.index_data).
+        """
+        actions = list(self._paper_actions(data))
+        for action in actions:
+            self.store.put(action["_index"], action["_id"], action["_source"])
+        child_ids = {action["_id"] for action in actions if action["_index"] in CHILD_INDICES}
+        for index_name in CHILD_INDICES:
+            stale = [doc_id for doc_id in self.store.children(index_name, data["paper_id"]) if doc_id not in child_ids]
+            self.store.delete(index_name, stale)
+        self._commit()
+
+    def index_stream(self, papers, chunk_size=500, max_chunk_bytes=100 * 1024 * 1024, thread_count=1):
+        """
+        Store a stream of papers (see IndexManager.index_stream for the yielded results).
+        Writes are committed to the store every `chunk_size` documents.
+        """
+        pending = 0
+        for data in papers:
+            for action in self._paper_actions(data):
+                result = {"_index": action["_index"], "_id": action["_id"]}
+                try:
+                    created = self.store.put(action["_index"], action["_id"], action["_source"])
+                    result.update(status=201 if created else 200, result="created" if created else "updated")
+                    yield data["paper_id"], True, {"index": result}
+                except Exception as e:
+                    result.update(status=500, error={"type": type(e).__name__, "reason": str(e)})
+                    yield data["paper_id"], False, {"index": result}
+                pending += 1
+                if pending >= chunk_size:
+                    self.store.flush()
+                    pending = 0
+        self._commit()
+
+    def delete_documents(self, doc_ids):
+        """
+        Delete documents by ID. Documents already missing are ignored.
+
+        Returns:
+            int: Number of documents that could not be deleted (always 0).
+        """
+        for index_name, ids in doc_ids.items():
+            self.store.delete(index_name, ids)
+        self._commit()
+        return 0
+
+    def dedupe_children(self, current=None):
+        """
+        Documents of the local backend always have deterministic IDs: nothing to migrate.
+        """
+        print("Local indices use deterministic IDs: nothing to migrate.")
+        return {index_name: {} for index_name in CHILD_INDICES}
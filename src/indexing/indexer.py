@@ -1,12 +1,21 @@
 import os
 import json
 import sys
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait, as_completed
 
 # Add key source directories to the system path to ensure modules can be imported
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from extraction.extractor import Extractor
-from indexing.index_manager import IndexManager
+from indexing.index_manager import IndexManager, LocalIndexManager, HIGHLIGHT_STORAGE, logical_index_name
+from indexing.manifest import Manifest
+from indexing.asset_paths import ASSETS_DIR, ASSETS_INDEX
+from indexing.embeddings import Embedder
+from indexing.shard_store import ShardStore, SHARDS_DIR
+from search.query_cache import bump_generation
+from search.es_client import backend_name
 
 # Directory containing the downloaded HTML files
 
@@ -15,77 +24,372 @@ DATA_DIR_PUBMED = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(o
 
 DATA_DIRS = [DATA_DIR_ARXIV, DATA_DIR_PUBMED]
 
-def main():
+# Local record of the indexed files, used to re-extract only new or changed papers
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'index_manifest.json')
+
+# Extractor instance of the current worker process (created by _init_worker)
+_worker_extractor = None
+
+def extract_paper(extractor, filepath, data_dir):
     """
-    Main entry point for the indexing process.
-    1. Initializes connection to Elasticsearch.
-    2. Ensures necessary indices exist (Articles, Tables, Figures).
-    3. Iterates through all HTML files in the data directories.
-    4. Extracts structured data using Extractor.
-    5. Indexes the extracted data using IndexManager.
+    Extract a single paper and merge the metadata saved by the scraper.
+    
+    Args:
+        extractor (Extractor): Extractor instance to use.
+        filepath (str): Path to the HTML/XML file.
+        data_dir (str): Directory the file belongs to (used to infer the source).
+        
+    Returns:
+        tuple: (filename, data, error). 'data' is None and 'error' holds the message if extraction failed.
     """
-    # --- 1. Initialize Manager (Assumes ES is running) ---
+    filename = os.path.basename(filepath)
+    paper_id = filename.replace('.html', '').replace('.xml', '')
+    # Path to the metadata JSON file created by the scraper
+    meta_filepath = os.path.join(data_dir, f"{paper_id}_meta.json")
+    
+    # --- Extract Data ---
     try:
-        indexer = IndexManager()
-        indexer.create_indices()
+        data = extractor.process_file(filepath)
     except Exception as e:
-        print(f"Error connecting to Elasticsearch: {e}")
-        print("Please ensure Elasticsearch is running.")
-        return
+        return filename, None, str(e)
+        
+    # --- Load and Merge Metadata ---
+    if os.path.exists(meta_filepath):
+        with open(meta_filepath, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+            # Update fields in 'data' with metadata, preferring metadata if available
+            data['title'] = meta.get('title', data.get('title'))
+            data['authors'] = meta.get('authors', [])
+            data['date'] = meta.get('published', '')
+            data['abstract'] = meta.get('abstract', data.get('abstract', ''))
+            data['source'] = meta.get('source', data.get('source'))
+    
+    # Ensure separate identification if missing
+    if "source" not in data or not data['source']:
+        data["source"] = source_of(data_dir)
+        
+    return filename, data, None
+
+def _init_worker(extractor_options):
+    """
+    Process pool initializer: creates the Extractor reused by the worker process.
+    """
+    global _worker_extractor
+    _worker_extractor = Extractor(**extractor_options)
+
+def _extract_in_worker(filepath, data_dir):
+    """
+    Process pool entry point.
+    """
+    return extract_paper(_worker_extractor, filepath, data_dir)
+
+def iter_parallel(tasks, workers, max_pending=None, extractor_options=None):
+    """
+    Extract papers in a pool of worker processes, yielding results as they complete.
+    
+    At most `max_pending` files are in flight at any time, so memory stays flat
+    regardless of the corpus size even when indexing is slower than extraction.
+    
+    Args:
+        tasks (iterable): (filepath, data_dir) pairs.
+        workers (int): Number of worker processes.
+        max_pending (int): Maximum number of submitted but not yet consumed files (default: 2 * workers).
+        extractor_options (dict): Keyword arguments for the Extractor of each worker.
+        
+    Yields:
+        tuple: (filename, data, error) as returned by extract_paper.
+    """
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(extractor_options or {},)) as pool:
+        pending = set()
+        for filepath, data_dir in tasks:
+            pending.add(pool.submit(_extract_in_worker, filepath, data_dir))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
 
-    extractor = Extractor()
+def source_of(data_dir):
+    """
+    Return the source of the papers of a data directory ('arxiv' or 'pubmed').
+    """
+    return "arxiv" if "html_arxiv" in data_dir else "pubmed"
+
+def iter_tasks(manifest, pending, removed, full=False, deleted=None):
+    """
+    Walk the data directories and yield the files that still have to be indexed.
     
-    # --- 2. Iterate over Data Directories ---
+    Files whose fingerprint matches the manifest are skipped without reading them
+    (unless `full` is set); Elasticsearch is never contacted here.
+    
+    Args:
+        manifest (Manifest): Manifest of the previous runs.
+        pending (dict): Filled with paper_id -> (manifest key, fingerprint) for every yielded file.
+        removed (dict): Filled with {index_name: [ids]} of the documents of files deleted from disk.
+        full (bool): Re-index every file regardless of the manifest.
+        deleted (list): Filled with the (paper_id, source) of the files deleted from disk.
+        
+    Yields:
+        tuple: (filepath, data_dir)
+    """
     for data_dir in DATA_DIRS:
         if not os.path.exists(data_dir):
             print(f"Directory {data_dir} does not exist. Skipping.")
             continue
             
         print(f"--- Indexing directory: {data_dir} ---")
+        dir_name = os.path.basename(data_dir)
         files = [f for f in os.listdir(data_dir) if f.endswith('.html') or f.endswith('.xml')]
         
-        print(f"Found {len(files)} files to process in {os.path.basename(data_dir)}.")
+        print(f"Found {len(files)} files to process in {dir_name}.")
         
+        seen = set()
+        unchanged = 0
         for filename in files:
-            filepath = os.path.join(data_dir, filename)
             paper_id = filename.replace('.html', '').replace('.xml', '')
-            # Path to the metadata JSON file created by the scraper
-            meta_filepath = os.path.join(data_dir, f"{paper_id}_meta.json")
+            key = f"{dir_name}/{filename}"
+            seen.add(key)
             
-            print(f"Processing {paper_id}...")
+            # Check if already indexed (size/mtime first, content hash only if they changed)
+            paths = [os.path.join(data_dir, filename), os.path.join(data_dir, f"{paper_id}_meta.json")]
+            status, fingerprint = manifest.check(key, paths, force=full)
+            if status == "unchanged" and not full:
+                unchanged += 1
+                continue
+                
+            print(f"Processing {paper_id} ({status})...")
+            pending[paper_id] = (key, fingerprint)
+            yield os.path.join(data_dir, filename), data_dir
+            
+        print(f"  -> {unchanged} unchanged files skipped in {dir_name}.")
+        
+        # Papers deleted from disk: their documents have to go as well
+        for key in [k for k in manifest.entries if k.startswith(f"{dir_name}/") and k not in seen]:
+            print(f"  -> {key} no longer exists. Removing its documents.")
+            if deleted is not None:
+                filename = key.split("/", 1)[1]
+                deleted.append((filename.replace('.html', '').replace('.xml', ''), source_of(data_dir)))
+            for index_name, ids in manifest.forget(key).items():
+                removed.setdefault(index_name, []).extend(ids)
+
+def main():
+    """
+    Main entry point for the indexing process.
+    1. Initializes connection to Elasticsearch (or the embedded index with SCISEARCH_BACKEND=local).
+    2. Ensures necessary indices exist (Articles, Tables, Figures).
+    3. Iterates through the HTML/XML files that are new or changed since the last run (see Manifest).
+    4. Extracts structured data using Extractor (optionally in a pool of worker processes).
+       With --write-shards, the extracted papers are also stored in the ShardStore;
+       with --from-shards, they are read back from it instead (no HTML/XML parsing).
+       With --fetch-assets, figure images are downloaded concurrently into the local AssetStore.
+       With --embeddings, the texts of papers, tables and figures are embedded for hybrid search.
+    5. Streams the extracted data to Elasticsearch using IndexManager.index_stream.
+    6. Records the indexed files in the manifest and removes stale table/figure documents.
+    7. Bumps the index generation, invalidating the search result caches.
+    """
+    parser = argparse.ArgumentParser(description="Extract and index the downloaded papers.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of extraction processes (default: 1, sequential)")
+    parser.add_argument("--queue-size", type=int, default=None, help="Max files in flight when --workers > 1 (default: 2 * workers)")
+    parser.add_argument("--parser", default="html.parser", choices=Extractor.HTML_PARSER_BACKENDS, help="HTML parser backend (default: html.parser)")
+    parser.add_argument("--stream-xml", action="store_true", help="Extract PubMed XML incrementally (bounded memory on huge articles)")
+    parser.add_argument("--context-mode", default="keywords", choices=Extractor.CONTEXT_MODES,
+                        help="Context paragraphs of tables/figures: shared keywords or TF-IDF ranking (default: keywords)")
+    parser.add_argument("--context-top-k", type=int, default=5, help="Max context paragraphs per item with --context-mode tfidf")
+    parser.add_argument("--context-threshold", type=float, default=0.1, help="Min similarity of a context paragraph with --context-mode tfidf")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Max documents per bulk request")
+    parser.add_argument("--max-chunk-bytes", type=int, default=100 * 1024 * 1024, help="Max bytes per bulk request")
+    parser.add_argument("--threads", type=int, default=1, help="Parallel bulk requests (default: 1)")
+    parser.add_argument("--bulk-load", action="store_true", help="Disable refresh and replicas during ingestion (full re-index)")
+    parser.add_argument("--force-merge", action="store_true", help="With --bulk-load, force-merge the indices at the end")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Path of the incremental indexing manifest")
+    parser.add_argument("--full", action="store_true", help="Re-index every file, ignoring the manifest")
+    parser.add_argument("--dedupe", action="store_true", help="Collapse duplicated tables/figures into deterministic IDs and exit")
+    parser.add_argument("--highlight-storage", choices=list(HIGHLIGHT_STORAGE), default=None,
+                        help="Store offsets/term vectors on large text fields for faster highlighting (new indices, or with --reindex)")
+    parser.add_argument("--fetch-assets", action="store_true", help="Download figure images and thumbnails into the local asset store (use --full for papers indexed before)")
+    parser.add_argument("--asset-workers", type=int, default=8, help="Parallel figure downloads with --fetch-assets")
+    parser.add_argument("--asset-rate", type=float, default=5.0, help="Max figure downloads per second with --fetch-assets")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="Compute text embeddings for semantic/hybrid search (use --full to embed papers indexed before)")
+    parser.add_argument("--embedding-model", default=None, help="sentence-transformers model for --embeddings (default: SCISEARCH_EMBEDDING_MODEL)")
+    parser.add_argument("--embedding-batch", type=int, default=None, help="Texts per model call with --embeddings")
+    parser.add_argument("--write-shards", action="store_true",
+                        help="Also store the extracted papers in the shard store (use --full the first time)")
+    parser.add_argument("--from-shards", action="store_true", help="Index the papers of the shard store instead of extracting the files")
+    parser.add_argument("--shard-source", action="append", help="With --from-shards, only this source (repeatable: arxiv, pubmed)")
+    parser.add_argument("--shard-since", default=None, help="With --from-shards, only papers published on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--shard-before", default=None, help="With --from-shards, only papers published before this date (YYYY-MM-DD)")
+    parser.add_argument("--shards-dir", default=SHARDS_DIR, help="Directory of the shard store")
+    parser.add_argument("--compact-shards", action="store_true", help="Keep only the latest version of every paper in the shard store and exit")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the existing indices with the current mapping behind their aliases and exit")
+    args = parser.parse_args()
+    if args.write_shards and args.from_shards:
+        parser.error("--write-shards and --from-shards are mutually exclusive")
 
-            # Check if already indexed
-            if indexer.es.exists(index="articles", id=paper_id):
-                 print(f"  -> Article {paper_id} already indexed. Skipping.")
-                 continue
+    # Maintenance of the shard store only: Elasticsearch is not needed
+    if args.compact_shards:
+        kept = ShardStore(args.shards_dir).compact()
+        print(f"Shard store compacted: {kept} papers.")
+        return
+
+    shard_store = None
+    if args.write_shards or args.from_shards:
+        try:
+            shard_store = ShardStore(args.shards_dir)
+        except ImportError as e:
+            print(e)
+            return
+    
+    # Loading the model tells the size of the vectors, needed by the index mappings
+    embedder = embedding_dims = None
+    if args.embeddings:
+        try:
+            embedder = Embedder.from_env(model_name=args.embedding_model, batch_size=args.embedding_batch)
+            embedding_dims = embedder.dims
+        except Exception as e:
+            print(f"Could not load the embedding model: {e}")
+            return
+
+    # --- 1. Initialize Manager (Assumes ES is running) ---
+    try:
+        manager_class = LocalIndexManager if backend_name() == "local" else IndexManager
+        indexer = manager_class(highlight_storage=args.highlight_storage, embedding_dims=embedding_dims)
+        indexer.create_indices()
+    except Exception as e:
+        print(f"Error connecting to Elasticsearch: {e}")
+        print("Please ensure Elasticsearch is running.")
+        return
+
+    # Mapping migration without downtime (documents keep their IDs: the manifest stays valid)
+    if args.reindex:
+        for index_name in indexer.indices:
+            indexer.reindex(index_name)
+        bump_generation()
+        return
+
+    manifest = Manifest(args.manifest, target=indexer.target())
+    # The indices may have been deleted or recreated since the manifest was written
+    if not args.dedupe and not manifest.verify(indexer.count_existing):
+        print("Documents recorded in the manifest are missing from the indices: every file will be re-indexed.")
+    
+    # One-off migration of documents indexed before tables/figures had deterministic IDs
+    if args.dedupe:
+        manifest.remap(indexer.dedupe_children(manifest.all_doc_ids()))
+        manifest.save()
+        bump_generation()
+        return
+
+    # --- 2. Iterate over Data Directories (only new or changed files) ---
+    pending = {}
+    removed = {}
+    deleted = []
+    if args.from_shards:
+        def from_shards():
+            print(f"--- Indexing the shard store: {args.shards_dir} ---")
+            for data, key, fingerprint in shard_store.read(args.shard_source, args.shard_since, args.shard_before):
+                # Papers stored with their source file keep the manifest (and stale document removal) up to date
+                if key and fingerprint:
+                    pending[data['paper_id']] = (key, fingerprint)
+                yield data.get('paper_id', ''), data, None
+        results = from_shards()
+    else:
+        tasks = iter_tasks(manifest, pending, removed, full=args.full, deleted=deleted)
+    
+        # --- 3. Extract Data (sequentially or in worker processes) ---
+        extractor_options = {
+            "parser_backend": args.parser, "stream_xml": args.stream_xml, "context_mode": args.context_mode,
+            "context_top_k": args.context_top_k, "context_threshold": args.context_threshold
+        }
+        if args.workers > 1:
+            results = iter_parallel(tasks, args.workers, args.queue_size, extractor_options)
+        else:
+            extractor = Extractor(**extractor_options)
+            results = (extract_paper(extractor, filepath, data_dir) for filepath, data_dir in tasks)
+    
+    # --- 4. Index Data (single consumer, one streaming bulk pipeline for the whole corpus) ---
+    sources = {}
+    
+    def papers():
+        for filename, data, error in results:
+            if error is not None:
+                print(f"  -> Extraction Failed for {filename}: {error}")
+                continue
+            sources[data['paper_id']] = data['source']
+            if args.write_shards:
+                shard_store.add(data, *pending.get(data['paper_id'], (None, None)))
+            yield data
+            
+    # Figures stored locally: downloaded with --fetch-assets, otherwise only the ones already in the store
+    # (the download stack, PIL and the scrapers, is imported only then)
+    asset_store = None
+    if args.fetch_assets or os.path.exists(os.path.join(ASSETS_DIR, ASSETS_INDEX)):
+        from indexing.asset_store import AssetStore
+        asset_store = AssetStore(concurrency=args.asset_workers, rate=args.asset_rate)
+    if asset_store and (args.fetch_assets or asset_store.urls):
+        paper_stream = asset_store.attach(papers(), download=args.fetch_assets)
+    else:
+        paper_stream = papers()
+    if embedder:
+        paper_stream = embedder.attach(paper_stream)
             
-            # --- 4. Extract Data ---
-            try:
-                data = extractor.process_file(filepath)
-            except Exception as e:
-                print(f"  -> Extraction Failed for {filename}: {e}")
+    indexed = failed = 0
+    produced = {}
+    failed_papers = set()
+    bulk_load = indexer.bulk_load(force_merge=args.force_merge) if args.bulk_load else nullcontext()
+    with bulk_load:
+        stream = indexer.index_stream(paper_stream, chunk_size=args.chunk_size,
+                                      max_chunk_bytes=args.max_chunk_bytes, thread_count=args.threads)
+        for paper_id, ok, info in stream:
+            result = next(iter(info.values()))
+            # The article is the first document of each paper: report the paper once it is stored
+            index_name = logical_index_name(result.get("_index", ""))
+            is_article = index_name == "articles"
+            source = sources.pop(paper_id, '') if is_article else None
+            if not ok:
+                failed += 1
+                failed_papers.add(paper_id)
+                print(f"Failed to index {paper_id}: {IndexManager.describe_error(info)}")
                 continue
+            indexed += 1
+            produced.setdefault(paper_id, {}).setdefault(index_name, []).append(result["_id"])
+            if is_article:
+                print(f"  -> Successfully indexed {paper_id} ({source})")
                 
-            # --- 3. Load and Merge Metadata ---
-            if os.path.exists(meta_filepath):
-                with open(meta_filepath, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-                    # Update fields in 'data' with metadata, preferring metadata if available
-                    data['title'] = meta.get('title', data.get('title'))
-                    data['authors'] = meta.get('authors', [])
-                    data['date'] = meta.get('published', '')
-                    data['source'] = meta.get('source', data.get('source'))
+        # --- 5. Update Manifest and drop stale documents of changed papers ---
+        # Papers that failed (extraction or indexing) are not recorded, so the next run retries them.
+        stale = removed
+        for paper_id, (key, fingerprint) in pending.items():
+            if paper_id in failed_papers or paper_id not in produced:
+                continue
+            docs = produced[paper_id]
+            for index_name, ids in manifest.doc_ids(key).items():
+                current = set(docs.get(index_name, []))
+                stale.setdefault(index_name, []).extend(i for i in ids if i not in current)
+            manifest.record(key, fingerprint, docs)
             
-            # Ensure separate identification if missing
-            if "source" not in data or not data['source']:
-                data["source"] = "arxiv" if "html_arxiv" in data_dir else "pubmed"
-                
-            # --- 5. Index Data ---
-            try:
-                indexer.index_data(data)
-                print(f"  -> Successfully indexed {paper_id} ({data['source']})")
-            except Exception as e:
-                print(f"Failed to index {paper_id}: {e}")
+        stale_count = sum(len(ids) for ids in stale.values())
+        if stale_count:
+            print(f"Removing {stale_count} stale documents...")
+            indexer.delete_documents(stale)
+        manifest.save()
+        if args.write_shards:
+            for paper_id, source in deleted:
+                shard_store.remove(paper_id, source)
+            shard_store.flush()
+            print(f"Shard store: {shard_store.written} papers written, {shard_store.deleted} removed.")
+        if args.fetch_assets:
+            asset_store.save()
+            print(f"Figure assets: {asset_store.downloaded} downloaded, {asset_store.failed} failed.")
+        if embedder:
+            print(f"Embeddings: {embedder.computed} computed, {embedder.cached} from the cache.")
+        
+    # Invalidate the search result caches (SearchEngine) if the indices changed
+    if indexed or stale_count:
+        bump_generation()
+            
+    print(f"Indexed {indexed} documents ({failed} failed).")
 
 if __name__ == "__main__":
     main()
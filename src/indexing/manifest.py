@@ -0,0 +1,174 @@
+import os
+import json
+import random
+import hashlib
+
+class Manifest:
+    """
+    Local record of the files already indexed, used for incremental re-indexing.
+
+    For every source file (keyed by its path relative to the data directory) it stores
+    the size and mtime of the file and of its metadata JSON, a content hash of both,
+    and the IDs of the documents produced in each index. A file is re-extracted only
+    when its fingerprint changed, so an unchanged run needs nothing but a stat() per file.
+
+    The entries are kept per index target (an Elasticsearch cluster, a local store
+    directory), so switching backend does not skip files indexed only elsewhere; verify()
+    drops them if the recorded documents are gone (e.g. the indices were deleted).
+    """
+    def __init__(self, path, target="default"):
+        """
+        Initialize the Manifest, loading it from disk if it exists.
+
+        Args:
+            path (str): Path of the manifest JSON file.
+            target (str): Identifier of the index target (see IndexManager.target).
+        """
+        self.path = path
+        self.target = target
+        self.targets = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Manifests written before targets existed hold the entries only: verify() checks them
+            self.targets = data["targets"] if "targets" in data else {target: data}
+        self.entries = self.targets.setdefault(target, {})
+
+    def verify(self, count_existing, sample_size=50):
+        """
+        Check that a random sample of the recorded documents still exists in the target,
+        and forget every entry if not (the next run then re-indexes every file).
+
+        Args:
+            count_existing (callable): (index_name, doc_ids) -> number of existing documents.
+            sample_size (int): Documents checked per index.
+
+        Returns:
+            bool: True if the manifest matches the target.
+        """
+        recorded = {}
+        for entry in self.entries.values():
+            for index_name, ids in entry["docs"].items():
+                recorded.setdefault(index_name, []).extend(ids)
+        for index_name, ids in recorded.items():
+            sample = random.sample(ids, min(sample_size, len(ids)))
+            if count_existing(index_name, sample) < len(sample):
+                self.entries.clear()
+                return False
+        return True
+
+    @staticmethod
+    def _stat(paths):
+        """
+        Return the (size, mtime) pairs of the given files (None for missing files).
+        """
+        stats = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stats.append([st.st_size, st.st_mtime_ns])
+            except FileNotFoundError:
+                stats.append(None)
+        return stats
+
+    @staticmethod
+    def _hash(paths):
+        """
+        Return the SHA-256 of the concatenated contents of the existing files.
+        """
+        digest = hashlib.sha256()
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def check(self, key, paths, force=False):
+        """
+        Compare the current state of a file (and its metadata) with the manifest.
+
+        The content hash is computed only when size or mtime changed: a file that was
+        merely touched is reported unchanged and its stat is refreshed.
+
+        Args:
+            key (str): Manifest key of the source file.
+            paths (list): The source file followed by its companion files (e.g. metadata JSON).
+            force (bool): Always compute the fingerprint, even for unchanged files.
+
+        Returns:
+            tuple: (status, fingerprint) where status is 'unchanged', 'changed' or 'new'.
+                   The fingerprint (None for unchanged files, unless forced) has to be
+                   passed to record() once the file is indexed.
+        """
+        stats = self._stat(paths)
+        entry = self.entries.get(key)
+        if entry and entry["stat"] == stats and not force:
+            return "unchanged", None
+
+        fingerprint = {"stat": stats, "hash": self._hash(paths)}
+        if entry is None:
+            return "new", fingerprint
+        if entry["hash"] == fingerprint["hash"]:
+            entry["stat"] = stats
+            return "unchanged", fingerprint if force else None
+        return "changed", fingerprint
+
+    def doc_ids(self, key):
+        """
+        Return the document IDs recorded for a file, as {index_name: [ids]}.
+        """
+        entry = self.entries.get(key)
+        return entry["docs"] if entry else {}
+
+    def all_doc_ids(self):
+        """
+        Return the document IDs recorded for all the files, as {index_name: set(ids)}.
+        """
+        ids = {}
+        for entry in self.entries.values():
+            for index_name, doc_ids in entry["docs"].items():
+                ids.setdefault(index_name, set()).update(doc_ids)
+        return ids
+
+    def record(self, key, fingerprint, docs):
+        """
+        Store the fingerprint of an indexed file and the documents it produced.
+
+        Args:
+            key (str): Manifest key of the source file.
+            fingerprint (dict): Value returned by check().
+            docs (dict): {index_name: [ids]} of the documents produced.
+        """
+        self.entries[key] = dict(fingerprint, docs=docs)
+
+    def forget(self, key):
+        """
+        Remove a file from the manifest, returning its recorded document IDs.
+        """
+        entry = self.entries.pop(key, None)
+        return entry["docs"] if entry else {}
+
+    def remap(self, mapping):
+        """
+        Replace document IDs recorded in the manifest (e.g. after an ID migration).
+
+        Args:
+            mapping (dict): {index_name: {old_id: new_id}}.
+        """
+        for entry in self.entries.values():
+            for index_name, ids in entry["docs"].items():
+                index_mapping = mapping.get(index_name, {})
+                # Several old copies may collapse into the same new ID
+                entry["docs"][index_name] = list(dict.fromkeys(index_mapping.get(i, i) for i in ids))
+
+    def save(self):
+        """
+        Write the manifest to disk atomically.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"targets": self.targets}, f)
+        os.replace(tmp_path, self.path)
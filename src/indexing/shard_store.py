@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import gzip
+
+SHARDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'shards')
+
+# Scalar fields of an extracted paper stored in their own column (filterable without parsing JSON)
+TEXT_COLUMNS = ["paper_id", "source", "date", "title", "abstract", "full_text"]
+# Nested fields stored as JSON strings: every paper has them, their inner structure may change
+JSON_COLUMNS = ["tables", "figures"]
+
+PART_NAME = re.compile(r'^part-(\d+)\.(parquet|jsonl\.gz)$')
+
+def _pyarrow():
+    """
+    Return (pyarrow, pyarrow.parquet), or None if pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+class ShardStore:
+    """
+    Compressed, sharded store of the extracted papers (Extractor output merged with the
+    scraper metadata), so that the indices can be rebuilt without parsing HTML/XML again.
+
+    Papers are appended to part files under one directory per source
+    (`source=arxiv/part-000001.parquet`), written with zstd compression as Parquet
+    (pyarrow) or as gzip JSON lines when pyarrow is not installed. Each run appends new
+    parts: the most recent row of a paper wins, and deleted papers get a tombstone row.
+    Reading prunes whole directories by source and, for Parquet, pushes the date filter
+    down to the row-group statistics (rows are sorted by date inside every part).
+    """
+    def __init__(self, root=SHARDS_DIR, shard_format=None, rows_per_shard=1000, row_group_size=128):
+        """
+        Initialize the ShardStore.
+
+        Args:
+            root (str): Directory of the shards.
+            shard_format (str): 'parquet' or 'jsonl' (default: parquet if pyarrow is installed).
+            rows_per_shard (int): Papers per part file.
+            row_group_size (int): Papers per Parquet row group (the unit skipped by the date filter).
+        """
+        if shard_format is None:
+            shard_format = "parquet" if _pyarrow() else "jsonl"
+        if shard_format not in ("parquet", "jsonl"):
+            raise ValueError(f"Unknown shard format '{shard_format}', expected 'parquet' or 'jsonl'")
+        if shard_format == "parquet" and not _pyarrow():
+            raise ImportError("Parquet shards require the pyarrow package (pip install pyarrow)")
+        self.root = root
+        self.shard_format = shard_format
+        self.rows_per_shard = rows_per_shard
+        self.row_group_size = row_group_size
+        self.buffer = []
+        self.written = self.deleted = 0
+        parts = self._parts()
+        self.next_seq = parts[-1][0] + 1 if parts else 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def _parts(self, sources=None):
+        """
+        Return the (sequence, source, path) of the part files, oldest first.
+
+        Args:
+            sources (list): Only the parts of these sources (default: all).
+        """
+        parts = []
+        if not os.path.isdir(self.root):
+            return parts
+        for entry in os.listdir(self.root):
+            if not entry.startswith("source="):
+                continue
+            source = entry[len("source="):]
+            if sources is not None and source not in sources:
+                continue
+            directory = os.path.join(self.root, entry)
+            for filename in os.listdir(directory):
+                match = PART_NAME.match(filename)
+                if match:
+                    parts.append((int(match.group(1)), source, os.path.join(directory, filename)))
+        parts.sort()
+        return parts
+
+    @staticmethod
+    def _row(data, key=None, fingerprint=None, deleted=False):
+        """
+        Flatten a paper dictionary into a shard row (nested fields serialized immediately,
+        so later stages that update the dictionary do not change what is stored).
+        """
+        # Missing fields are stored as nulls, so that they stay missing when read back
+        row = {column: data.get(column) for column in TEXT_COLUMNS}
+        row["authors"] = list(data.get("authors") or [])
+        for column in JSON_COLUMNS:
+            row[column] = json.dumps(data.get(column) or [], ensure_ascii=False)
+        known = set(TEXT_COLUMNS) | set(JSON_COLUMNS) | {"authors"}
+        extra = {k: v for k, v in data.items() if k not in known}
+        row["extra"] = json.dumps(extra, ensure_ascii=False) if extra else ""
+        row["manifest_key"] = key or ""
+        row["fingerprint"] = json.dumps(fingerprint) if fingerprint else ""
+        row["deleted"] = deleted
+        return row
+
+    @staticmethod
+    def _paper(row):
+        """
+        Rebuild the paper dictionary of a shard row.
+
+        Returns:
+            tuple: (data, manifest key, fingerprint)
+        """
+        data = {column: row[column] for column in TEXT_COLUMNS if row[column] is not None}
+        data["authors"] = list(row["authors"] or [])
+        for column in JSON_COLUMNS:
+            data[column] = json.loads(row[column]) if row[column] else []
+        if row["extra"]:
+            data.update(json.loads(row["extra"]))
+        fingerprint = json.loads(row["fingerprint"]) if row["fingerprint"] else None
+        return data, row["manifest_key"] or None, fingerprint
+
+    def add(self, data, key=None, fingerprint=None):
+        """
+        Store an extracted paper (replacing its previous version once flushed).
+
+        Args:
+            data (dict): Extracted paper with metadata (paper_id and source are required).
+            key (str): Manifest key of the source file.
+            fingerprint (dict): Manifest fingerprint of the source file.
+        """
+        self.buffer.append(self._row(data, key, fingerprint))
+        self.written += 1
+        if len(self.buffer) >= self.rows_per_shard:
+            self.flush()
+
+    def remove(self, paper_id, source):
+        """
+        Record that a paper no longer exists (a tombstone hiding its previous versions).
+
+        Args:
+            paper_id (str): ID of the paper.
+            source (str): Source of the paper ('arxiv' or 'pubmed').
+        """
+        self.buffer.append(self._row({"paper_id": paper_id, "source": source}, deleted=True))
+        self.deleted += 1
+        if len(self.buffer) >= self.rows_per_shard:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows: one new part file per source.
+        """
+        if not self.buffer:
+            return
+        by_source = {}
+        # The last row of a paper in the buffer wins, as it would across parts
+        for row in {row["paper_id"]: row for row in self.buffer}.values():
+            by_source.setdefault(row["source"] or "unknown", []).append(row)
+        self.buffer = []
+        for source, rows in sorted(by_source.items()):
+            rows.sort(key=lambda row: (row["date"] or "", row["paper_id"]))
+            directory = os.path.join(self.root, f"source={source}")
+            os.makedirs(directory, exist_ok=True)
+            extension = "parquet" if self.shard_format == "parquet" else "jsonl.gz"
+            path = os.path.join(directory, f"part-{self.next_seq:06d}.{extension}")
+            self.next_seq += 1
+            tmp_path = path + ".tmp"
+            if self.shard_format == "parquet":
+                pa, pq = _pyarrow()
+                table = pa.Table.from_pylist(rows, schema=self._schema(pa))
+                pq.write_table(table, tmp_path, compression="zstd", row_group_size=self.row_group_size)
+            else:
+                with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                    for row in rows:
+                        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            # Readers never see a partially written part
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _schema(pa):
+        fields = [(column, pa.string()) for column in TEXT_COLUMNS]
+        fields.append(("authors", pa.list_(pa.string())))
+        fields.extend((column, pa.string()) for column in JSON_COLUMNS + ["extra", "manifest_key", "fingerprint"])
+        fields.append(("deleted", pa.bool_()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _read_jsonl(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _latest(self):
+        """
+        Return {paper_id: sequence of the part holding its latest row}, without deleted papers.
+        Only the paper_id and deleted columns are read from Parquet parts.
+        """
+        latest = {}
+        for seq, _, path in self._parts():
+            if path.endswith(".parquet"):
+                _, pq = _pyarrow()
+                table = pq.read_table(path, columns=["paper_id", "deleted"])
+                rows = zip(table.column("paper_id").to_pylist(), table.column("deleted").to_pylist())
+            else:
+                rows = ((row["paper_id"], row["deleted"]) for row in self._read_jsonl(path))
+            for paper_id, deleted in rows:
+                latest[paper_id] = None if deleted else seq
+        return {paper_id: seq for paper_id, seq in latest.items() if seq is not None}
+
+    def read(self, sources=None, since=None, before=None):
+        """
+        Stream the latest version of the stored papers, optionally filtered.
+
+        Args:
+            sources (list): Only papers of these sources (whole directories are skipped).
+            since (str): Only papers with date >= since (ISO date, e.g. '2024-01-01').
+            before (str): Only papers with date < before.
+
+        Yields:
+            tuple: (data, manifest key, fingerprint) for every paper.
+        """
+        latest = self._latest()
+        live_parts = set(latest.values())
+        filters = []
+        if since:
+            filters.append(("date", ">=", since))
+        if before:
+            filters.append(("date", "<", before))
+        for seq, _, path in self._parts(sources):
+            # Parts whose rows were all replaced or deleted later are not opened
+            if seq not in live_parts:
+                continue
+            if path.endswith(".parquet"):
+                _, pq = _pyarrow()
+                rows = pq.read_table(path, filters=filters or None).to_pylist()
+            else:
+                rows = (row for row in self._read_jsonl(path) if (not since or (row["date"] or "") >= since)
+                        and (not before or (row["date"] is not None and row["date"] < before)))
+            for row in rows:
+                if latest.get(row["paper_id"]) == seq:
+                    yield self._paper(row)
+
+    def compact(self):
+        """
+        Rewrite the latest version of every paper into new parts and delete the old ones
+        (drops replaced rows and tombstones).
+
+        Returns:
+            int: Number of papers kept.
+        """
+        old_parts = self._parts()
+        kept = 0
+        for data, key, fingerprint in self.read():
+            self.add(data, key, fingerprint)
+            kept += 1
+        self.flush()
+        for _, _, path in old_parts:
+            os.remove(path)
+        self.written -= kept
+        return kept
@@ -4,20 +4,152 @@ import os
 import time
 import json
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
 # Define the directory where HTML files and metadata will be stored
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'html_arxiv')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def scrape_arxiv(query="speech to text", max_results=50):
+# Base URL of the HTML rendering of arXiv papers (overridable, e.g. to test against a local stub server)
+ARXIV_HTML_BASE = "https://arxiv.org/html"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
     """
-    Search ArXiv for papers matching the query, download their HTML content, 
-    and save their metadata.
+    Thread-safe token bucket rate limiter.
+    
+    Tokens are refilled at `rate` per second up to `capacity`; every request
+    consumes one token and waits when the bucket is empty, so the overall request
+    rate stays bounded no matter how many downloads run concurrently.
+    """
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate (float): Tokens (requests) per second.
+            capacity (int): Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        
+    def acquire(self):
+        """
+        Block until a token is available and consume it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def make_session(pool_size):
+    """
+    Create a requests Session whose connection pool can serve `pool_size` concurrent downloads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch(session, url, bucket, retries=4, backoff=1.0, timeout=10):
+    """
+    GET a URL through the rate limiter, retrying with exponential backoff on
+    connection errors, 429 and 5xx responses (honouring Retry-After when present).
+    
+    Returns:
+        requests.Response: The last response received.
+    """
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, timeout=timeout)
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            continue
+            
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            retry_after = response.headers.get("Retry-After", "")
+            time.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt)
+            continue
+        return response
+
+def download_paper(session, bucket, paper, base_url=ARXIV_HTML_BASE, data_dir=DATA_DIR):
+    """
+    Download the HTML of a single paper and save it together with its metadata.
     
     Args:
-        query (str): The search query string.
-        max_results (int): Maximum number of results to fetch.
+        session (requests.Session): Pooled HTTP session.
+        bucket (TokenBucket): Shared rate limiter.
+        paper (dict): Paper metadata (id, title, authors, published, abstract, pdf_url).
+        base_url (str): Base URL of the HTML renderings.
+        data_dir (str): Output directory.
+        
+    Returns:
+        tuple: (downloaded, message)
+    """
+    paper_id = paper["id"]
+    
+    # Construct the URL for the HTML version of the paper (ArXiv vanity URL)
+    html_url = f"{base_url}/{paper_id}"
+    
+    try:
+        # Request the HTML content
+        response = fetch(session, html_url, bucket)
+        
+        # Check if request was successful and returned HTML content
+        if response.status_code == 200 and "text/html" in response.headers.get("Content-Type", ""):
+            # ArXiv often redirects '/html/paper_id' to '/abs/paper_id' if HTML is not available
+            if "abs/" in response.url:
+                return False, f"{paper_id}: HTML not found (redirected to abstract). Skipping."
+            
+            # --- Save HTML Content ---
+            filename = f"{paper_id}.html"
+            filepath = os.path.join(data_dir, filename)
+            
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(response.text)
+            
+            # --- Save Metadata (JSON) ---
+            meta_filename = f"{paper_id}_meta.json"
+            meta_filepath = os.path.join(data_dir, meta_filename)
+            
+            metadata = {
+                "id": paper_id,
+                "title": paper["title"],
+                "authors": paper["authors"],
+                "published": paper["published"],
+                "abstract": paper["abstract"],
+                "html_url": html_url,
+                "pdf_url": paper["pdf_url"]
+            }
+            
+            with open(meta_filepath, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=4)
+            
+            return True, f"{paper_id}: Downloaded {filename}"
+        return False, f"{paper_id}: HTML not found or error ({response.status_code})."
+    
+    except Exception as e:
+        return False, f"{paper_id}: Error downloading: {e}"
+
+def search_arxiv(query, max_results):
+    """
+    Search ArXiv for papers matching the query, yielding their metadata as plain dicts.
     """
     client = arxiv.Client()
     
@@ -27,72 +159,60 @@ def scrape_arxiv(query="speech to text", max_results=50):
         max_results=max_results,
         sort_by=arxiv.SortCriterion.Relevance
     )
+    
+    for result in client.results(search):
+        yield {
+            "id": result.get_short_id(),
+            "title": result.title,
+            "authors": [a.name for a in result.authors],
+            "published": result.published.isoformat(),
+            "abstract": result.summary,
+            "pdf_url": result.pdf_url
+        }
 
-    print(f"Searching for '{query}'...")
+def scrape_arxiv(query="speech to text", max_results=50, concurrency=4, rate=1.0,
+                 base_url=ARXIV_HTML_BASE, data_dir=DATA_DIR, papers=None):
+    """
+    Search ArXiv for papers matching the query, download their HTML content, 
+    and save their metadata.
+    
+    Downloads run concurrently on a pooled session while a shared token bucket
+    keeps the overall request rate polite.
+    
+    Args:
+        query (str): The search query string.
+        max_results (int): Maximum number of results to fetch.
+        concurrency (int): Number of concurrent downloads.
+        rate (float): Maximum HTML requests per second (across all downloads).
+        base_url (str): Base URL of the HTML renderings.
+        data_dir (str): Output directory.
+        papers (iterable): Paper metadata to download instead of searching ArXiv (e.g. for tests).
+    """
+    if papers is None:
+        print(f"Searching for '{query}'...")
+        papers = search_arxiv(query, max_results)
+    
+    session = make_session(concurrency)
+    bucket = TokenBucket(rate)
     
     count = 0
-    # Iterate through search results
-    for result in client.results(search):
-        paper_id = result.get_short_id()
-        
-        # Construct the URL for the HTML version of the paper (ArXiv vanity URL)
-        html_url = f"https://arxiv.org/html/{paper_id}"
-        
-        try:
-            print(f"Checking HTML for {paper_id}: {result.title[:50]}...")
-            
-            # Request the HTML content
-            response = requests.get(html_url, timeout=10)
-            
-            # Check if request was successful and returned HTML content
-            if response.status_code == 200 and "text/html" in response.headers.get("Content-Type", ""):
-                # ArXiv often redirects '/html/paper_id' to '/abs/paper_id' if HTML is not available
-                if "abs/" in response.url:
-                    print(f"  -> HTML not found (redirected to abstract). Skipping.")
-                    continue
-                
-                # --- Save HTML Content ---
-                filename = f"{paper_id}.html"
-                filepath = os.path.join(DATA_DIR, filename)
-                
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(response.text)
-                
-                # --- Save Metadata (JSON) ---
-                meta_filename = f"{paper_id}_meta.json"
-                meta_filepath = os.path.join(DATA_DIR, meta_filename)
-                
-                metadata = {
-                    "id": paper_id,
-                    "title": result.title,
-                    "authors": [a.name for a in result.authors],
-                    "published": result.published.isoformat(),
-                    "abstract": result.summary,
-                    "html_url": html_url,
-                    "pdf_url": result.pdf_url
-                }
-                
-                with open(meta_filepath, "w", encoding="utf-8") as f:
-                    json.dump(metadata, f, indent=4)
-                
-                print(f"  -> Downloaded {filename}")
-                count += 1
-                
-                # Respectful delay to avoid IP ban
-                time.sleep(1)
-            else:
-                print(f"  -> HTML not found or error ({response.status_code}).")
-        
-        except Exception as e:
-            print(f"  -> Error downloading {paper_id}: {e}")
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(download_paper, session, bucket, paper, base_url, data_dir) for paper in papers]
+        for future in as_completed(futures):
+            downloaded, message = future.result()
+            print(f"  -> {message}")
+            count += downloaded
 
     print(f"\nTotal downloaded for '{query}': {count}")
+    return count
 
 if __name__ == "__main__":
     # Command Line Interface for the scraper
     parser = argparse.ArgumentParser(description="Download ArXiv papers as HTML.")
     parser.add_argument("--query", type=str, default="speech to text", help="Search query")
     parser.add_argument("--max", type=int, default=50, help="Max results")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent downloads")
+    parser.add_argument("--rate", type=float, default=1.0, help="Max HTML requests per second")
     args = parser.parse_args()
     
-    scrape_arxiv(query=args.query, max_results=args.max)
+    scrape_arxiv(query=args.query, max_results=args.max, concurrency=args.concurrency, rate=args.rate)
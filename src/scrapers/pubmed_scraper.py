@@ -1,8 +1,10 @@
 import os
+import re
 import time
 import json
 import requests
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from Bio import Entrez
 from bs4 import BeautifulSoup
 
@@ -26,7 +28,209 @@ HEADERS = {
     "Cache-Control": "max-age=0",
 }
 
-def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500):
+# Boundaries of the <article> elements inside an efetch <pmc-articleset> response
+ARTICLE_START = re.compile(rb"<article[\s>]")
+ARTICLE_END = b"</article>"
+PMC_ID = re.compile(rb'<article-id pub-id-type="pmc(?:id)?">\s*(?:PMC)?(\d+)\s*</article-id>')
+
+def extract_metadata(xml_content, pmc_id):
+    """
+    Build the metadata dictionary saved in {pmc_id}_meta.json from the efetch XML.
+    
+    Args:
+        xml_content (str|bytes): The XML returned by Entrez.efetch for the article.
+        pmc_id (str): PMC ID of the article (e.g. "PMC12345").
+        
+    Returns:
+        dict: Metadata (id, title, authors, published, abstract, html_url, source).
+    """
+    soup = BeautifulSoup(xml_content, "xml")
+    
+    # Title
+    title_tag = soup.find("article-title")
+    title = title_tag.get_text(strip=True) if title_tag else f"Unknown Title ({pmc_id})"
+    
+    # Authors
+    authors = []
+    contrib_group = soup.find("contrib-group")
+    if contrib_group:
+        for contrib in contrib_group.find_all("contrib", {"contrib-type": "author"}):
+            name = contrib.find("name")
+            if name:
+                surname = name.find("surname")
+                given = name.find("given-names")
+                full_name = f"{given.get_text(strip=True) if given else ''} {surname.get_text(strip=True) if surname else ''}".strip()
+                if full_name:
+                    authors.append(full_name)
+    
+    # Abstract
+    abstract_tag = soup.find("abstract")
+    abstract = abstract_tag.get_text(separator=' ', strip=True) if abstract_tag else ""
+    
+    # Pub Date
+    pub_date = soup.find("pub-date", {"pub-type": "epub"}) or soup.find("pub-date", {"pub-type": "pmc-release"})
+    date_str = ""
+    if pub_date:
+        year = pub_date.find("year")
+        year_str = year.get_text(strip=True) if year else ""
+        month = pub_date.find("month")
+        month_str = month.get_text(strip=True) if month else "01"
+        day = pub_date.find("day")
+        day_str = day.get_text(strip=True) if day else "01"
+        if year_str:
+            date_str = f"{year_str}-{month_str.zfill(2)}-{day_str.zfill(2)}"
+
+    return {
+        "id": pmc_id,
+        "title": title,
+        "authors": authors,
+        "published": date_str,
+        "abstract": abstract,
+        "html_url": f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/",
+        "source": "pubmed"
+    }
+
+def save_metadata(metadata):
+    """
+    Write the {pmc_id}_meta.json file of an article.
+    """
+    meta_filepath = os.path.join(DATA_DIR_PM, f"{metadata['id']}_meta.json")
+    with open(meta_filepath, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4)
+
+def split_articleset(handle, chunk_size=1 << 16):
+    """
+    Split an efetch <pmc-articleset> response into its articles while reading it.
+    
+    The response is read in chunks and every article is yielded as soon as it is
+    complete, so only one article is held in memory. Each article is wrapped in the
+    same prologue (XML declaration, DOCTYPE, <pmc-articleset>) and epilogue as the
+    response, so that it is byte-for-byte what efetch returns when that article is
+    requested alone. The epilogue is known only at the end of the response: it is
+    yielded last, to be appended to the yielded articles.
+    
+    Args:
+        handle: File-like object returned by Entrez.efetch (text or bytes).
+        chunk_size (int): Size of each read.
+        
+    Yields:
+        tuple: ("article", prologue + article) for every article in response order,
+        then ("epilogue", bytes) once the response is read.
+    """
+    buffer = bytearray()
+    prologue = None
+    start = None
+    while True:
+        chunk = handle.read(chunk_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        buffer += chunk
+        
+        # Cut every complete <article>...</article> out of the buffer
+        while True:
+            if start is None:
+                match = ARTICLE_START.search(buffer)
+                if not match:
+                    break
+                start = match.start()
+            end = buffer.find(ARTICLE_END, start)
+            if end == -1:
+                break
+            if prologue is None:
+                prologue = bytes(buffer[:start])
+            end += len(ARTICLE_END)
+            yield "article", prologue + buffer[start:end]
+            del buffer[:end]
+            start = None
+        
+        if not chunk:
+            break
+            
+    yield "epilogue", bytes(buffer)
+
+def scrape_pubmed_batched(id_list, batch_size=50, workers=4):
+    """
+    Download articles with one efetch request per batch of IDs.
+    
+    Each <pmc-articleset> response is split into per-article XML files identical
+    to the ones of the per-ID mode, and the metadata files are built in a pool
+    of worker processes. Articles are written to .part files while the response is
+    read; once the batch is complete every XML file is moved in place right after
+    its metadata is saved, so an interrupted run never leaves an XML without its
+    _meta.json (which scrape_pubmed would skip forever).
+    
+    Args:
+        id_list (list): PMC IDs (with "PMC" prefix) to download.
+        batch_size (int): Number of articles per efetch request.
+        workers (int): Number of processes building the metadata.
+        
+    Returns:
+        int: Number of articles downloaded.
+    """
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(id_list), batch_size):
+            batch = id_list[i:i + batch_size]
+            print(f"  -> Fetching batch {i // batch_size + 1} ({len(batch)} articles)...")
+            requested = set(batch)
+            futures = {}
+            epilogue = None
+            try:
+                handle = Entrez.efetch(db="pmc", id=",".join(batch), rettype="full", retmode="xml")
+                for kind, content in split_articleset(handle):
+                    if kind == "epilogue":
+                        epilogue = content
+                        continue
+                    match = PMC_ID.search(content)
+                    pmc_id = f"PMC{match.group(1).decode()}" if match else None
+                    if pmc_id not in requested:
+                        print(f"  -> Skipping unexpected article in response ({pmc_id}).")
+                        continue
+                    requested.discard(pmc_id)
+                    
+                    # Save XML (completed with the epilogue once the response is read)
+                    with open(os.path.join(DATA_DIR_PM, f"{pmc_id}.xml.part"), "wb") as f:
+                        f.write(content)
+                    futures[pmc_id] = pool.submit(extract_metadata, content, pmc_id)
+                handle.close()
+            except Exception as e:
+                print(f"  -> Error: {e}")
+                
+            for pmc_id, future in futures.items():
+                part_path = os.path.join(DATA_DIR_PM, f"{pmc_id}.xml.part")
+                try:
+                    if epilogue is None:
+                        raise RuntimeError(f"incomplete efetch response, {pmc_id} not saved")
+                    metadata = future.result()
+                    with open(part_path, "ab") as f:
+                        f.write(epilogue)
+                    save_metadata(metadata)
+                    os.replace(part_path, os.path.join(DATA_DIR_PM, f"{pmc_id}.xml"))
+                    print(f"  -> Downloaded XML ({pmc_id}).")
+                    count += 1
+                except Exception as e:
+                    print(f"  -> Error: {e}")
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                
+            if epilogue is not None:
+                for pmc_id in sorted(requested):
+                    print(f"  -> Error: {pmc_id} missing from the efetch response.")
+                
+            # Politeness sleep
+            time.sleep(0.34)
+    return count
+
+def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500, batch_size=1, workers=4):
+    """
+    Search PubMed Central for Open Access articles and download their XML and metadata.
+    
+    Args:
+        query (str): The search query string.
+        max_results (int): Maximum number of results to fetch.
+        batch_size (int): Articles per efetch request (1 = one request per article).
+        workers (int): Processes building the metadata in batched mode.
+    """
     print(f"Searching PubMed (PMC) for: '{query}'...")
     
     # 1. Search in PMC (PubMed Central) for Open Access articles
@@ -45,6 +249,7 @@ def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500):
     print(f"Found {len(id_list)} articles.")
 
     count = 0
+    to_fetch = []
     for pmc_id_raw in id_list:
         # PMC IDs in search result usually are just numbers "12345", but URLs need "PMC12345"
         pmc_id = f"PMC{pmc_id_raw}" if not pmc_id_raw.startswith("PMC") else pmc_id_raw
@@ -56,6 +261,10 @@ def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500):
             print(f"  -> Already exists. Skipping.")
             count += 1
             continue
+            
+        if batch_size > 1:
+            to_fetch.append(pmc_id)
+            continue
 
         try:
             # 2. Download XML using Entrez API
@@ -73,55 +282,7 @@ def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500):
             
             # 3. Extract Basic Metadata
             # We parse the XML to get metadata
-            soup = BeautifulSoup(xml_content, "xml")
-            
-            # Title
-            title_tag = soup.find("article-title")
-            title = title_tag.get_text(strip=True) if title_tag else f"Unknown Title ({pmc_id})"
-            
-            # Authors
-            authors = []
-            contrib_group = soup.find("contrib-group")
-            if contrib_group:
-                for contrib in contrib_group.find_all("contrib", {"contrib-type": "author"}):
-                    name = contrib.find("name")
-                    if name:
-                        surname = name.find("surname")
-                        given = name.find("given-names")
-                        full_name = f"{given.get_text(strip=True) if given else ''} {surname.get_text(strip=True) if surname else ''}".strip()
-                        if full_name:
-                            authors.append(full_name)
-            
-            # Abstract
-            abstract_tag = soup.find("abstract")
-            abstract = abstract_tag.get_text(separator=' ', strip=True) if abstract_tag else ""
-            
-            # Pub Date
-            pub_date = soup.find("pub-date", {"pub-type": "epub"}) or soup.find("pub-date", {"pub-type": "pmc-release"})
-            date_str = ""
-            if pub_date:
-                year = pub_date.find("year")
-                year_str = year.get_text(strip=True) if year else ""
-                month = pub_date.find("month")
-                month_str = month.get_text(strip=True) if month else "01"
-                day = pub_date.find("day")
-                day_str = day.get_text(strip=True) if day else "01"
-                if year_str:
-                    date_str = f"{year_str}-{month_str.zfill(2)}-{day_str.zfill(2)}"
-
-            metadata = {
-                "id": pmc_id,
-                "title": title,
-                "authors": authors,
-                "published": date_str,
-                "abstract": abstract,
-                "html_url": f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/",
-                "source": "pubmed"
-            }
-            
-            meta_filepath = os.path.join(DATA_DIR_PM, f"{pmc_id}_meta.json")
-            with open(meta_filepath, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, indent=4)
+            save_metadata(extract_metadata(xml_content, pmc_id))
             
             print(f"  -> Downloaded XML.")
             count += 1
@@ -132,12 +293,17 @@ def scrape_pubmed(query="cancer risk AND coffee consumption", max_results=500):
         except Exception as e:
             print(f"  -> Error: {e}")
             
+    if to_fetch:
+        count += scrape_pubmed_batched(to_fetch, batch_size=batch_size, workers=workers)
+            
     print(f"Total downloaded: {count}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--query", type=str, default="cancer risk AND coffee consumption", help="Query")
     parser.add_argument("--max", type=int, default=500, help="Max results")
+    parser.add_argument("--batch-size", type=int, default=1, help="Articles per efetch request (default: 1, one request per article)")
+    parser.add_argument("--workers", type=int, default=4, help="Processes building the metadata in batched mode")
     args = parser.parse_args()
     
-    scrape_pubmed(query=args.query, max_results=args.max)
+    scrape_pubmed(query=args.query, max_results=args.max, batch_size=args.batch_size, workers=args.workers)
@@ -1,18 +1,24 @@
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, send_from_directory
 import sys
 import os
-import requests
-from elasticsearch import Elasticsearch
 
 # Ensure internal modules can be imported
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from search.search_engine import SearchEngine
+from search.search_engine import SearchEngine, DEFAULT_PAGE_SIZE
+from search.es_client import get_client
+from search.image_cache import ImageCache
+from search.stats_service import StatsService
+from indexing.asset_paths import ASSETS_DIR, prepare_figure
+from indexing.embeddings import Embedder
 
 app = Flask(__name__, template_folder='../ui/templates', static_folder='../ui/static')
 
-# Initialize Search Engine and Elasticsearch client
-engine = SearchEngine()
-es = Elasticsearch("http://localhost:9200")
+# Initialize Search Engine and Elasticsearch client (one pooled client shared by all request threads)
+es = get_client()
+# Query embeddings for mode=hybrid (the model is loaded by the first hybrid search)
+engine = SearchEngine(embedder=Embedder.from_env())
+image_cache = ImageCache.from_env()
+stats_service = StatsService(es)
 
 @app.route('/')
 def index():
@@ -25,25 +31,33 @@ def index():
 def stats():
     """
     API Endpoint to get current statistics of the corpus.
-    Returns the count of indexed Papers, Tables, and Figures.
+    Returns the count of indexed Papers, Tables, and Figures, and their breakdown by source
+    (one aggregation request, cached for a few seconds by StatsService).
     """
     try:
-        count_arts = es.count(index="articles")['count']
-        count_tabs = es.count(index="tables")['count']
-        count_figs = es.count(index="figures")['count']
-        return jsonify({
-            "papers": count_arts,
-            "tables": count_tabs,
-            "figures": count_figs
-        })
+        return jsonify(stats_service.get())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/cache')
+def cache_stats():
+    """
+    API Endpoint exposing the hit/miss counters of the search result cache.
+    """
+    if not engine.cache:
+        return jsonify({"enabled": False})
+    return jsonify(dict(engine.cache.stats(), enabled=True))
+
 @app.route('/api/search')
 def search():
     """
     API Endpoint to perform search operations.
     Accepts 'query' and 'index_type' as query parameters.
+    Paging: 'page' and 'page_size' for offset paging, 'deep=1' to start a cursor
+    scroll and 'cursor' for its next pages; 'mode=hybrid' adds semantic (embedding)
+    matching to the keyword search. The body is the list of hits; the
+    total and the next cursor are returned in the X-Total-Hits, X-Total-Relation
+    and X-Next-Cursor headers.
     """
     query = request.args.get('query', '')
     index_type = request.args.get('index_type', 'articles')
@@ -55,26 +69,32 @@ def search():
     # Map friendly name to index name if needed, but we use strict names in UI
     target_index = index_type.lower()
     
-    results = engine.search(index=target_index, query=query, filters={"source": source_type} if source_type != "all" else None)
+    try:
+        page = engine.search_page(
+            index=target_index,
+            query=query,
+            filters={"source": source_type} if source_type != "all" else None,
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor'),
+            deep=request.args.get('deep') == '1',
+            hybrid=request.args.get('mode') == 'hybrid'
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    results = page["hits"]
     
     # Post-process for Image URLs
     if target_index == 'figures':
         for hit in results:
-            src = hit['_source']
-            raw_url = src.get('url', '')
-            paper_id = src.get('paper_id')
-            
-            # FIX: Extractor blindly appended .jpg even if present, leading to .jpg.jpg
-            if raw_url.endswith('.jpg.jpg'):
-                src['url'] = raw_url[:-4]
-            elif raw_url.endswith('.png.jpg'): # Possible edge case
-                src['url'] = raw_url[:-4]
+            prepare_figure(hit['_source'], hit['_source'].get('paper_id'))
                 
-            # ArXiv Handling
-            if raw_url and not raw_url.startswith('http') and paper_id and not paper_id.startswith("PMC"):
-                 src['url'] = f"https://arxiv.org/html/{paper_id}/{raw_url}"
-                
-    return jsonify(results)
+    response = jsonify(results)
+    response.headers['X-Total-Hits'] = str(page["total"])
+    response.headers['X-Total-Relation'] = page["total_relation"]
+    if page["next_cursor"]:
+        response.headers['X-Next-Cursor'] = page["next_cursor"]
+    return response
 
 @app.route('/paper/<path:paper_id>')
 def paper_detail(paper_id):
@@ -82,53 +102,47 @@ def paper_detail(paper_id):
     Render a detail page for a specific paper.
     Fetches Paper Metadata, Tables, and Figures associated with the given paper_id.
     """
-    # Fetch paper details
-    res = es.search(index="articles", body={"query": {"term": {"_id": paper_id}}}, size=1)
-    if not res['hits']['hits']:
+    # Fetch paper, tables and figures in a single round trip
+    detail = engine.paper_detail(paper_id)
+    if detail is None:
         return "Paper not found", 404
     
-    paper = res['hits']['hits'][0]['_source']
+    paper = detail['paper']
     paper['id'] = paper_id
+    tables = detail['tables']
+    figures = detail['figures']
     
-    # Fetch associated tables
-    tables_res = es.search(index="tables", body={"query": {"term": {"paper_id": paper_id}}}, size=100)
-    tables = [t['_source'] for t in tables_res['hits']['hits']]
-    
-    # Fetch associated figures
-    figs_res = es.search(index="figures", body={"query": {"term": {"paper_id": paper_id}}}, size=100)
-    figures = [f['_source'] for f in figs_res['hits']['hits']]
-    
-    # Fix figure URLs for proxy use
+    # Fix figure URLs for proxy use (local copies are preferred by the template)
     for f in figures:
-        raw_url = f.get('url', '')
-        if raw_url and not raw_url.startswith('http'):
-            f['url'] = f"https://arxiv.org/html/{paper_id}/{raw_url}"
+        prepare_figure(f, paper_id)
 
     return render_template('paper_detail.html', paper=paper, tables=tables, figures=figures)
 
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    """
+    Serve figure images and thumbnails from the local asset store.
+    Files are content-addressed (never change), so browsers may cache them forever.
+    """
+    return send_from_directory(ASSETS_DIR, filename, max_age=31536000)
+
 @app.route('/api/image_proxy')
 def image_proxy():
     """
-    Proxy endpoint to fetch images from ArXiv. Only used if direct loading fails.
+    Proxy endpoint to fetch images from ArXiv/PubMed. Only used if direct loading fails.
+    Images are streamed to the browser and kept in a local on-disk cache (see ImageCache),
+    so each figure is downloaded from the original source only once.
     Note: ArXiv often blocks this, so UI fallback to 'View Source' is preferred.
     """
     url = request.args.get('url')
     if not url:
         return "Missing URL", 400
+    # Only the arXiv/NCBI figure hosts: the proxy is not a general-purpose fetcher
+    if not image_cache.allows(url):
+        return "URL not allowed", 403
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    
-    try:
-        resp = requests.get(url, headers=headers, stream=True, timeout=10)
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-        headers = [(name, value) for (name, value) in resp.raw.headers.items()
-                   if name.lower() not in excluded_headers]
-        
-        return Response(resp.content, resp.status_code, headers)
-    except Exception as e:
-        return str(e), 500
+    status, headers, body = image_cache.get(url, request.headers.get('If-None-Match'))
+    return Response(body, status, headers)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,161 @@
+import sys
+import os
+import contextlib
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route, Mount
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from search.search_engine import AsyncSearchEngine, DEFAULT_PAGE_SIZE
+from search.es_client import create_async_client
+from search.image_cache import AsyncImageCache
+from search.stats_service import AsyncStatsService
+from indexing.asset_paths import ASSETS_DIR, prepare_figure
+from indexing.embeddings import Embedder
+
+# ASGI variant of app.py: same routes and JSON, served by an asyncio event loop.
+# Run with: uvicorn search.asgi_app:app --app-dir src --port 8000
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ui', 'templates'))
+
+def int_arg(request, name, default):
+    """
+    Read an integer query parameter, falling back to the default if missing or invalid
+    (like Flask's request.args.get(name, default, type=int)).
+    """
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+async def index(request):
+    """
+    Render availability of the main search dashboard.
+    """
+    return templates.TemplateResponse(request, 'index.html')
+
+async def stats(request):
+    """
+    API Endpoint to get current statistics of the corpus (see app.stats).
+    """
+    try:
+        return JSONResponse(await request.app.state.stats_service.get())
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+async def cache_stats(request):
+    """
+    API Endpoint exposing the hit/miss counters of the search result cache.
+    """
+    engine = request.app.state.engine
+    if not engine.cache:
+        return JSONResponse({"enabled": False})
+    return JSONResponse(dict(engine.cache.stats(), enabled=True))
+
+async def search(request):
+    """
+    API Endpoint to perform search operations (see app.search for the parameters and headers).
+    """
+    query = request.query_params.get('query', '')
+    index_type = request.query_params.get('index_type', 'articles')
+    source_type = request.query_params.get('source_type', 'all')
+
+    if not query:
+        return JSONResponse([])
+
+    target_index = index_type.lower()
+
+    try:
+        page = await request.app.state.engine.search_page(
+            index=target_index,
+            query=query,
+            filters={"source": source_type} if source_type != "all" else None,
+            page=int_arg(request, 'page', 1),
+            page_size=int_arg(request, 'page_size', DEFAULT_PAGE_SIZE),
+            cursor=request.query_params.get('cursor'),
+            deep=request.query_params.get('deep') == '1',
+            hybrid=request.query_params.get('mode') == 'hybrid'
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    results = page["hits"]
+
+    # Post-process for Image URLs
+    if target_index == 'figures':
+        for hit in results:
+            prepare_figure(hit['_source'], hit['_source'].get('paper_id'))
+
+    headers = {'X-Total-Hits': str(page["total"]), 'X-Total-Relation': page["total_relation"]}
+    if page["next_cursor"]:
+        headers['X-Next-Cursor'] = page["next_cursor"]
+    return JSONResponse(results, headers=headers)
+
+async def paper_detail(request):
+    """
+    Render a detail page for a specific paper (see app.paper_detail).
+    """
+    paper_id = request.path_params['paper_id']
+    detail = await request.app.state.engine.paper_detail(paper_id)
+    if detail is None:
+        return PlainTextResponse("Paper not found", status_code=404)
+
+    paper = detail['paper']
+    paper['id'] = paper_id
+    figures = [prepare_figure(f, paper_id) for f in detail['figures']]
+    return templates.TemplateResponse(request, 'paper_detail.html',
+                                      {"paper": paper, "tables": detail['tables'], "figures": figures})
+
+async def image_proxy(request):
+    """
+    Proxy endpoint to fetch images from ArXiv/PubMed, through the on-disk image cache (see app.image_proxy).
+    """
+    url = request.query_params.get('url')
+    if not url:
+        return PlainTextResponse("Missing URL", status_code=400)
+    if not request.app.state.image_cache.allows(url):
+        return PlainTextResponse("URL not allowed", status_code=403)
+
+    status, headers, body = await request.app.state.image_cache.get(url, request.headers.get('If-None-Match'))
+    media_type = headers.pop("Content-Type", None)
+    return StreamingResponse(body, status_code=status, headers=headers, media_type=media_type)
+
+class AssetFiles(StaticFiles):
+    """
+    Local asset store files: content-addressed (never change), so browsers may cache them forever.
+    """
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000"
+        return response
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Async clients belong to the event loop of the server: create them at startup
+    es = create_async_client()
+    app.state.engine = AsyncSearchEngine(es=es, embedder=Embedder.from_env())
+    app.state.stats_service = AsyncStatsService(es)
+    app.state.image_cache = AsyncImageCache.from_env()
+    try:
+        yield
+    finally:
+        await app.state.image_cache.close()
+        await es.close()
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/api/stats', stats),
+        Route('/api/cache', cache_stats),
+        Route('/api/search', search),
+        Route('/paper/{paper_id:path}', paper_detail),
+        Route('/api/image_proxy', image_proxy),
+        Mount('/assets', app=AssetFiles(directory=ASSETS_DIR, check_dir=False))
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=8000)
@@ -5,7 +5,9 @@ import os
 # Ensure the 'src' directory is in the Python path so we can import internal modules
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from search.search_engine import SearchEngine
+from search.search_engine import SearchEngine, DEFAULT_PAGE_SIZE
+from indexing.index_manager import logical_index_name
+from indexing.embeddings import Embedder
 
 def main():
     """
@@ -16,25 +18,37 @@ def main():
     parser.add_argument("query", help="Search query (e.g., 'speech to text' or 'caption:result')")
     parser.add_argument("--index", help="Index to search: articles, tables, figures (default: all)", default="_all")
     parser.add_argument("--fields", help="Fields to search (comma separated)", default=None)
+    parser.add_argument("--page", type=int, default=1, help="Page number (offset paging, first 1000 results)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Results per page")
+    parser.add_argument("--deep", action="store_true", help="Start a cursor-based scroll (prints the cursor of the next page)")
+    parser.add_argument("--cursor", default=None, help="Cursor printed by a previous --deep search")
+    parser.add_argument("--hybrid", action="store_true", help="Combine keyword and semantic (embedding) search, first 100 results")
     
     args = parser.parse_args()
     
     # Initialize the search engine
-    engine = SearchEngine()
+    engine = SearchEngine(embedder=Embedder.from_env() if args.hybrid else None)
     fields = args.fields.split(",") if args.fields else None
     
     print(f"Searching for '{args.query}' in '{args.index}'...")
     
     # Perform Search
-    results = engine.search(index=args.index, query=args.query, fields=fields)
+    try:
+        page = engine.search_page(index=args.index, query=args.query, fields=fields, page=args.page,
+                                  page_size=args.page_size, cursor=args.cursor, deep=args.deep, hybrid=args.hybrid)
+    except ValueError as e:
+        parser.error(str(e))
+    results = page["hits"]
     
-    print(f"Found {len(results)} results.\n")
+    total = f"{'more than ' if page['total_relation'] == 'gte' else ''}{page['total']}"
+    print(f"Found {total} results (page {page['page']}, showing {len(results)}).\n")
     
     # Display Results
     for hit in results:
         source = hit['_source']
         score = hit['_score']
-        index = hit['_index']
+        # Concrete indices are versioned behind aliases (e.g. articles_v2)
+        index = logical_index_name(hit['_index'])
         
         print(f"[{index.upper()}] (Score: {score})")
         
@@ -59,6 +73,9 @@ def main():
                     print(f"  - {field}: {frag}")
         
         print("-" * 40)
+    
+    if page["next_cursor"]:
+        print(f"\nNext page: --cursor {page['next_cursor']}")
 
 if __name__ == "__main__":
     main()
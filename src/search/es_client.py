@@ -0,0 +1,110 @@
+import os
+import threading
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from search.local_backend import LocalClient, AsyncLocalClient, local_index_dir
+
+DEFAULT_HOSTS = "http://localhost:9200"
+# Search backends: an Elasticsearch cluster, or the embedded BM25 index (see local_backend)
+BACKENDS = ("elasticsearch", "local")
+
+# One client per process and configuration: Elasticsearch clients are thread-safe and
+# keep a pool of persistent connections, so sharing one avoids a new socket per request
+_clients = {}
+_lock = threading.Lock()
+
+def client_options(hosts=None):
+    """
+    Return the Elasticsearch client options configured through environment variables.
+
+    SCISEARCH_ES_HOSTS        comma-separated node URLs (default http://localhost:9200)
+    SCISEARCH_ES_POOL_SIZE    connections kept alive per node (default 25)
+    SCISEARCH_ES_TIMEOUT      request timeout in seconds (default 30)
+    SCISEARCH_ES_RETRIES      retries on connection errors, timeouts and 429/502/503/504 (default 3)
+    SCISEARCH_ES_COMPRESS     gzip request bodies: 1/0 (default 0)
+    SCISEARCH_ES_SNIFF        discover the other nodes of the cluster: 1/0 (default 0)
+    SCISEARCH_ES_API_KEY      API key, if the cluster requires authentication
+
+    Args:
+        hosts (str | list): Node URL(s), overriding SCISEARCH_ES_HOSTS.
+
+    Returns:
+        dict: Keyword arguments for Elasticsearch().
+    """
+    env = os.environ
+    if hosts is None:
+        hosts = env.get("SCISEARCH_ES_HOSTS", DEFAULT_HOSTS)
+    if isinstance(hosts, str):
+        hosts = [host.strip() for host in hosts.split(",") if host.strip()]
+
+    options = {
+        "hosts": hosts,
+        "connections_per_node": int(env.get("SCISEARCH_ES_POOL_SIZE", 25)),
+        "request_timeout": float(env.get("SCISEARCH_ES_TIMEOUT", 30)),
+        "max_retries": int(env.get("SCISEARCH_ES_RETRIES", 3)),
+        "retry_on_timeout": True,
+        "retry_on_status": (429, 502, 503, 504),
+        "http_compress": env.get("SCISEARCH_ES_COMPRESS", "0") == "1"
+    }
+    if env.get("SCISEARCH_ES_SNIFF", "0") == "1":
+        options.update(sniff_on_start=True, sniff_on_node_failure=True, min_delay_between_sniffing=60)
+    if env.get("SCISEARCH_ES_API_KEY"):
+        options["api_key"] = env["SCISEARCH_ES_API_KEY"]
+    return options
+
+def backend_name():
+    """
+    Return the configured search backend (SCISEARCH_BACKEND: 'elasticsearch' or 'local').
+    """
+    backend = os.environ.get("SCISEARCH_BACKEND", "elasticsearch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown SCISEARCH_BACKEND '{backend}', expected one of {list(BACKENDS)}")
+    return backend
+
+def get_client(hosts=None):
+    """
+    Return the shared Elasticsearch client of this process, creating it on first use.
+
+    With SCISEARCH_BACKEND=local, the client is the embedded LocalClient over
+    SCISEARCH_LOCAL_INDEX_DIR instead, and no server is needed.
+
+    Args:
+        hosts (str | list): Node URL(s); None uses SCISEARCH_ES_HOSTS.
+
+    Returns:
+        Elasticsearch | LocalClient: The client (the same instance for the same configuration).
+    """
+    if backend_name() == "local":
+        key = (os.getpid(), "local", local_index_dir())
+        with _lock:
+            if key not in _clients:
+                _clients[key] = LocalClient(key[2])
+            return _clients[key]
+
+    options = client_options(hosts)
+    # Connections must not be shared with a forked child: key by process as well
+    key = (os.getpid(), repr(sorted(options.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = Elasticsearch(**options)
+            _clients[key] = client
+        return client
+
+def create_async_client(hosts=None):
+    """
+    Create an AsyncElasticsearch client with the same options as get_client().
+
+    Async clients are bound to the event loop they are used in, so they are not shared:
+    create one per loop (e.g. in the startup of the ASGI application) and close it on shutdown.
+    Requires the aiohttp package. With SCISEARCH_BACKEND=local, the client wraps the
+    embedded LocalClient.
+
+    Args:
+        hosts (str | list): Node URL(s); None uses SCISEARCH_ES_HOSTS.
+
+    Returns:
+        AsyncElasticsearch | AsyncLocalClient: A new client.
+    """
+    if backend_name() == "local":
+        return AsyncLocalClient(get_client())
+    return AsyncElasticsearch(**client_options(hosts))
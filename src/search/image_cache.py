@@ -0,0 +1,532 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+import tempfile
+import threading
+import requests
+from urllib.parse import urlsplit, urljoin
+from email.utils import formatdate
+from requests.adapters import HTTPAdapter
+
+IMAGE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'image_cache')
+
+# arXiv/NCBI reject the default python-requests User-Agent
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+CHUNK_SIZE = 64 * 1024
+# Larger images are streamed through but not stored
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Hosts of the figure URLs produced by the Extractor (subdomains included): the proxy fetches nothing else
+ALLOWED_HOSTS = ("arxiv.org", "ncbi.nlm.nih.gov")
+# Redirects are followed by hand, so that every hop is checked against the allowed hosts
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+class ImageCache:
+    """
+    Streaming HTTP proxy for figure images, backed by a size-bounded on-disk cache.
+
+    Every URL is stored as a body file plus a small JSON metadata file (upstream ETag
+    and Last-Modified, content type, digest). A cached copy is served from disk while
+    it is younger than `max_age`; afterwards it is revalidated with a conditional GET,
+    and kept (serving it stale) if the upstream server fails. When the cache grows over
+    `max_bytes`, the least recently used entries are evicted.
+
+    Only URLs of `allowed_hosts` are fetched (redirect targets included), and only
+    `image/*` responses are served and stored, so the proxy cannot be used to fetch or
+    persist arbitrary content.
+    """
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_bytes=512 * 1024 * 1024, max_age=86400, session=None,
+                 pool_size=16, timeout=10, allowed_hosts=ALLOWED_HOSTS):
+        """
+        Initialize the ImageCache.
+
+        Args:
+            cache_dir (str): Directory of the cache.
+            max_bytes (int): Maximum total size of the cached bodies.
+            max_age (int): Seconds a cached image is served without revalidation
+                           (also sent to browsers in Cache-Control).
+            session (requests.Session): HTTP session (default: a pooled session with a browser User-Agent).
+            pool_size (int): Connections kept alive per host by the default session.
+            timeout (int): Upstream request timeout in seconds.
+            allowed_hosts (tuple): Hosts (and their subdomains) images may be fetched from.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.allowed_hosts = tuple(allowed_hosts)
+        self.session = self._make_session() if session is None else session
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache configured through environment variables:
+        SCISEARCH_IMAGE_CACHE_DIR, SCISEARCH_IMAGE_CACHE_MB and SCISEARCH_IMAGE_CACHE_MAX_AGE.
+        """
+        return cls(
+            cache_dir=os.environ.get("SCISEARCH_IMAGE_CACHE_DIR", IMAGE_CACHE_DIR),
+            max_bytes=int(os.environ.get("SCISEARCH_IMAGE_CACHE_MB", 512)) * 1024 * 1024,
+            max_age=int(os.environ.get("SCISEARCH_IMAGE_CACHE_MAX_AGE", 86400))
+        )
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def allows(self, url):
+        """
+        Return True if `url` is an http(s) URL of one of the allowed hosts.
+        """
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+        host = (parts.hostname or "").lower()
+        return parts.scheme in ("http", "https") and any(host == h or host.endswith(f".{h}") for h in self.allowed_hosts)
+
+    def _next_hop(self, url, status, upstream_headers):
+        """
+        Return the URL an upstream response redirects to, or None if it is not a redirect.
+
+        Raises:
+            PermissionError: If the redirect leaves the allowed hosts.
+        """
+        location = upstream_headers.get("Location")
+        if status not in REDIRECT_STATUSES or not location:
+            return None
+        target = urljoin(url, location)
+        if not self.allows(target):
+            raise PermissionError(f"Redirected to a host that is not allowed: {target}")
+        return target
+
+    @staticmethod
+    def _rejected(upstream_headers):
+        """
+        Check an upstream 200 response before it is streamed.
+
+        Returns:
+            tuple: (status, headers, body) of the error to send, or None if the response is an image.
+        """
+        if not (upstream_headers.get("Content-Type") or "").lower().startswith("image/"):
+            return 502, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [b"The upstream response is not an image"]
+        return None
+
+
+    @staticmethod
+    def _storable(upstream_headers):
+        """
+        Return False if the announced size of the response exceeds MAX_IMAGE_BYTES.
+        """
+        length = upstream_headers.get("Content-Length")
+        return not (length and length.isdigit() and int(length) > MAX_IMAGE_BYTES)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, key), os.path.join(directory, f"{key}.json")
+
+    def _entries(self):
+        """
+        Yield (body path, size, last access time) of every cached body.
+        """
+        for directory, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json') or name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _load_meta(self, meta_path, body_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    def _write_meta(self, meta_path, meta):
+        # Temporary files start with '.' so that _entries() never counts them
+        tmp_path = os.path.join(os.path.dirname(meta_path), f".{os.path.basename(meta_path)}.{threading.get_ident()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _evict(self):
+        """
+        Remove the least recently used entries until the cache is 10% under its limit.
+        """
+        with self.lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                for stale in (path, f"{path}.json"):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+            self.size = total
+
+    def _headers(self, meta):
+        """
+        Headers sent to the browser for a cached (or being cached) image.
+        """
+        headers = {
+            "Content-Type": meta.get("content_type") or "application/octet-stream",
+            "Cache-Control": f"public, max-age={self.max_age}"
+        }
+        if meta.get("digest"):
+            headers["ETag"] = f'"{meta["digest"]}"'
+        if meta.get("last_modified"):
+            headers["Last-Modified"] = meta["last_modified"]
+        if meta.get("size") is not None:
+            headers["Content-Length"] = str(meta["size"])
+        return headers
+
+    def _serve_file(self, body_path, meta, if_none_match):
+        """
+        Serve a cached body, or 304 if the browser already has this version.
+
+        Returns:
+            tuple: (status, headers, body), or None if the entry was evicted meanwhile.
+        """
+        headers = self._headers(meta)
+        try:
+            # Opened right away: a concurrent eviction cannot truncate the response
+            f = open(body_path, 'rb')
+            # Touch the body: its mtime is the LRU clock
+            os.utime(body_path)
+        except FileNotFoundError:
+            return None
+        if if_none_match and headers.get("ETag") in [tag.strip() for tag in if_none_match.split(',')]:
+            f.close()
+            headers.pop("Content-Length", None)
+            return 304, headers, []
+
+        def body():
+            with f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    yield block
+        return 200, headers, body()
+
+    @staticmethod
+    def _conditional_headers(meta):
+        """
+        Headers revalidating a stale cached copy with the upstream server.
+        """
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _upstream_meta(self, url, upstream_headers):
+        """
+        Return (metadata to store, headers for the browser) of an upstream 200 response.
+        """
+        meta = {
+            "url": url,
+            "content_type": upstream_headers.get("Content-Type"),
+            "etag": upstream_headers.get("ETag"),
+            "last_modified": upstream_headers.get("Last-Modified") or formatdate(usegmt=True),
+            "fetched": time.time()
+        }
+        headers = {
+            "Content-Type": meta["content_type"] or "application/octet-stream",
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Last-Modified": meta["last_modified"]
+        }
+        # HTTP clients decode gzip/deflate bodies: the upstream length is only valid without encoding
+        if upstream_headers.get("Content-Length") and not upstream_headers.get("Content-Encoding"):
+            headers["Content-Length"] = upstream_headers["Content-Length"]
+        return meta, headers
+
+    def _open_tmp(self, body_path):
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), prefix='.')
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def _commit(self, tmp_path, body_path, meta_path, meta, digest, size):
+        """
+        Move a completely received body into place and record it.
+
+        Returns:
+            bool: True if the cache is now over its size limit.
+        """
+        with self.lock:
+            # A revalidated entry replaces its previous body: only the difference is added
+            try:
+                replaced = os.path.getsize(body_path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, body_path)
+            self.size += size - replaced
+        self._write_meta(meta_path, dict(meta, digest=digest.hexdigest()[:32], size=size))
+        return self.size > self.max_bytes
+
+    def _stream_and_store(self, resp, body_path, meta_path):
+        """
+        Stream an upstream 200 response to the client while writing it to the cache.
+
+        The body is written to a temporary file and moved into place only when it has
+        been received entirely, so an aborted download never leaves a truncated image.
+        """
+        meta, headers = self._upstream_meta(resp.url, resp.headers)
+        store = self._storable(resp.headers)
+
+        def body():
+            nonlocal store
+            f, tmp_path = self._open_tmp(body_path) if store else (None, None)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                for block in resp.iter_content(CHUNK_SIZE):
+                    size += len(block)
+                    if store and size > MAX_IMAGE_BYTES:
+                        store = False
+                        f.close()
+                    if store:
+                        f.write(block)
+                        digest.update(block)
+                    yield block
+                if store:
+                    f.close()
+                    if self._commit(tmp_path, body_path, meta_path, meta, digest, size):
+                        self._evict()
+            finally:
+                resp.close()
+                if f is not None:
+                    f.close()
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return 200, headers, body()
+
+    def _fetch(self, url, request_headers):
+        """
+        GET an upstream URL, following at most MAX_REDIRECTS redirects within the allowed hosts.
+
+        Raises:
+            PermissionError: If a redirect leaves the allowed hosts.
+            requests.TooManyRedirects: If there are more than MAX_REDIRECTS redirects.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout, allow_redirects=False)
+            try:
+                url = self._next_hop(url, resp.status_code, resp.headers)
+            except PermissionError:
+                resp.close()
+                raise
+            if url is None:
+                return resp
+            resp.close()
+        raise requests.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+
+    def get(self, url, if_none_match=None):
+        """
+        Return an image, from the cache when possible.
+
+        Args:
+            url (str): Upstream image URL.
+            if_none_match (str): If-None-Match header sent by the browser, if any.
+
+        Returns:
+            tuple: (status, headers, body) where body is an iterable of byte chunks,
+                   ready to be wrapped in a streaming HTTP response.
+        """
+        if not self.allows(url):
+            return 403, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [b"URL not allowed"]
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path, body_path)
+
+        if meta and time.time() - meta["fetched"] < self.max_age:
+            served = self._serve_file(body_path, meta, if_none_match)
+            if served:
+                return served
+            meta = None
+
+        # Missing or stale: (conditional) request to the upstream server
+        request_headers = self._conditional_headers(meta)
+        try:
+            resp = self._fetch(url, request_headers)
+        except PermissionError as e:
+            return 403, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [str(e).encode('utf-8')]
+        except requests.RequestException as e:
+            served = meta and self._serve_file(body_path, meta, if_none_match)
+            if served:
+                print(f"Image upstream error, serving stale copy of {url}: {e}")
+                return served
+            return 502, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [str(e).encode('utf-8')]
+
+        if resp.status_code == 304 and meta:
+            resp.close()
+            meta["fetched"] = time.time()
+            self._write_meta(meta_path, meta)
+            served = self._serve_file(body_path, meta, if_none_match)
+            if served:
+                return served
+            # Evicted while revalidating: download it again
+            return self.get(url, if_none_match)
+        if resp.status_code == 200:
+            rejected = self._rejected(resp.headers)
+            if rejected:
+                resp.close()
+                return rejected
+            return self._stream_and_store(resp, body_path, meta_path)
+
+        # Upstream errors are passed through and never cached
+        content = resp.content
+        resp.close()
+        served = meta and resp.status_code >= 500 and self._serve_file(body_path, meta, if_none_match)
+        if served:
+            return served
+        return resp.status_code, {"Content-Type": resp.headers.get("Content-Type", "text/plain"), "Cache-Control": "no-store"}, [content]
+
+
+class AsyncImageCache(ImageCache):
+    """
+    ImageCache for asyncio servers (see asgi_app.py).
+
+    Same disk layout, freshness and eviction policy as ImageCache (the two can share a
+    cache directory); upstream requests are made with aiohttp, so a slow image server
+    does not hold a thread. The aiohttp session is created on first use, inside the
+    running event loop: call close() on shutdown.
+    """
+    def _make_session(self):
+        return None
+
+    def _client(self):
+        import aiohttp
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                headers={"User-Agent": USER_AGENT},
+                # No total timeout: large images may take longer than `timeout` to stream
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+            )
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _stream_and_store(self, resp, body_path, meta_path):
+        meta, headers = self._upstream_meta(str(resp.url), resp.headers)
+        store = self._storable(resp.headers)
+
+        async def body():
+            nonlocal store
+            f, tmp_path = self._open_tmp(body_path) if store else (None, None)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async for block in resp.content.iter_chunked(CHUNK_SIZE):
+                    size += len(block)
+                    if store and size > MAX_IMAGE_BYTES:
+                        store = False
+                        f.close()
+                    if store:
+                        f.write(block)
+                        digest.update(block)
+                    yield block
+                if store:
+                    f.close()
+                    if self._commit(tmp_path, body_path, meta_path, meta, digest, size):
+                        # Walking the cache directory is slow: keep it off the event loop
+                        await asyncio.to_thread(self._evict)
+            finally:
+                resp.release()
+                if f is not None:
+                    f.close()
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return 200, headers, body()
+
+    async def _fetch(self, url, request_headers):
+        """
+        Async version of ImageCache._fetch.
+        """
+        import aiohttp
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = await self._client().get(url, headers=request_headers, allow_redirects=False)
+            try:
+                url = self._next_hop(url, resp.status, resp.headers)
+            except PermissionError:
+                resp.release()
+                raise
+            if url is None:
+                return resp
+            resp.release()
+        raise aiohttp.TooManyRedirects(resp.request_info, resp.history, message=f"More than {MAX_REDIRECTS} redirects")
+
+    async def get(self, url, if_none_match=None):
+        """
+        Async version of ImageCache.get.
+
+        Returns:
+            tuple: (status, headers, body) where body is an iterable (cached copies) or an
+                   async iterable (upstream downloads) of byte chunks.
+        """
+        import aiohttp
+        if not self.allows(url):
+            return 403, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [b"URL not allowed"]
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path, body_path)
+
+        if meta and time.time() - meta["fetched"] < self.max_age:
+            served = self._serve_file(body_path, meta, if_none_match)
+            if served:
+                return served
+            meta = None
+
+        request_headers = self._conditional_headers(meta)
+        try:
+            resp = await self._fetch(url, request_headers)
+        except PermissionError as e:
+            return 403, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [str(e).encode('utf-8')]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            served = meta and self._serve_file(body_path, meta, if_none_match)
+            if served:
+                print(f"Image upstream error, serving stale copy of {url}: {e}")
+                return served
+            return 502, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, [str(e).encode('utf-8')]
+
+        if resp.status == 304 and meta:
+            resp.release()
+            meta["fetched"] = time.time()
+            self._write_meta(meta_path, meta)
+            served = self._serve_file(body_path, meta, if_none_match)
+            if served:
+                return served
+            return await self.get(url, if_none_match)
+        if resp.status == 200:
+            rejected = self._rejected(resp.headers)
+            if rejected:
+                resp.release()
+                return rejected
+            return self._stream_and_store(resp, body_path, meta_path)
+
+        content = await resp.read()
+        resp.release()
+        served = meta and resp.status >= 500 and self._serve_file(body_path, meta, if_none_match)
+        if served:
+            return served
+        return resp.status, {"Content-Type": resp.headers.get("Content-Type", "text/plain"), "Cache-Control": "no-store"}, [content]
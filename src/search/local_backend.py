@@ -0,0 +1,1263 @@
+import os
+import re
+import json
+import math
+import mmap
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+import fnmatch
+import threading
+from functools import lru_cache
+from collections import Counter
+import numpy as np
+
+LOCAL_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'local_index')
+
+# Okapi BM25 parameters (the Elasticsearch defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Default of track_total_hits in Elasticsearch: totals above it are reported as 'gte'
+TOTAL_HITS_LIMIT = 10000
+# Maximum number of vocabulary terms a prefix query (e.g. 'neur*') expands to
+MAX_EXPANSIONS = 1024
+
+# Rough equivalent of the standard analyzer: unicode word characters, lowercased
+WORD = re.compile(r"\w+")
+FIELD_PREFIX = re.compile(r"([\w.]+):(?=\S)")
+QUERY_WORD = re.compile(r'[^\s()"]+')
+# Lucene boost after a term, phrase or group: speech^2, "speech synthesis"^1.5, (a OR b)^3
+BOOST = re.compile(r"\^(\d+(?:\.\d+)?)")
+BOOST_SUFFIX = re.compile(r"\^(\d+(?:\.\d+)?)$")
+OPERATORS = {"AND": "AND", "&&": "AND", "OR": "OR", "||": "OR", "NOT": "NOT"}
+
+class LocalIndexError(Exception):
+    """
+    Error of the embedded backend (missing index, unsupported query...), the
+    equivalent of an Elasticsearch error response.
+    """
+
+def local_index_dir():
+    """
+    Return the directory of the embedded backend (SCISEARCH_LOCAL_INDEX_DIR, default data/local_index).
+    """
+    return os.environ.get("SCISEARCH_LOCAL_INDEX_DIR", LOCAL_INDEX_DIR)
+
+def analyze(text):
+    """
+    Split a text into lowercase terms.
+    """
+    return WORD.findall(text.lower()) if text else []
+
+def field_values(value):
+    """
+    Return the values of a (possibly multi-valued) field as a list of strings.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value if v is not None]
+    return [str(value)]
+
+def field_terms(value, field_type):
+    """
+    Return the indexed terms of a field value: analyzed text, or exact keyword values.
+    """
+    if field_type == "keyword":
+        return field_values(value)
+    return [term for text in field_values(value) for term in analyze(text)]
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # Empty arrays cannot be memory-mapped
+        return np.load(path)
+
+def _seconds(keep_alive):
+    """
+    Convert an Elasticsearch time value ('30s', '2m', '1h') into seconds.
+    """
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+    match = re.fullmatch(r"(\d+)(ms|s|m|h|d)", str(keep_alive or "1m"))
+    if not match:
+        raise LocalIndexError(f"Invalid keep_alive '{keep_alive}'")
+    return int(match.group(1)) * units[match.group(2)]
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+# --- query_string parsing ---
+
+def _lex(query):
+    """
+    Split a query_string into (kind, value) tokens: WORD/PHRASE (field, text),
+    FIELD (field name before a group), AND, OR, NOT, '(' and ')', and BOOST (factor)
+    after the term, phrase or group it applies to.
+    """
+    tokens = []
+    i = 0
+
+    def boost(position):
+        match = BOOST.match(query, position)
+        if not match:
+            return position
+        tokens.append(("BOOST", float(match.group(1))))
+        return match.end()
+
+    while i < len(query):
+        char = query[i]
+        if char.isspace():
+            i += 1
+            continue
+        if char in "()":
+            tokens.append((char, None))
+            i += 1
+            if char == ")":
+                i = boost(i)
+            continue
+        if char in "+-!" and i + 1 < len(query) and not query[i + 1].isspace():
+            # '+term' is implied by the AND default operator; '-term' and '!term' exclude
+            if char != "+":
+                tokens.append(("NOT", None))
+            i += 1
+            continue
+        field = None
+        match = FIELD_PREFIX.match(query, i)
+        if match:
+            field = match.group(1)
+            i = match.end()
+        if query[i] == '"':
+            end = query.find('"', i + 1)
+            end = len(query) if end == -1 else end
+            tokens.append(("PHRASE", (field, query[i + 1:end])))
+            i = boost(end + 1)
+            continue
+        if field and query[i] == "(":
+            tokens.append(("FIELD", field))
+            continue
+        word = QUERY_WORD.match(query, i).group(0)
+        i += len(word)
+        if field is None and word in OPERATORS:
+            tokens.append((OPERATORS[word], None))
+            continue
+        factor = BOOST_SUFFIX.search(word)
+        if factor and factor.start() > 0:
+            word = word[:factor.start()]
+        tokens.append(("WORD", (field, word)))
+        if factor and factor.start() > 0:
+            tokens.append(("BOOST", float(factor.group(1))))
+    return tokens
+
+class QueryStringParser:
+    """
+    Recursive descent parser for the subset of the Lucene query syntax used by the UIs:
+    terms, "phrases", prefix*, field:term, field:(group), AND/OR/NOT (&&, ||, !, -),
+    parentheses, boosts (term^2, "phrase"^2, (group)^2) and the default operator between
+    adjacent clauses.
+
+    The result is a tree of tuples: ("term", field, word), ("phrase", field, text),
+    ("prefix", field, text), ("all",), ("and", [nodes]), ("or", [nodes]), ("not", node),
+    ("boost", factor, node).
+    """
+    UNIT_START = ("WORD", "PHRASE", "FIELD", "(", "NOT")
+
+    def __init__(self, query, default_and=True):
+        self.tokens = _lex(query)
+        self.position = 0
+        self.default_and = default_and
+
+    def _peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self._or(None)
+        # Stray closing parentheses: keep parsing what follows
+        while self._peek() is not None:
+            self._next()
+            rest = self._or(None)
+            node = self._combine("and" if self.default_and else "or", [node, rest])
+        return node
+
+    @staticmethod
+    def _combine(kind, nodes):
+        nodes = [node for node in nodes if node is not None]
+        if not nodes:
+            return None
+        return nodes[0] if len(nodes) == 1 else (kind, nodes)
+
+    def _or(self, field):
+        nodes = [self._and(field)]
+        while self._peek() == "OR" or (not self.default_and and self._peek() in self.UNIT_START):
+            if self._peek() == "OR":
+                self._next()
+            nodes.append(self._and(field))
+        return self._combine("or", nodes)
+
+    def _and(self, field):
+        nodes = [self._unary(field)]
+        while self._peek() == "AND" or (self.default_and and self._peek() in self.UNIT_START):
+            if self._peek() == "AND":
+                self._next()
+            nodes.append(self._unary(field))
+        return self._combine("and", nodes)
+
+    def _unary(self, field):
+        node = self._unit(field)
+        if self._peek() == "BOOST":
+            factor = self._next()[1]
+            if node is not None and node[0] not in ("not", "all"):
+                node = ("boost", factor, node)
+        return node
+
+    def _unit(self, field):
+        kind = self._peek()
+        if kind is None or kind == ")":
+            return None
+        kind, value = self._next()
+        if kind == "NOT":
+            child = self._unary(field)
+            return ("not", child) if child else None
+        if kind in ("(", "FIELD"):
+            if kind == "FIELD":
+                field = value
+                self._next()  # '('
+            node = self._or(field)
+            if self._peek() == ")":
+                self._next()
+            return node
+        if kind == "PHRASE":
+            return ("phrase", value[0] or field, value[1])
+        if kind == "WORD":
+            word_field, word = value
+            word_field = word_field or field
+            if word == "*":
+                return ("all",)
+            if word.endswith("*") and len(word) > 1:
+                return ("prefix", word_field, word.rstrip("*"))
+            return ("term", word_field, word)
+        # Operator without operands (e.g. a leading AND)
+        return None
+
+@lru_cache(maxsize=1024)
+def parse_query_string(query, default_and=True):
+    """
+    Parse a query_string (cached: the same query is evaluated on several indices and highlighted).
+    """
+    return QueryStringParser(query, default_and).parse()
+
+# --- Index writing ---
+
+class LocalStore:
+    """
+    Document store and index builder of the embedded search backend.
+
+    Documents live in a SQLite database, the source of truth for incremental indexing.
+    commit() rebuilds the BM25 index of every changed index into a new generation
+    directory and then switches its CURRENT pointer atomically, so readers (LocalClient)
+    never see a half-written index. A generation holds, for every searchable field,
+    the postings (document numbers and term frequencies, grouped by term), the field
+    lengths and the term dictionary, plus the documents themselves: all the arrays
+    are NumPy files that readers memory-map.
+    """
+    def __init__(self, root=None):
+        """
+        Initialize the LocalStore.
+
+        Args:
+            root (str): Directory of the embedded backend (default: local_index_dir()).
+        """
+        self.root = root or local_index_dir()
+        os.makedirs(self.root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.root, 'store.sqlite'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS mappings (index_name TEXT PRIMARY KEY, mapping TEXT NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "index_name TEXT NOT NULL, doc_id TEXT NOT NULL, source TEXT NOT NULL, PRIMARY KEY (index_name, doc_id))"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.dirty = set()
+
+    def mapping(self, index_name):
+        """
+        Return the mapping an index was created with, or None if it does not exist.
+        """
+        row = self.conn.execute("SELECT mapping FROM mappings WHERE index_name = ?", (index_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_mapping(self, index_name, mapping):
+        """
+        Create an index, or change its mapping (the index is rebuilt at the next commit).
+
+        Returns:
+            bool: True if the index was created or its mapping changed.
+        """
+        if self.mapping(index_name) == mapping and os.path.exists(os.path.join(self.root, index_name, 'CURRENT')):
+            return False
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO mappings VALUES (?, ?)", (index_name, json.dumps(mapping)))
+            self.conn.commit()
+            self.dirty.add(index_name)
+        return True
+
+    def put(self, index_name, doc_id, source):
+        """
+        Add or replace a document (visible to searches after commit).
+
+        Returns:
+            bool: True if the document is new, False if it replaced an existing one.
+        """
+        with self.lock:
+            if index_name not in self.dirty and self.mapping(index_name) is None:
+                raise LocalIndexError(f"no such index [{index_name}]")
+            exists = self.conn.execute(
+                "SELECT 1 FROM documents WHERE index_name = ? AND doc_id = ?", (index_name, doc_id)
+            ).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?)", (index_name, doc_id, json.dumps(source)))
+            self.dirty.add(index_name)
+        return exists is None
+
+    def delete(self, index_name, doc_ids):
+        """
+        Delete documents by ID (missing ones are ignored).
+
+        Returns:
+            int: Number of documents deleted.
+        """
+        with self.lock:
+            cursor = self.conn.executemany(
+                "DELETE FROM documents WHERE index_name = ? AND doc_id = ?", [(index_name, doc_id) for doc_id in doc_ids]
+            )
+            if cursor.rowcount:
+                self.dirty.add(index_name)
+            return cursor.rowcount
+
+    def existing(self, index_name, doc_ids):
+        """
+        Return how many of the given document IDs are stored in an index.
+        """
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        row = self.conn.execute(
+            f"SELECT COUNT(*) FROM documents WHERE index_name = ? AND doc_id IN ({','.join('?' * len(doc_ids))})",
+            [index_name] + doc_ids
+        ).fetchone()
+        return row[0]
+
+    def children(self, index_name, paper_id):
+        """
+        Return the IDs of the documents of an index belonging to a paper.
+        """
+        rows = self.conn.execute(
+            "SELECT doc_id FROM documents WHERE index_name = ? AND json_extract(source, '$.paper_id') = ?",
+            (index_name, paper_id)
+        )
+        return [row[0] for row in rows]
+
+    def flush(self):
+        """
+        Commit the pending document writes to SQLite (without rebuilding the indices).
+        """
+        with self.lock:
+            self.conn.commit()
+
+    def commit(self, index_names=None):
+        """
+        Rebuild the indices changed since the last commit (or the given ones).
+
+        Returns:
+            list: Names of the rebuilt indices.
+        """
+        self.flush()
+        with self.lock:
+            targets = sorted(self.dirty if index_names is None else index_names)
+            self.dirty.difference_update(targets)
+        for index_name in targets:
+            self.build(index_name)
+        return targets
+
+    def build(self, index_name):
+        """
+        Write a new generation of an index from the documents in the store and make it current.
+        """
+        mapping = self.mapping(index_name)
+        if mapping is None:
+            raise LocalIndexError(f"no such index [{index_name}]")
+        properties = mapping.get("mappings", {}).get("properties", {})
+        fields = {
+            name: spec["type"] for name, spec in properties.items()
+            if spec.get("type") in ("text", "keyword") and spec.get("index", True)
+        }
+        vector_fields = {name: spec["dims"] for name, spec in properties.items() if spec.get("type") == "dense_vector"}
+
+        index_dir = os.path.join(self.root, index_name)
+        generation = f"gen-{time.time_ns()}"
+        path = os.path.join(index_dir, generation)
+        os.makedirs(path)
+
+        ids = []
+        offsets = [0]
+        # Per field: term -> term number, and per-document chunks of (term number, document number, frequency)
+        terms = {field: {} for field in fields}
+        chunks = {field: ([], [], []) for field in fields}
+        lengths = {field: [] for field in fields}
+        vectors = {field: [] for field in vector_fields}
+        rows = self.conn.execute("SELECT doc_id, source FROM documents WHERE index_name = ? ORDER BY doc_id", (index_name,))
+        with open(os.path.join(path, 'sources.jsonl'), 'wb') as out:
+            for docno, (doc_id, raw) in enumerate(rows):
+                ids.append(doc_id)
+                line = raw.encode('utf-8') + b"\n"
+                out.write(line)
+                offsets.append(offsets[-1] + len(line))
+                source = json.loads(raw)
+                for field, dims in vector_fields.items():
+                    value = source.get(field)
+                    vectors[field].append(value if isinstance(value, list) and len(value) == dims else None)
+                for field, field_type in fields.items():
+                    counts = Counter(field_terms(source.get(field), field_type))
+                    lengths[field].append(sum(counts.values()))
+                    if not counts:
+                        continue
+                    vocabulary = terms[field]
+                    term_ids, docnos, tfs = chunks[field]
+                    term_ids.append(np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in counts), np.int32, len(counts)))
+                    docnos.append(np.full(len(counts), docno, np.int32))
+                    tfs.append(np.fromiter(counts.values(), np.float32, len(counts)))
+
+        meta_fields = {}
+        for field, field_type in fields.items():
+            term_ids, docnos, tfs = (np.concatenate(c) if c else np.empty(0, dtype) for c, dtype in zip(chunks[field], (np.int32, np.int32, np.float32)))
+            # Group the postings by term; the stable sort keeps document numbers ascending
+            order = np.argsort(term_ids, kind="stable")
+            df = np.bincount(term_ids, minlength=len(terms[field]))
+            starts = np.concatenate(([0], np.cumsum(df)[:-1])).astype(np.int64)
+            field_lengths = np.array(lengths[field], dtype=np.int32)
+            np.save(os.path.join(path, f"{field}.docs.npy"), docnos[order])
+            np.save(os.path.join(path, f"{field}.tfs.npy"), tfs[order])
+            np.save(os.path.join(path, f"{field}.lengths.npy"), field_lengths)
+            with open(os.path.join(path, f"{field}.terms.json"), 'w', encoding='utf-8') as f:
+                json.dump({term: [int(starts[n]), int(df[n])] for term, n in terms[field].items()}, f)
+            with_field = int(np.count_nonzero(field_lengths))
+            meta_fields[field] = {
+                "type": field_type,
+                "docs_with_field": with_field,
+                "avg_length": float(field_lengths.sum()) / with_field if with_field else 0.0
+            }
+
+        meta_vectors = {}
+        for field, dims in vector_fields.items():
+            # Normalized rows (cosine similarity = dot product); documents without a vector get zeros
+            matrix = np.zeros((len(ids), dims), dtype=np.float32)
+            present = np.array([value is not None for value in vectors[field]], dtype=bool)
+            if present.any():
+                matrix[present] = np.array([value for value in vectors[field] if value is not None], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+            np.save(os.path.join(path, f"{field}.vectors.npy"), matrix)
+            np.save(os.path.join(path, f"{field}.present.npy"), present & (norms[:, 0] > 0))
+            meta_vectors[field] = {"dims": dims, "docs_with_field": int(present.sum())}
+
+        np.save(os.path.join(path, 'offsets.npy'), np.array(offsets, dtype=np.int64))
+        with open(os.path.join(path, 'ids.json'), 'w', encoding='utf-8') as f:
+            json.dump(ids, f)
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({"index": index_name, "mapping": mapping, "doc_count": len(ids), "fields": meta_fields, "vectors": meta_vectors}, f)
+
+        # Switch readers to the new generation, then drop the older ones (the previous
+        # generation is kept: searches and points-in-time may still be reading it)
+        current_path = os.path.join(index_dir, 'CURRENT')
+        previous = None
+        if os.path.exists(current_path):
+            with open(current_path, 'r', encoding='utf-8') as f:
+                previous = f.read().strip()
+        tmp_path = os.path.join(index_dir, '.CURRENT.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(generation)
+        os.replace(tmp_path, current_path)
+        for name in os.listdir(index_dir):
+            if name.startswith("gen-") and name not in (generation, previous):
+                shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+        print(f"Local index {index_name}: {len(ids)} documents ({generation})")
+
+# --- Index reading ---
+
+class LocalIndex:
+    """
+    Read-only view of one generation of a local index, with BM25 scoring.
+
+    Postings, term frequencies, field lengths and document offsets are memory-mapped:
+    opening an index is cheap and the pages are shared between processes through the
+    OS page cache. Term dictionaries are loaded on the first query on each field.
+    """
+    def __init__(self, name, path):
+        """
+        Initialize the LocalIndex.
+
+        Args:
+            name (str): Name of the index.
+            path (str): Directory of the generation.
+        """
+        self.name = name
+        self.path = path
+        self.generation = os.path.basename(path)
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.mapping = meta["mapping"]
+        self.doc_count = meta["doc_count"]
+        self.fields = meta["fields"]
+        self.vector_fields = meta.get("vectors", {})
+        with open(os.path.join(path, 'ids.json'), 'r', encoding='utf-8') as f:
+            self.ids = json.load(f)
+        self.docnos = {doc_id: docno for docno, doc_id in enumerate(self.ids)}
+        self.offsets = _load_array(os.path.join(path, 'offsets.npy'))
+        with open(os.path.join(path, 'sources.jsonl'), 'rb') as f:
+            self.sources = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+        self.lock = threading.Lock()
+        self.postings = {}
+
+    def _field(self, field):
+        data = self.postings.get(field)
+        if data is None:
+            with self.lock:
+                with open(os.path.join(self.path, f"{field}.terms.json"), 'r', encoding='utf-8') as f:
+                    terms = json.load(f)
+                data = {
+                    "terms": terms,
+                    "docs": _load_array(os.path.join(self.path, f"{field}.docs.npy")),
+                    "tfs": _load_array(os.path.join(self.path, f"{field}.tfs.npy")),
+                    "lengths": _load_array(os.path.join(self.path, f"{field}.lengths.npy"))
+                }
+                self.postings[field] = data
+        return data
+
+    def _vectors(self, field):
+        data = self.postings.get((field, "vectors"))
+        if data is None:
+            with self.lock:
+                data = (_load_array(os.path.join(self.path, f"{field}.vectors.npy")),
+                        _load_array(os.path.join(self.path, f"{field}.present.npy")))
+                self.postings[field, "vectors"] = data
+        return data
+
+    def knn(self, spec):
+        """
+        Evaluate the candidates of a kNN clause ({"field", "query_vector", "filter"}) exactly,
+        by brute force over the normalized vectors of the field.
+
+        Returns:
+            tuple: (mask of the documents with a vector that pass the filter, cosine scores
+                    as Elasticsearch reports them: (1 + cosine) / 2).
+        """
+        mask, scores = self._empty()
+        field = spec["field"]
+        if field not in self.vector_fields or not self.doc_count:
+            return mask, scores
+        query = np.asarray(spec["query_vector"], dtype=np.float32)
+        if query.shape != (self.vector_fields[field]["dims"],):
+            raise LocalIndexError(f"The query vector has {query.size} dimensions, [{field}] has {self.vector_fields[field]['dims']}")
+        norm = np.linalg.norm(query)
+        if not norm:
+            return mask, scores
+        vectors, present = self._vectors(field)
+        mask = np.array(present, dtype=bool)
+        for clause in _as_list(spec.get("filter")):
+            mask &= self.evaluate(clause)[0]
+        scores = (1 + vectors @ (query / norm)) / 2
+        return mask, np.where(mask, scores, 0.0)
+
+    def source(self, docno):
+        """
+        Return the stored _source of a document.
+        """
+        return json.loads(self.sources[self.offsets[docno]:self.offsets[docno + 1]])
+
+    def _empty(self):
+        return np.zeros(self.doc_count, dtype=bool), np.zeros(self.doc_count)
+
+    def _term(self, field, term, boost=1.0):
+        """
+        Return (mask, BM25 scores) of the documents containing a term in a field.
+        """
+        mask, scores = self._empty()
+        info = self.fields.get(field)
+        if info is None:
+            return mask, scores
+        data = self._field(field)
+        entry = data["terms"].get(term)
+        if entry is None:
+            return mask, scores
+        start, df = entry
+        docs = np.asarray(data["docs"][start:start + df])
+        tfs = np.asarray(data["tfs"][start:start + df], dtype=np.float64)
+        idf = math.log(1 + (info["docs_with_field"] - df + 0.5) / (df + 0.5))
+        if info["type"] == "text":
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * data["lengths"][docs] / info["avg_length"])
+        else:
+            norms = BM25_K1
+        mask[docs] = True
+        scores[docs] = boost * idf * tfs / (tfs + norms)
+        return mask, scores
+
+    def _prefix(self, field, prefix, boost=1.0):
+        """
+        Constant-score match of the terms of a field starting with a prefix.
+        """
+        mask, scores = self._empty()
+        info = self.fields.get(field)
+        if info is None:
+            return mask, scores
+        if info["type"] == "text":
+            prefix = prefix.lower()
+        data = self._field(field)
+        expansions = [entry for term, entry in data["terms"].items() if term.startswith(prefix)][:MAX_EXPANSIONS]
+        for start, df in expansions:
+            mask[data["docs"][start:start + df]] = True
+        scores[mask] = boost
+        return mask, scores
+
+    def resolve_fields(self, patterns):
+        """
+        Expand query_string field patterns ('title^3', '*', 'ca*') into [(field, boost)].
+        """
+        resolved = {}
+        for pattern in patterns:
+            name, _, boost = pattern.partition("^")
+            for field in self.fields:
+                if fnmatch.fnmatchcase(field, name):
+                    resolved[field] = max(resolved.get(field, 0.0), float(boost or 1))
+        return list(resolved.items())
+
+    def _dis_max(self, results):
+        """
+        Combine per-field matches the way query_string does across fields: a document
+        matches if any field does, and scores as its best field.
+        """
+        mask, scores = self._empty()
+        for field_mask, field_scores in results:
+            mask |= field_mask
+            np.maximum(scores, field_scores, out=scores)
+        return mask, scores
+
+    def _node(self, node, fields):
+        """
+        Evaluate a parsed query_string node on the default fields [(field, boost)].
+        """
+        kind = node[0]
+        if kind == "all":
+            return np.ones(self.doc_count, dtype=bool), np.ones(self.doc_count)
+        if kind in ("and", "or"):
+            positive = [child for child in node[1] if child[0] != "not"]
+            negative = [child[1] for child in node[1] if child[0] == "not"]
+            if positive:
+                results = [self._node(child, fields) for child in positive]
+                mask = np.logical_and.reduce([m for m, _ in results]) if kind == "and" else np.logical_or.reduce([m for m, _ in results])
+                scores = np.sum([s for _, s in results], axis=0)
+            else:
+                mask, scores = np.ones(self.doc_count, dtype=bool), np.zeros(self.doc_count)
+            for child in negative:
+                mask &= ~self._node(child, fields)[0]
+            return mask, np.where(mask, scores, 0.0)
+        if kind == "not":
+            return ~self._node(node[1], fields)[0], np.zeros(self.doc_count)
+        if kind == "boost":
+            mask, scores = self._node(node[2], fields)
+            return mask, scores * node[1]
+
+        field, text = node[1], node[2]
+        targets = [(field, 1.0)] if field else fields
+        if kind == "prefix":
+            return self._dis_max(self._prefix(f, text, boost) for f, boost in targets)
+        results = []
+        for f, boost in targets:
+            info = self.fields.get(f)
+            if info is None:
+                continue
+            if info["type"] == "keyword":
+                if kind == "term":
+                    results.append(self._term(f, text, boost))
+                continue
+            # Multi-term words and phrases: all the terms in the same field (positions are
+            # not indexed, so phrases match their terms in any order)
+            terms = analyze(text)
+            if not terms:
+                continue
+            matches = [self._term(f, term, boost) for term in terms]
+            mask = np.logical_and.reduce([m for m, _ in matches])
+            results.append((mask, np.where(mask, np.sum([s for _, s in matches], axis=0), 0.0)))
+        return self._dis_max(results)
+
+    def evaluate(self, query):
+        """
+        Evaluate an Elasticsearch query (match_all, bool, query_string, term, terms, ids, match).
+
+        Returns:
+            tuple: (boolean mask of the matching documents, scores) over all the documents of the index.
+        """
+        if not query:
+            return np.ones(self.doc_count, dtype=bool), np.ones(self.doc_count)
+        (kind, spec), = query.items()
+        if kind == "match_all":
+            return np.ones(self.doc_count, dtype=bool), np.ones(self.doc_count)
+        if kind == "bool":
+            mask, scores = np.ones(self.doc_count, dtype=bool), np.zeros(self.doc_count)
+            required = _as_list(spec.get("must")) + _as_list(spec.get("filter"))
+            for clause in _as_list(spec.get("must")):
+                clause_mask, clause_scores = self.evaluate(clause)
+                mask &= clause_mask
+                scores += clause_scores
+            for clause in _as_list(spec.get("filter")):
+                mask &= self.evaluate(clause)[0]
+            should = _as_list(spec.get("should"))
+            if should:
+                any_mask = np.zeros(self.doc_count, dtype=bool)
+                for clause in should:
+                    clause_mask, clause_scores = self.evaluate(clause)
+                    any_mask |= clause_mask
+                    scores += clause_scores
+                if not required or spec.get("minimum_should_match"):
+                    mask &= any_mask
+            for clause in _as_list(spec.get("must_not")):
+                mask &= ~self.evaluate(clause)[0]
+            return mask, np.where(mask, scores, 0.0)
+        if kind == "query_string":
+            node = parse_query_string(spec.get("query", ""), spec.get("default_operator", "OR").upper() == "AND")
+            if node is None:
+                return self._empty()
+            return self._node(node, self.resolve_fields(spec.get("fields") or ["*"]))
+        if kind in ("term", "terms"):
+            (field, value), = ((f, v) for f, v in spec.items() if f != "boost")
+            if kind == "term":
+                values = [value.get("value") if isinstance(value, dict) else value]
+            else:
+                values = value
+            return self._dis_max(self._term(field, str(v)) for v in values)
+        if kind == "ids":
+            mask, scores = self._empty()
+            docnos = [self.docnos[i] for i in spec.get("values", []) if i in self.docnos]
+            mask[docnos] = True
+            scores[docnos] = 1.0
+            return mask, scores
+        if kind == "match":
+            (field, value), = spec.items()
+            text = value.get("query", "") if isinstance(value, dict) else value
+            results = [self._term(field, term) for term in analyze(str(text))]
+            if not results:
+                return self._empty()
+            return np.logical_or.reduce([m for m, _ in results]), np.sum([s for _, s in results], axis=0)
+        raise LocalIndexError(f"Unsupported query [{kind}]")
+
+    def query_terms(self, query, terms=None):
+        """
+        Collect the terms a query looks for, for highlighting.
+
+        Returns:
+            dict: {field or None (any field): {"terms": set, "prefixes": set}}
+        """
+        terms = {} if terms is None else terms
+
+        def add(field, key, values):
+            terms.setdefault(field, {"terms": set(), "prefixes": set()})[key].update(values)
+
+        def walk(node):
+            if node is None or node[0] in ("all", "not"):
+                return
+            if node[0] in ("and", "or"):
+                for child in node[1]:
+                    walk(child)
+            elif node[0] == "boost":
+                walk(node[2])
+            elif node[0] == "prefix":
+                add(node[1], "prefixes", [node[2].lower()])
+            else:
+                add(node[1], "terms", analyze(node[2]))
+
+        if not query:
+            return terms
+        (kind, spec), = query.items()
+        if kind == "bool":
+            for clause in _as_list(spec.get("must")) + _as_list(spec.get("should")):
+                self.query_terms(clause, terms)
+        elif kind == "query_string":
+            walk(parse_query_string(spec.get("query", ""), spec.get("default_operator", "OR").upper() == "AND"))
+        elif kind == "match":
+            (field, value), = spec.items()
+            add(field, "terms", analyze(str(value.get("query", "") if isinstance(value, dict) else value)))
+        return terms
+
+    def highlight(self, source, spec, terms):
+        """
+        Build the 'highlight' section of a hit: fragments of the text fields with the
+        query terms wrapped in tags (like the unified highlighter, on sentence-less fragments).
+        """
+        requested = spec.get("fields", {})
+        if isinstance(requested, list):
+            requested = {name: options for item in requested for name, options in item.items()}
+        text_fields = [f for f, info in self.fields.items() if info["type"] == "text"]
+        names = text_fields if "*" in requested else [f for f in requested if f in text_fields]
+        result = {}
+        for field in names:
+            options = dict(spec, **(requested.get(field) or requested.get("*") or {}))
+            wanted = {"terms": set(), "prefixes": set()}
+            for key in (field, None):
+                for kind in wanted:
+                    wanted[kind] |= terms.get(key, {}).get(kind, set())
+            if not wanted["terms"] and not wanted["prefixes"]:
+                continue
+            fragments = []
+            count = options.get("number_of_fragments", 5)
+            for text in field_values(source.get(field)):
+                limit = options.get("max_analyzed_offset")
+                fragments.extend(highlight_text(
+                    text[:limit] if limit else text, wanted["terms"], tuple(wanted["prefixes"]),
+                    options.get("fragment_size", 100), count,
+                    _as_list(options.get("pre_tags", "<em>"))[0], _as_list(options.get("post_tags", "</em>"))[0]
+                ))
+                if count and len(fragments) >= count:
+                    break
+            if fragments:
+                result[field] = fragments[:count] if count else fragments
+        return result
+
+    def keyword_masks(self, field, mask):
+        """
+        Yield (value, mask of the matching documents with that value) for a keyword field.
+        """
+        if field not in self.fields or self.fields[field]["type"] != "keyword":
+            raise LocalIndexError(f"Field [{field}] of [{self.name}] is not a keyword field")
+        data = self._field(field)
+        for value, (start, df) in data["terms"].items():
+            docs = np.asarray(data["docs"][start:start + df])
+            selected = docs[mask[docs]]
+            if len(selected):
+                value_mask = np.zeros(self.doc_count, dtype=bool)
+                value_mask[selected] = True
+                yield value, value_mask
+
+def highlight_text(text, terms, prefixes, fragment_size, count, pre_tag, post_tag):
+    """
+    Return up to `count` fragments of a text (all of it if count is 0) around the words
+    matching the query terms, with the matches wrapped in pre_tag/post_tag.
+    """
+    matches = []
+    for match in WORD.finditer(text):
+        word = match.group(0).lower()
+        if word in terms or (prefixes and word.startswith(prefixes)):
+            matches.append(match.span())
+    if not matches:
+        return []
+    if not count:
+        fragment_size = len(text)
+
+    fragments = []
+    i = 0
+    while i < len(matches) and (not count or len(fragments) < count):
+        first = matches[i][0]
+        # Start a little before the first match and cut on whitespace
+        start = 0 if not count else max(0, first - fragment_size // 4)
+        if start:
+            space = text.find(" ", start, first)
+            start = space + 1 if space != -1 else start
+        end = min(len(text), start + fragment_size)
+        if end < len(text):
+            space = text.rfind(" ", matches[i][1], end)
+            end = space if space != -1 else end
+        end = max(end, matches[i][1])
+        pieces = []
+        position = start
+        while i < len(matches) and matches[i][1] <= end:
+            match_start, match_end = matches[i]
+            pieces.append(text[position:match_start])
+            pieces.append(f"{pre_tag}{text[match_start:match_end]}{post_tag}")
+            position = match_end
+            i += 1
+        pieces.append(text[position:end])
+        fragments.append("".join(pieces).strip())
+    return fragments
+
+def _filter_source(source, spec):
+    """
+    Apply a _source filter (False, a field list, or {"includes", "excludes"}).
+    """
+    if spec is None or spec is True:
+        return source
+    if isinstance(spec, (str, list)):
+        spec = {"includes": _as_list(spec)}
+    includes = _as_list(spec.get("includes"))
+    excludes = _as_list(spec.get("excludes"))
+    return {
+        key: value for key, value in source.items()
+        if (not includes or any(fnmatch.fnmatchcase(key, p) for p in includes))
+        and not any(fnmatch.fnmatchcase(key, p) for p in excludes)
+    }
+
+class LocalIndices:
+    """
+    The 'indices' namespace of LocalClient.
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def exists(self, index, **kwargs):
+        try:
+            return bool(self.client._resolve(index))
+        except LocalIndexError:
+            return False
+
+    def get_mapping(self, index=None, **kwargs):
+        return {reader.name: {"mappings": reader.mapping.get("mappings", {})} for reader in self.client._resolve(index)}
+
+    def refresh(self, index=None, **kwargs):
+        # Commits (LocalStore.commit) are immediately visible
+        return {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+
+class LocalClient:
+    """
+    Embedded replacement of the Elasticsearch client (SCISEARCH_BACKEND=local).
+
+    Implements the part of the client API used by SearchEngine, StatsService, the CLI and
+    the UIs on top of the indices written by LocalStore, with Elasticsearch-shaped
+    responses: search (match_all/bool/query_string/term/terms/ids/match queries, from/size,
+    sort on _score/_doc/_shard_doc, search_after, highlighting, _source filtering, terms
+    aggregations, points-in-time and scroll), msearch, count, get_mapping and ping.
+    kNN clauses on dense_vector fields are answered exactly (brute force) instead of
+    through an HNSW graph: the corpus of a local index fits in memory.
+
+    Scores follow Elasticsearch: BM25 per field, best field per term for multi-field
+    query_string, summed over the terms; query_string keeps AND/OR/NOT semantics.
+    """
+    def __init__(self, root=None):
+        """
+        Initialize the LocalClient.
+
+        Args:
+            root (str): Directory of the embedded backend (default: local_index_dir()).
+        """
+        self.root = root or local_index_dir()
+        self.indices = LocalIndices(self)
+        self.lock = threading.Lock()
+        self.readers = {}
+        # Points-in-time and scrolls: id -> context dict with an 'expires' time
+        self.contexts = {}
+
+    def _names(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, 'CURRENT')))
+
+    def _reader(self, name):
+        """
+        Return the current generation of an index (reopened after each commit), or None.
+        """
+        try:
+            with open(os.path.join(self.root, name, 'CURRENT'), 'r', encoding='utf-8') as f:
+                generation = f.read().strip()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        with self.lock:
+            reader = self.readers.get(name)
+            if reader is None or reader.generation != generation:
+                reader = LocalIndex(name, os.path.join(self.root, name, generation))
+                self.readers[name] = reader
+            return reader
+
+    def _resolve(self, index, ignore_unavailable=False):
+        """
+        Return the readers of an index expression ('articles', 'tables,figures', '_all', 'fig*').
+        """
+        if index in (None, "", "_all", "*"):
+            names = self._names()
+        else:
+            names = []
+            for name in (index if isinstance(index, list) else index.split(",")):
+                name = name.strip()
+                if "*" in name:
+                    names.extend(n for n in self._names() if fnmatch.fnmatchcase(n, name))
+                elif self._reader(name) is not None or not ignore_unavailable:
+                    names.append(name)
+        readers = []
+        for name in dict.fromkeys(names):
+            reader = self._reader(name)
+            if reader is None:
+                raise LocalIndexError(f"no such index [{name}]")
+            readers.append(reader)
+        return readers
+
+    def _context(self, context_id):
+        now = time.time()
+        with self.lock:
+            for key in [k for k, c in self.contexts.items() if c["expires"] < now]:
+                del self.contexts[key]
+            context = self.contexts.get(context_id)
+        if context is None:
+            raise LocalIndexError(f"No search context found for id [{context_id}]")
+        return context
+
+    def _execute(self, readers, request, paginate=True):
+        query = request.get("query")
+        sort = [s if isinstance(s, dict) else {s: "asc" if s != "_score" else "desc"} for s in _as_list(request.get("sort"))]
+        keys = []
+        for spec in sort or [{"_score": "desc"}, {"_shard_doc": "asc"}]:
+            (field, order), = spec.items()
+            order = order.get("order", "asc") if isinstance(order, dict) else order
+            if field not in ("_score", "_doc", "_shard_doc"):
+                raise LocalIndexError(f"Unsupported sort field [{field}]")
+            keys.append(("_score" if field == "_score" else "_shard_doc", order == "desc"))
+
+        knn = request.get("knn")
+        knn_results = self._knn(readers, knn) if knn else None
+        matched = []
+        positions, docnos, scores = [], [], []
+        for position, reader in enumerate(readers):
+            if knn and query is None:
+                mask, reader_scores = knn_results[position]
+            else:
+                mask, reader_scores = reader.evaluate(query)
+                if knn:
+                    # Like Elasticsearch: the union of both, with the scores summed
+                    knn_mask, knn_scores = knn_results[position]
+                    mask = mask | knn_mask
+                    reader_scores = np.where(mask, reader_scores, 0.0) + knn_scores
+            matched.append((reader, mask))
+            hits = np.flatnonzero(mask)
+            positions.append(np.full(len(hits), position, dtype=np.int64))
+            docnos.append(hits)
+            scores.append(reader_scores[hits])
+        positions = np.concatenate(positions) if positions else np.empty(0, np.int64)
+        docnos = np.concatenate(docnos) if docnos else np.empty(0, np.int64)
+        scores = np.concatenate(scores) if scores else np.empty(0)
+        # Elasticsearch's _shard_doc: a unique, index-then-document ordinal
+        shard_docs = (positions << 32) | docnos
+        total = len(docnos)
+        values = {"_score": scores, "_shard_doc": shard_docs}
+
+        if request.get("search_after"):
+            after = np.zeros(total, dtype=bool)
+            equal = np.ones(total, dtype=bool)
+            for (key, descending), value in zip(keys, request["search_after"]):
+                column = values[key]
+                after |= equal & ((column < value) if descending else (column > value))
+                equal &= column == value
+            selected = np.flatnonzero(after)
+        else:
+            selected = np.arange(total)
+        order = selected[np.lexsort([-values[k][selected] if d else values[k][selected] for k, d in reversed(keys)])]
+        if paginate:
+            offset = request.get("from", 0)
+            order = order[offset:offset + request.get("size", 10)]
+
+        hits = []
+        highlight = request.get("highlight")
+        highlight_terms = {}
+        for n in order:
+            reader = readers[positions[n]]
+            source = reader.source(docnos[n])
+            hit = {"_index": reader.name, "_id": reader.ids[docnos[n]], "_score": float(scores[n])}
+            if request.get("_source", True) is not False:
+                hit["_source"] = _filter_source(source, request.get("_source"))
+            if highlight:
+                if reader.name not in highlight_terms:
+                    highlight_terms[reader.name] = reader.query_terms(query)
+                fragments = reader.highlight(source, highlight, highlight_terms[reader.name])
+                if fragments:
+                    hit["highlight"] = fragments
+            if sort:
+                hit["sort"] = [float(scores[n]) if k == "_score" else int(shard_docs[n]) for k, _ in keys]
+            hits.append(hit)
+
+        response = {
+            "timed_out": False,
+            "_shards": {"total": len(readers), "successful": len(readers), "skipped": 0, "failed": 0},
+            "hits": {"max_score": float(scores.max()) if total else None, "hits": hits}
+        }
+        track = request.get("track_total_hits", TOTAL_HITS_LIMIT)
+        if track is not False:
+            limit = total if track is True else int(track)
+            response["hits"]["total"] = {"value": min(total, limit), "relation": "eq" if total <= limit else "gte"}
+        aggs = request.get("aggs") or request.get("aggregations")
+        if aggs:
+            response["aggregations"] = {name: self._aggregate(spec, matched) for name, spec in aggs.items()}
+        return response
+
+    def _knn(self, readers, spec):
+        """
+        Return the (mask, scores) of the k nearest neighbours of a kNN clause in each reader
+        (k over all the readers, as Elasticsearch does across shards).
+        """
+        results = [reader.knn(spec) for reader in readers]
+        candidates = np.concatenate([scores[mask] for mask, scores in results]) if results else np.empty(0)
+        k = spec.get("k", 10)
+        if len(candidates) > k:
+            threshold = np.partition(candidates, len(candidates) - k)[len(candidates) - k]
+            results = [(mask & (scores >= threshold), np.where(mask & (scores >= threshold), scores, 0.0)) for mask, scores in results]
+        return results
+
+    def _aggregate(self, spec, matched):
+        """
+        Compute a terms aggregation (on a keyword field or _index) with its sub-aggregations.
+        """
+        if "terms" not in spec:
+            raise LocalIndexError(f"Unsupported aggregation {list(spec)}")
+        field = spec["terms"]["field"]
+        size = spec["terms"].get("size", 10)
+        groups = {}
+        for reader, mask in matched:
+            values = [(reader.name, mask)] if field == "_index" else reader.keyword_masks(field, mask)
+            for value, value_mask in values:
+                groups.setdefault(value, []).append((reader, value_mask))
+        buckets = []
+        for value, parts in groups.items():
+            doc_count = sum(int(np.count_nonzero(mask)) for _, mask in parts)
+            if not doc_count:
+                continue
+            bucket = {"key": value, "doc_count": doc_count}
+            for name, sub_spec in (spec.get("aggs") or spec.get("aggregations") or {}).items():
+                bucket[name] = self._aggregate(sub_spec, parts)
+            buckets.append(bucket)
+        buckets.sort(key=lambda b: (-b["doc_count"], str(b["key"])))
+        return {
+            "doc_count_error_upper_bound": 0,
+            "sum_other_doc_count": sum(b["doc_count"] for b in buckets[size:]),
+            "buckets": buckets[:size]
+        }
+
+    def search(self, index=None, body=None, **params):
+        """
+        Run a search request (see Elasticsearch.search).
+        """
+        started = time.perf_counter()
+        if "from_" in params:
+            params["from"] = params.pop("from_")
+        scroll = params.pop("scroll", None)
+        ignore_unavailable = params.pop("ignore_unavailable", False)
+        params.pop("request_timeout", None)
+        request = dict(body or {}, **params)
+
+        pit = request.get("pit")
+        if pit:
+            context = self._context(pit["id"])
+            context["expires"] = time.time() + _seconds(pit.get("keep_alive", "1m"))
+            readers = context["readers"]
+        else:
+            readers = self._resolve(index, ignore_unavailable)
+
+        if scroll:
+            response = self._execute(readers, request, paginate=False)
+            hits = response["hits"]["hits"]
+            size = request.get("size", 10)
+            scroll_id = uuid.uuid4().hex
+            with self.lock:
+                self.contexts[scroll_id] = {"hits": hits[size:], "size": size, "expires": time.time() + _seconds(scroll)}
+            response["hits"]["hits"] = hits[:size]
+            response["_scroll_id"] = scroll_id
+        else:
+            response = self._execute(readers, request)
+        if pit:
+            response["pit_id"] = pit["id"]
+        response["took"] = int((time.perf_counter() - started) * 1000)
+        return response
+
+    def scroll(self, scroll_id=None, scroll=None, body=None, **params):
+        """
+        Return the next page of a scroll opened by search(scroll=...).
+        """
+        scroll_id = scroll_id or (body or {}).get("scroll_id")
+        context = self._context(scroll_id)
+        if scroll:
+            context["expires"] = time.time() + _seconds(scroll)
+        hits, context["hits"] = context["hits"][:context["size"]], context["hits"][context["size"]:]
+        return {"_scroll_id": scroll_id, "timed_out": False, "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                "hits": {"hits": hits}}
+
+    def clear_scroll(self, scroll_id=None, body=None, **params):
+        with self.lock:
+            freed = self.contexts.pop(scroll_id, None) is not None
+        return {"succeeded": True, "num_freed": int(freed)}
+
+    def open_point_in_time(self, index=None, keep_alive="1m", **params):
+        """
+        Pin the current generation of the indices (see Elasticsearch.open_point_in_time).
+        """
+        readers = self._resolve(index, params.get("ignore_unavailable", False))
+        pit_id = uuid.uuid4().hex
+        with self.lock:
+            self.contexts[pit_id] = {"readers": readers, "expires": time.time() + _seconds(keep_alive)}
+        return {"id": pit_id}
+
+    def close_point_in_time(self, id=None, body=None, **params):
+        with self.lock:
+            freed = self.contexts.pop(id or (body or {}).get("id"), None) is not None
+        return {"succeeded": True, "num_freed": int(freed)}
+
+    def msearch(self, searches=None, body=None, index=None, **params):
+        """
+        Run several searches (header/body pairs, see Elasticsearch.msearch).
+        """
+        started = time.perf_counter()
+        searches = searches if searches is not None else body
+        responses = []
+        for header, request in zip(searches[::2], searches[1::2]):
+            try:
+                response = self.search(index=header.get("index", index), body=request,
+                                       ignore_unavailable=header.get("ignore_unavailable", False))
+                response["status"] = 200
+            except LocalIndexError as e:
+                response = {"error": {"type": "local_backend_exception", "reason": str(e)}, "status": 400}
+            responses.append(response)
+        return {"took": int((time.perf_counter() - started) * 1000), "responses": responses}
+
+    def count(self, index=None, body=None, query=None, **params):
+        query = query or (body or {}).get("query")
+        readers = self._resolve(index, params.get("ignore_unavailable", False))
+        return {"count": sum(int(np.count_nonzero(reader.evaluate(query)[0])) for reader in readers)}
+
+    def ping(self, **params):
+        return os.path.isdir(self.root)
+
+    def info(self, **params):
+        return {"name": "local", "cluster_name": self.root, "version": {"number": "local"}, "tagline": "Embedded BM25 backend"}
+
+    def options(self, **params):
+        # Transport options (timeouts, retries) do not apply in process
+        return self
+
+    def close(self):
+        with self.lock:
+            self.readers.clear()
+            self.contexts.clear()
+
+class _AsyncProxy:
+    """
+    Expose the methods of an object as coroutines running in a worker thread.
+    """
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        method = getattr(self._target, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+class AsyncLocalClient(_AsyncProxy):
+    """
+    asyncio facade of LocalClient, the embedded counterpart of AsyncElasticsearch.
+    """
+    def __init__(self, client):
+        super().__init__(client)
+        self.indices = _AsyncProxy(client.indices)
+
+    def options(self, **params):
+        return self
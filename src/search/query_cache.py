@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# File bumped by the indexer at the end of every run: cached results older than it are stale
+GENERATION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'index_generation')
+
+def bump_generation(path=GENERATION_PATH):
+    """
+    Signal that the indices changed, invalidating every QueryCache watching `path`.
+
+    Returns:
+        int: The new generation number.
+    """
+    generation = read_generation(path) + 1
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+def read_generation(path=GENERATION_PATH):
+    """
+    Return the current index generation (0 if the indexer never ran).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store (one per Python process).
+    """
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def sync_generation(self, generation):
+        """
+        Clear the store if it was filled under another index generation.
+        """
+        with self.lock:
+            if self.generation != generation:
+                self.entries.clear()
+                self.generation = generation
+
+    def __len__(self):
+        return len(self.entries)
+
+class SQLiteCacheBackend:
+    """
+    LRU store in a local SQLite file, shared by all the processes of the host
+    (e.g. several Flask workers and the Streamlit app).
+    """
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads: one per thread
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, expires):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", (key, value, expires, time.time()))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def sync_generation(self, generation):
+        """
+        Clear the store if it was filled under another index generation.
+        """
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+            if row is None or row[0] != generation:
+                conn.execute("DELETE FROM cache")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (generation,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class QueryCache:
+    """
+    Bounded LRU/TTL cache of search results.
+
+    Entries expire after `ttl` seconds and the whole cache is invalidated as soon
+    as the indexer bumps the generation file at the end of a run. The generation is
+    checked with a stat() per lookup, which is far cheaper than a search round trip.
+    """
+    def __init__(self, backend=None, ttl=300, generation_path=GENERATION_PATH):
+        """
+        Initialize the QueryCache.
+
+        Args:
+            backend: MemoryCacheBackend (default) or SQLiteCacheBackend.
+            ttl (int): Time to live of an entry, in seconds.
+            generation_path (str): File bumped by the indexer (see bump_generation).
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.generation_path = generation_path
+        self.generation_stat = ()  # never equal to a real stat: first lookup syncs the backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache configured through environment variables:
+        SCISEARCH_CACHE (memory | sqlite | off), SCISEARCH_CACHE_PATH,
+        SCISEARCH_CACHE_TTL and SCISEARCH_CACHE_SIZE.
+
+        Returns:
+            QueryCache: The cache, or None if caching is disabled.
+        """
+        kind = os.environ.get("SCISEARCH_CACHE", "memory")
+        size = int(os.environ.get("SCISEARCH_CACHE_SIZE", 1000))
+        if kind == "off":
+            return None
+        if kind == "sqlite":
+            default_path = os.path.join(os.path.dirname(GENERATION_PATH), 'query_cache.sqlite')
+            backend = SQLiteCacheBackend(os.environ.get("SCISEARCH_CACHE_PATH", default_path), max_entries=size)
+        else:
+            backend = MemoryCacheBackend(max_entries=size)
+        return cls(backend, ttl=int(os.environ.get("SCISEARCH_CACHE_TTL", 300)))
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Build a cache key from JSON-serializable parts (index, query, fields, filters...).
+        """
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _check_generation(self):
+        try:
+            st = os.stat(self.generation_path)
+            current = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            current = None
+        if current != self.generation_stat:
+            self.backend.sync_generation(read_generation(self.generation_path))
+            self.generation_stat = current
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None.
+        """
+        self._check_generation()
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Values are stored serialized: callers always get their own copy
+        return json.loads(value)
+
+    def set(self, key, value):
+        """
+        Cache a JSON-serializable value under `key`.
+        """
+        self._check_generation()
+        self.backend.set(key, json.dumps(value), time.time() + self.ttl)
+
+    def stats(self):
+        """
+        Return the hit/miss counters of this process and the number of cached entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.backend),
+            "generation": read_generation(self.generation_path)
+        }
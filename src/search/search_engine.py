@@ -1,68 +1,740 @@
-from elasticsearch import Elasticsearch
+import json
+import time
+import base64
+import asyncio
+from elasticsearch import helpers
+from search.query_cache import QueryCache
+from search.es_client import get_client, create_async_client
+from indexing.embeddings import EMBEDDING_FIELD
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+# Deepest result reachable with from/size paging (index.max_result_window is 10000,
+# but the cost of a page grows with its offset): beyond this, use cursors
+MAX_OFFSET_WINDOW = 1000
+# How long an unused point-in-time is kept alive between two cursor pages
+PIT_KEEP_ALIVE = "2m"
+
+class CursorExpiredError(ValueError):
+    """
+    The point-in-time of a cursor expired (unused for longer than PIT_KEEP_ALIVE):
+    the search has to be started again.
+    """
+
+# Per-index search profiles: the fields a query is matched against (with boosts),
+# the fields highlighted and the _source fields never shown in result lists.
+# Matching only the analyzed text fields and highlighting a few short fragments
+# avoids expanding every query over all the fields and re-analyzing whole full texts.
+SEARCH_PROFILES = {
+    "articles": {
+        "fields": ["title^3", "abstract^2", "full_text"],
+        "highlight": ["title", "abstract", "full_text"],
+        "source_excludes": ["full_text", EMBEDDING_FIELD]
+    },
+    "tables": {
+        "fields": ["caption^3", "body", "mentions", "context_paragraphs"],
+        "highlight": ["caption", "body", "mentions"],
+        "source_excludes": [EMBEDDING_FIELD]
+    },
+    "figures": {
+        "fields": ["caption^3", "mentions", "context_paragraphs"],
+        "highlight": ["caption", "mentions"],
+        "source_excludes": [EMBEDDING_FIELD]
+    }
+}
+HIGHLIGHT_FRAGMENT_SIZE = 150
+HIGHLIGHT_FRAGMENTS = 3
+# Characters of a field analyzed for highlighting (full texts are cut here instead of failing)
+HIGHLIGHT_MAX_ANALYZED_OFFSET = 100000
+# _source fields needed by the paper detail page (full texts and context paragraphs are never shown)
+DETAIL_SOURCE = {
+    "articles": {"excludes": ["full_text", EMBEDDING_FIELD]},
+    "tables": {"includes": ["table_id", "caption", "body"]},
+    "figures": {"includes": ["paper_id", "figure_id", "caption", "url", "local_path", "thumbnail_path"]}
+}
+# Tables/figures fetched in the detail round trip; larger papers are completed with a scan
+DETAIL_CHILDREN_SIZE = 1000
+
+# Hybrid search: the BM25 and the kNN (embedding) retrievers each rank their top
+# HYBRID_WINDOW hits, merged with reciprocal-rank fusion: score = sum of 1 / (RRF_K + rank)
+HYBRID_WINDOW = 100
+# Candidates examined per shard by the approximate (HNSW) kNN search
+HYBRID_NUM_CANDIDATES = 200
+RRF_K = 60
+
+# Seconds before the index mappings are checked again for term vectors (see _fvh_fields)
+MAPPING_REFRESH = 300
 
 class SearchEngine:
     """
     Wrapper class for Elasticsearch search operations.
     Handles query construction for articles, tables, and figures.
     """
-    def __init__(self, es_host="http://localhost:9200"):
+    def __init__(self, es_host=None, cache=None, profiles=SEARCH_PROFILES, embedder=None):
         """
         Initialize the SearchEngine.
-        
+
         Args:
-            es_host (str): Elasticsearch server URL.
+            es_host (str): Elasticsearch server URL (default: the shared client, see es_client).
+            cache (QueryCache): Result cache. None builds the one configured in the
+                                environment (see QueryCache.from_env), False disables caching.
+            profiles (dict): Search profile of each index (see SEARCH_PROFILES). Indices
+                             without a profile are searched and highlighted on every field.
+            embedder (Embedder): Computes the query embeddings of hybrid searches; it must use
+                                 the model the documents were indexed with (default: hybrid
+                                 search disabled).
         """
-        self.es = Elasticsearch(es_host)
-        
-    def search(self, index, query, fields=None, filters=None):
+        self.es = get_client(es_host)
+        self.cache = QueryCache.from_env() if cache is None else (cache or None)
+        self.profiles = profiles or {}
+        self.embedder = embedder
+        # index -> (expiry, fields stored with term vectors)
+        self.fvh_fields = {}
+
+    def search(self, index, query, fields=None, filters=None, size=DEFAULT_PAGE_SIZE):
         """
         Perform a search on the specified index using a boolean query string.
-        
+
         Args:
            index (str): The name of the index to search (e.g., 'articles', 'tables', 'figures').
            query (str): The search query string (supports Lucene syntax like 'speech AND text').
-           fields (list): Optional list of fields to restrict the search to.
+           fields (list): Optional list of fields to restrict the search to
+                          (default: the fields of the index search profile).
            filters (dict): Optional dictionary of exact match filters (e.g., {"source": "pubmed"}).
-           
+           size (int): Maximum number of hits to return.
+
         Returns:
             list: A list of search hits (dictionaries) from Elasticsearch.
         """
-        
+        # A single first page of any size: the paging limits of search_page do not apply
+        return self._search_page(index, query, fields, filters, 1, size, None, False, False)["hits"]
+
+    def search_page(self, index, query, fields=None, filters=None, page=1, page_size=DEFAULT_PAGE_SIZE,
+                    cursor=None, deep=False, hybrid=False):
+        """
+        Return one page of results, with the total number of hits.
+
+        Shallow pages are fetched with from/size (offset paging) and cached. For deep
+        scrolling, pass deep=True and then the returned `next_cursor`: pages are fetched
+        with search_after on a point-in-time, so page N costs about the same as page 1 and
+        results stay consistent while the index is being updated. With deep=True, `page`
+        is where the scroll starts (e.g. page=2 continues after an offset first page).
+
+        With hybrid=True the query is also embedded and matched by kNN against the document
+        embeddings, which finds paraphrases the keywords miss; the two rankings are merged
+        with reciprocal-rank fusion (see HYBRID_WINDOW). `_score` is then the fusion score,
+        kNN-only hits have no highlight and `total` counts the fused hits.
+
+        Args:
+           index (str): The name of the index to search.
+           query (str): The search query string.
+           fields (list): Optional list of fields to restrict the search to.
+           filters (dict): Optional dictionary of exact match filters.
+           page (int): Page number (1-based) for offset paging.
+           page_size (int): Hits per page (at most MAX_PAGE_SIZE).
+           cursor (str): Opaque cursor returned by a previous call with the same index,
+                         query, fields and filters (overrides `page`).
+           deep (bool): Start a cursor-based scroll at `page` instead of offset paging.
+           hybrid (bool): Combine BM25 and kNN on the embeddings (requires an embedder,
+                          offset paging within the first HYBRID_WINDOW hits).
+
+        Returns:
+            dict: {"hits", "total", "total_relation", "page", "page_size", "next_cursor"}.
+                  `next_cursor` is None for offset paging and on the last page.
+
+        Raises:
+            ValueError: For an invalid page size, a page beyond MAX_OFFSET_WINDOW (HYBRID_WINDOW
+                        for hybrid searches), a malformed cursor or the cursor of another search.
+            CursorExpiredError: If the point-in-time of the cursor expired.
+        """
+        if hybrid:
+            self._check_hybrid(page, page_size, cursor, deep)
+        self._check_paging(page, page_size, cursor, deep)
+        return self._search_page(index, query, fields, filters, page, page_size, cursor, deep, hybrid)
+
+    def _search_page(self, index, query, fields, filters, page, page_size, cursor, deep, hybrid):
+        """
+        Run search_page once its arguments are validated.
+        """
+        state = self._cursor_state(index, query, fields, filters, page, cursor, deep)
+        if state:
+            return self._search_cursor(query, fields, filters, page_size, state)
+
+        # Serve repeated queries from the cache
+        cache_key = self._cache_key(index, query, fields, filters, page, page_size, hybrid)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            # Execute search
+            if hybrid:
+                searches = self._hybrid_searches(index, query, fields, filters, self._query_vector(query), self._fvh_fields(index))
+                result = self._hybrid_result(self.es.msearch(searches=searches)["responses"], page, page_size)
+            else:
+                body = self._offset_body(index, query, fields, filters, page, page_size, self._fvh_fields(index))
+                result = self._offset_result(self.es.search(index=index, body=body), page, page_size)
+        except Exception as e:
+            print(f"Search error: {e}")
+            # The mapping may have changed (e.g. reindex): look it up again next time
+            self.fvh_fields.pop(index, None)
+            return self._empty_page(page, page_size)
+
+        if cache_key:
+            self.cache.set(cache_key, result)
+        return result
+
+    def paper_detail(self, paper_id):
+        """
+        Fetch a paper with all its tables and figures in a single _msearch round trip.
+
+        Only the _source fields shown by the detail page are transferred (see DETAIL_SOURCE).
+        Tables and figures are not truncated: if a paper has more than DETAIL_CHILDREN_SIZE
+        of them, the missing ones are retrieved with a scan.
+
+        Args:
+            paper_id (str): ID of the paper.
+
+        Returns:
+            dict: {"paper", "tables", "figures"} (lists of _source dicts), or None if the paper does not exist.
+        """
+        responses = self.es.msearch(searches=self._detail_searches(paper_id))["responses"]
+        detail, truncated = self._detail_result(responses)
+        for index_name in truncated:
+            hits = helpers.scan(self.es, index=index_name, query=self._detail_scan_query(paper_id, index_name))
+            detail[index_name] = [hit['_source'] for hit in hits]
+        return detail
+
+    def _search_cursor(self, query, fields, filters, page_size, state):
+        """
+        Fetch the page described by a cursor state, opening the point-in-time on the first page.
+        """
+        index = state["index"]
+        try:
+            pit_id = state.get("pit") or self.es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE)["id"]
+            body = self._cursor_body(index, query, fields, filters, page_size, state, pit_id, self._fvh_fields(index))
+            res = self.es.search(body=body)
+        except Exception as e:
+            self._check_pit(state, e)
+            print(f"Search error: {e}")
+            self.fvh_fields.pop(index, None)
+            return self._empty_page(state["page"], page_size)
+
+        result, finished_pit = self._cursor_result(res, query, fields, filters, page_size, state, pit_id)
+        if finished_pit:
+            self._close_pit(finished_pit)
+        return result
+
+    # --- Request building and response parsing, shared with AsyncSearchEngine ---
+
+    @staticmethod
+    def _check_paging(page, page_size, cursor, deep):
+        """
+        Validate the paging arguments of search_page.
+
+        Raises:
+            ValueError: For an invalid page size, or a page (the start of a scroll with deep=True)
+                        beyond MAX_OFFSET_WINDOW.
+        """
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+        if cursor:
+            return
+        if page < 1:
+            raise ValueError("page must be >= 1")
+        if deep and (page - 1) * page_size >= MAX_OFFSET_WINDOW:
+            raise ValueError(f"A cursor scroll must start within the first {MAX_OFFSET_WINDOW} results")
+        if not deep and page * page_size > MAX_OFFSET_WINDOW:
+            raise ValueError(f"Offset paging is limited to the first {MAX_OFFSET_WINDOW} results: use a cursor (deep=True)")
+
+    def _cursor_state(self, index, query, fields, filters, page, cursor, deep):
+        """
+        Return the cursor state for cursor paging, or None for offset paging.
+
+        Raises:
+            ValueError: For a malformed cursor or a cursor of another query or index.
+        """
+        if cursor:
+            state = self.decode_cursor(cursor)
+            if state.get("query") != QueryCache.make_key(index, query, fields, filters):
+                raise ValueError("The cursor belongs to a different query")
+            return state
+        if deep:
+            return {"index": index, "page": page}
+        return None
+
+    def _cache_key(self, index, query, fields, filters, page, page_size, hybrid=False):
+        if not self.cache:
+            return None
+        if hybrid:
+            return QueryCache.make_key(index, query, fields, filters, page, page_size, self.profile(index),
+                                       "hybrid", self.embedder.model_name)
+        return QueryCache.make_key(index, query, fields, filters, page, page_size, self.profile(index))
+
+    def _check_hybrid(self, page, page_size, cursor, deep):
+        """
+        Validate the arguments of a hybrid search (see search_page).
+
+        Raises:
+            ValueError: Without an embedder, with cursor paging or beyond the fused window.
+        """
+        if self.embedder is None:
+            raise ValueError("Hybrid search is not enabled (no embedding model configured)")
+        if cursor or deep:
+            raise ValueError("Hybrid search does not support cursor paging")
+        if page >= 1 and page * page_size > HYBRID_WINDOW:
+            raise ValueError(f"Hybrid search is limited to the first {HYBRID_WINDOW} results")
+
+    def _query_vector(self, query):
+        return self.embedder.embed_query(query).tolist()
+
+    def _hybrid_searches(self, index, query, fields, filters, vector, fvh_fields):
+        """
+        Build the _msearch request of a hybrid search: the usual BM25 query and a kNN
+        query on the embeddings (same filters and _source), top HYBRID_WINDOW hits each.
+        """
+        lexical = self._build_body(index, query, fields, filters, fvh_fields)
+        lexical["size"] = HYBRID_WINDOW
+        lexical["track_total_hits"] = False
+        knn = {
+            "field": EMBEDDING_FIELD,
+            "query_vector": vector,
+            "k": HYBRID_WINDOW,
+            "num_candidates": HYBRID_NUM_CANDIDATES
+        }
+        term_filters = [{"term": {field: value}} for field, value in (filters or {}).items() if value]
+        if term_filters:
+            knn["filter"] = term_filters
+        semantic = {"knn": knn, "size": HYBRID_WINDOW}
+        if "_source" in lexical:
+            semantic["_source"] = lexical["_source"]
+        return [{"index": index}, lexical, {"index": index}, semantic]
+
+    @staticmethod
+    def _hybrid_result(responses, page, page_size):
+        """
+        Merge the BM25 and kNN rankings of a hybrid search with reciprocal-rank fusion
+        and return the requested page. If the kNN search failed (e.g. an index without
+        embeddings), the BM25 ranking is returned alone.
+        """
+        lexical, semantic = responses
+        if "error" in lexical:
+            raise RuntimeError(f"Hybrid search failed: {lexical['error']}")
+        rankings = [lexical['hits']['hits']]
+        if "error" in semantic:
+            print(f"kNN search failed, using BM25 only: {semantic['error']}")
+        else:
+            rankings.append(semantic['hits']['hits'])
+
+        # Hits found by both keep the BM25 copy, which carries the highlights
+        fused = {}
+        for hits in rankings:
+            for rank, hit in enumerate(hits, start=1):
+                entry = fused.setdefault((hit['_index'], hit['_id']), [0.0, hit])
+                entry[0] += 1.0 / (RRF_K + rank)
+        ranked = sorted(fused.values(), key=lambda entry: -entry[0])
+        start = (page - 1) * page_size
+        return {
+            "hits": [dict(hit, _score=score) for score, hit in ranked[start:start + page_size]],
+            "total": len(ranked),
+            "total_relation": "eq",
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": None
+        }
+
+    def _offset_body(self, index, query, fields, filters, page, page_size, fvh_fields):
+        body = self._build_body(index, query, fields, filters, fvh_fields)
+        body["from"] = (page - 1) * page_size
+        body["size"] = page_size
+        body["track_total_hits"] = True
+        return body
+
+    @staticmethod
+    def _offset_result(res, page, page_size):
+        return {
+            "hits": res['hits']['hits'],
+            "total": res['hits']['total']['value'],
+            "total_relation": res['hits']['total']['relation'],
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": None
+        }
+
+    def _cursor_body(self, index, query, fields, filters, page_size, state, pit_id, fvh_fields):
+        body = self._build_body(index, query, fields, filters, fvh_fields)
+        body["size"] = page_size
+        body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+        # _shard_doc is a unique, cheap tiebreaker available only inside a point-in-time
+        body["sort"] = [{"_score": "desc"}, {"_shard_doc": "asc"}]
+        if "search_after" in state:
+            body["search_after"] = state["search_after"]
+            # The total was counted on the first page: no need to count again
+            body["track_total_hits"] = False
+        else:
+            # A scroll started past the first page (e.g. "Load more" after an offset page)
+            body["from"] = (state["page"] - 1) * page_size
+            body["track_total_hits"] = True
+        return body
+
+    def _cursor_result(self, res, query, fields, filters, page_size, state, pit_id):
+        """
+        Build the page of a cursor search.
+
+        Returns:
+            tuple: (page dict, point-in-time id to close if the scroll is over, else None)
+        """
+        hits = res['hits']['hits']
+        # Elasticsearch may return an updated point-in-time id
+        pit_id = res.get('pit_id', pit_id)
+        total = res['hits']['total']['value'] if 'total' in res['hits'] else state.get("total", 0)
+        relation = res['hits']['total']['relation'] if 'total' in res['hits'] else state.get("relation", "eq")
+
+        next_cursor = None
+        # With relation 'gte' the total is only a lower bound: keep going while pages are full
+        if len(hits) == page_size and (relation == "gte" or state["page"] * page_size < total):
+            next_cursor = self.encode_cursor({
+                "index": state["index"], "query": QueryCache.make_key(state["index"], query, fields, filters),
+                "pit": pit_id, "search_after": hits[-1]['sort'],
+                "page": state["page"] + 1, "total": total, "relation": relation
+            })
+
+        result = {
+            "hits": hits,
+            "total": total,
+            "total_relation": relation,
+            "page": state["page"],
+            "page_size": page_size,
+            "next_cursor": next_cursor
+        }
+        return result, None if next_cursor else pit_id
+
+    @staticmethod
+    def _detail_searches(paper_id):
+        searches = [
+            {"index": "articles"},
+            {"query": {"ids": {"values": [paper_id]}}, "size": 1, "_source": DETAIL_SOURCE["articles"]}
+        ]
+        for index_name in ("tables", "figures"):
+            searches.append({"index": index_name})
+            searches.append({
+                "query": {"term": {"paper_id": paper_id}},
+                "size": DETAIL_CHILDREN_SIZE,
+                "track_total_hits": True,
+                "_source": DETAIL_SOURCE[index_name]
+            })
+        return searches
+
+    @staticmethod
+    def _detail_scan_query(paper_id, index_name):
+        return {"query": {"term": {"paper_id": paper_id}}, "_source": DETAIL_SOURCE[index_name]}
+
+    @staticmethod
+    def _detail_result(responses):
+        """
+        Parse the _msearch responses of paper_detail.
+
+        Returns:
+            tuple: (detail dict or None, names of the child indices whose hits were truncated)
+        """
+        for response in responses:
+            if "error" in response:
+                raise RuntimeError(f"Paper detail search failed: {response['error']}")
+
+        article_hits = responses[0]['hits']['hits']
+        if not article_hits:
+            return None, []
+
+        detail = {"paper": article_hits[0]['_source']}
+        truncated = []
+        for index_name, response in zip(("tables", "figures"), responses[1:]):
+            hits = response['hits']['hits']
+            if response['hits']['total']['value'] > len(hits):
+                truncated.append(index_name)
+            detail[index_name] = [hit['_source'] for hit in hits]
+        return detail, truncated
+
+    @staticmethod
+    def _check_pit(state, error):
+        """
+        Turn the error of a cursor page whose point-in-time expired into a CursorExpiredError.
+        """
+        message = str(error)
+        if state.get("pit") and ("search_context_missing" in message or "No search context found" in message):
+            raise CursorExpiredError("The search results expired: run the search again") from error
+
+    def _close_pit(self, pit_id):
+        """
+        Release a point-in-time as soon as the scroll is over (it would expire anyway).
+        """
+        try:
+            self.es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"Could not close point-in-time: {e}")
+
+    def profile(self, index):
+        """
+        Return the search profile for an index expression, or None to search every field.
+
+        Comma-separated lists and '_all' / '*' merge the profiles of the indices involved
+        (keeping the highest boost of each field); an index without a profile disables
+        profiling, since its fields are unknown.
+        """
+        names = list(self.profiles) if index in ("_all", "*") else index.split(",")
+        if not names or any(name not in self.profiles for name in names):
+            return None
+        if len(names) == 1:
+            return self.profiles[names[0]]
+
+        boosts = {}
+        for name in names:
+            for field in self.profiles[name]["fields"]:
+                field_name, _, boost = field.partition("^")
+                boosts[field_name] = max(boosts.get(field_name, 1.0), float(boost or 1))
+        return {
+            "fields": [f"{f}^{b:g}" if b != 1 else f for f, b in boosts.items()],
+            "highlight": list(dict.fromkeys(f for name in names for f in self.profiles[name]["highlight"])),
+            "source_excludes": list(dict.fromkeys(f for name in names for f in self.profiles[name]["source_excludes"]))
+        }
+
+    def _fvh_fields(self, index):
+        """
+        Return the fields of an index expression stored with term vectors with offsets
+        (see IndexManager highlight_storage), which the fast vector highlighter can use.
+
+        A field qualifies only if every index that maps it stores term vectors, since
+        the fast vector highlighter fails on fields without them. Mappings are cached
+        for MAPPING_REFRESH seconds.
+        """
+        cached = self.fvh_fields.get(index)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        try:
+            response = self.es.indices.get_mapping(index=index)
+        except Exception as e:
+            print(f"Could not read the mapping of {index}: {e}")
+            response = {}
+        return self._store_fvh_fields(index, response)
+
+    def _store_fvh_fields(self, index, response):
+        """
+        Extract the term-vector fields from a get_mapping response and cache them.
+        """
+        stored = {}
+        for config in response.values():
+            for field, mapping in config["mappings"].get("properties", {}).items():
+                has_vectors = mapping.get("term_vector") == "with_positions_offsets"
+                stored[field] = stored.get(field, True) and has_vectors
+        fields = {field for field, ok in stored.items() if ok}
+        self.fvh_fields[index] = (time.time() + MAPPING_REFRESH, fields)
+        return fields
+
+    def _build_body(self, index, query, fields=None, filters=None, fvh_fields=()):
+        """
+        Build the search body shared by offset and cursor paging.
+
+        `fvh_fields` are the fields to highlight with the fast vector highlighter (see _fvh_fields).
+        """
+        profile = self.profile(index)
+        if fields:
+            search_fields = fields
+            highlight_fields = [f.split("^")[0] for f in fields]
+        elif profile:
+            search_fields = profile["fields"]
+            highlight_fields = profile["highlight"]
+        else:
+            search_fields = highlight_fields = ["*"]
+
         # Base Query
         must_clauses = [
             {
                 "query_string": {
                     "query": query,
-                    "fields": fields if fields else ["*"],
+                    "fields": search_fields,
                     "default_operator": "AND"
                 }
             }
         ]
-        
+
         # Apply Filters
         if filters:
             for field, value in filters.items():
                 if value:
                      must_clauses.append({"term": {field: value}})
-        
+
         body = {
             "query": {
                 "bool": {
                     "must": must_clauses
                 }
-            },
-            "highlight": {
-                "fields": {
-                    "*": {} 
-                }
             }
         }
-        
+        if not profile:
+            # Legacy behaviour for unprofiled indices
+            body["highlight"] = {"fields": {f: {} for f in highlight_fields}}
+            return body
+
+        # Term vectors let the fast vector highlighter skip re-analysis; the default
+        # (unified) highlighter already uses offsets stored in the postings, if any
+        body["highlight"] = {
+            "fields": {f: ({"type": "fvh"} if f in fvh_fields else {}) for f in highlight_fields},
+            "fragment_size": HIGHLIGHT_FRAGMENT_SIZE,
+            "number_of_fragments": HIGHLIGHT_FRAGMENTS,
+            "max_analyzed_offset": HIGHLIGHT_MAX_ANALYZED_OFFSET
+        }
+        if profile["source_excludes"]:
+            body["_source"] = {"excludes": profile["source_excludes"]}
+        return body
+
+    @staticmethod
+    def _empty_page(page, page_size):
+        return {"hits": [], "total": 0, "total_relation": "eq", "page": page, "page_size": page_size, "next_cursor": None}
+
+    @staticmethod
+    def encode_cursor(state):
+        """
+        Serialize a cursor state into an opaque URL-safe string.
+        """
+        return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Parse a cursor returned by search_page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
         try:
-            # Execute search
-            res = self.es.search(index=index, body=body)
-            # Return the list of hits
-            return res['hits']['hits']
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(state, dict) or not {"index", "pit", "search_after", "page"} <= state.keys():
+                raise ValueError
+            return state
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+
+class AsyncSearchEngine(SearchEngine):
+    """
+    SearchEngine for asyncio servers (see asgi_app.py).
+
+    Queries, paging, cursors, result cache and returned dictionaries are the same as
+    SearchEngine; only the Elasticsearch calls are awaited on AsyncElasticsearch, so a
+    request waiting on the cluster does not hold a thread.
+    """
+    def __init__(self, es_host=None, cache=None, profiles=SEARCH_PROFILES, es=None, embedder=None):
+        """
+        Initialize the AsyncSearchEngine.
+
+        Args:
+            es_host (str): Elasticsearch host URL(s) (default: SCISEARCH_ES_HOSTS).
+            cache (QueryCache): Result cache; None builds it from the environment, False disables it.
+            profiles (dict): Per-index search profiles.
+            es (AsyncElasticsearch): Client to use instead of creating one.
+            embedder (Embedder): Query embeddings for hybrid searches (run in a worker thread).
+        """
+        self.es = es or create_async_client(es_host)
+        self.cache = QueryCache.from_env() if cache is None else (cache or None)
+        self.profiles = profiles or {}
+        self.embedder = embedder
+        self.fvh_fields = {}
+
+    async def close(self):
+        """
+        Close the connections of the Elasticsearch client.
+        """
+        await self.es.close()
+
+    async def search(self, index, query, fields=None, filters=None, size=DEFAULT_PAGE_SIZE):
+        """
+        Async version of SearchEngine.search.
+        """
+        page = await self._search_page(index, query, fields, filters, 1, size, None, False, False)
+        return page["hits"]
+
+    async def search_page(self, index, query, fields=None, filters=None, page=1, page_size=DEFAULT_PAGE_SIZE,
+                          cursor=None, deep=False, hybrid=False):
+        """
+        Async version of SearchEngine.search_page.
+        """
+        if hybrid:
+            self._check_hybrid(page, page_size, cursor, deep)
+        self._check_paging(page, page_size, cursor, deep)
+        return await self._search_page(index, query, fields, filters, page, page_size, cursor, deep, hybrid)
+
+    async def _search_page(self, index, query, fields, filters, page, page_size, cursor, deep, hybrid):
+        state = self._cursor_state(index, query, fields, filters, page, cursor, deep)
+        if state:
+            return await self._search_cursor(query, fields, filters, page_size, state)
+
+        cache_key = self._cache_key(index, query, fields, filters, page, page_size, hybrid)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            fvh_fields = await self._fvh_fields(index)
+            if hybrid:
+                # The model runs on the CPU: keep it off the event loop
+                vector = await asyncio.to_thread(self._query_vector, query)
+                searches = self._hybrid_searches(index, query, fields, filters, vector, fvh_fields)
+                result = self._hybrid_result((await self.es.msearch(searches=searches))["responses"], page, page_size)
+            else:
+                body = self._offset_body(index, query, fields, filters, page, page_size, fvh_fields)
+                result = self._offset_result(await self.es.search(index=index, body=body), page, page_size)
         except Exception as e:
             print(f"Search error: {e}")
-            return []
+            self.fvh_fields.pop(index, None)
+            return self._empty_page(page, page_size)
+
+        if cache_key:
+            self.cache.set(cache_key, result)
+        return result
+
+    async def paper_detail(self, paper_id):
+        """
+        Async version of SearchEngine.paper_detail.
+        """
+        responses = (await self.es.msearch(searches=self._detail_searches(paper_id)))["responses"]
+        detail, truncated = self._detail_result(responses)
+        for index_name in truncated:
+            hits = helpers.async_scan(self.es, index=index_name, query=self._detail_scan_query(paper_id, index_name))
+            detail[index_name] = [hit['_source'] async for hit in hits]
+        return detail
+
+    async def _search_cursor(self, query, fields, filters, page_size, state):
+        index = state["index"]
+        try:
+            pit_id = state.get("pit") or (await self.es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE))["id"]
+            fvh_fields = await self._fvh_fields(index)
+            body = self._cursor_body(index, query, fields, filters, page_size, state, pit_id, fvh_fields)
+            res = await self.es.search(body=body)
+        except Exception as e:
+            self._check_pit(state, e)
+            print(f"Search error: {e}")
+            self.fvh_fields.pop(index, None)
+            return self._empty_page(state["page"], page_size)
+
+        result, finished_pit = self._cursor_result(res, query, fields, filters, page_size, state, pit_id)
+        if finished_pit:
+            await self._close_pit(finished_pit)
+        return result
+
+    async def _close_pit(self, pit_id):
+        try:
+            await self.es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"Could not close point-in-time: {e}")
+
+    async def _fvh_fields(self, index):
+        cached = self.fvh_fields.get(index)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        try:
+            response = await self.es.indices.get_mapping(index=index)
+        except Exception as e:
+            print(f"Could not read the mapping of {index}: {e}")
+            response = {}
+        return self._store_fvh_fields(index, response)
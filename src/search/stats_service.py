@@ -0,0 +1,107 @@
+import time
+import asyncio
+import threading
+from search.query_cache import GENERATION_PATH, read_generation
+from indexing.index_manager import logical_index_name
+
+# UI name of each index
+STATS_INDICES = {"articles": "papers", "tables": "tables", "figures": "figures"}
+
+class StatsService:
+    """
+    Corpus statistics (documents per index, and per source within each index) for the UIs.
+
+    All the counts come from a single size-0 aggregation request over the three indices,
+    cached for `ttl` seconds and refreshed earlier if the indexer bumps the index generation.
+    """
+    def __init__(self, es, ttl=30, generation_path=GENERATION_PATH):
+        """
+        Initialize the StatsService.
+
+        Args:
+            es (Elasticsearch): Elasticsearch client.
+            ttl (int): Seconds the statistics are reused before being fetched again.
+            generation_path (str): File bumped by the indexer (see query_cache.bump_generation).
+        """
+        self.es = es
+        self.ttl = ttl
+        self.generation_path = generation_path
+        self.lock = threading.Lock()
+        self.cached = None
+        self.expires = 0
+        self.generation = None
+
+    @staticmethod
+    def _request():
+        body = {
+            "size": 0,
+            "aggs": {
+                "indices": {
+                    "terms": {"field": "_index", "size": 100},
+                    "aggs": {"sources": {"terms": {"field": "source", "size": 20}}}
+                }
+            }
+        }
+        return {"index": ",".join(STATS_INDICES), "body": body, "ignore_unavailable": True}
+
+    @staticmethod
+    def _parse(res):
+        stats = {name: 0 for name in STATS_INDICES.values()}
+        stats["by_source"] = {name: {} for name in STATS_INDICES.values()}
+        for bucket in res["aggregations"]["indices"]["buckets"]:
+            # Buckets are keyed by concrete index (e.g. articles_v2)
+            name = STATS_INDICES.get(logical_index_name(bucket["key"]))
+            if name is None:
+                continue
+            stats[name] += bucket["doc_count"]
+            for source in bucket["sources"]["buckets"]:
+                by_source = stats["by_source"][name]
+                by_source[source["key"]] = by_source.get(source["key"], 0) + source["doc_count"]
+        return stats
+
+    def _fetch(self):
+        return self._parse(self.es.search(**self._request()))
+
+    def _valid(self, generation):
+        return self.cached is not None and time.time() < self.expires and generation == self.generation
+
+    def _store(self, stats, generation):
+        self.cached = stats
+        self.expires = time.time() + self.ttl
+        self.generation = generation
+        return stats
+
+    def get(self):
+        """
+        Return the corpus statistics, from the cache when still valid.
+
+        Returns:
+            dict: {"papers", "tables", "figures", "by_source": {"papers": {"arxiv": n, ...}, ...}}
+
+        Raises:
+            Exception: Elasticsearch errors (failures are never cached).
+        """
+        generation = read_generation(self.generation_path)
+        with self.lock:
+            if self._valid(generation):
+                return self.cached
+            return self._store(self._fetch(), generation)
+
+class AsyncStatsService(StatsService):
+    """
+    StatsService for asyncio servers, querying through AsyncElasticsearch.
+    Concurrent requests on an expired cache wait for a single aggregation.
+    """
+    def __init__(self, es, ttl=30, generation_path=GENERATION_PATH):
+        super().__init__(es, ttl, generation_path)
+        self.lock = asyncio.Lock()
+
+    async def get(self):
+        """
+        Async version of StatsService.get.
+        """
+        generation = read_generation(self.generation_path)
+        async with self.lock:
+            if self._valid(generation):
+                return self.cached
+            return self._store(self._parse(await self.es.search(**self._request())), generation)
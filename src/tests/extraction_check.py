@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import re
+import math
+import tempfile
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from extraction.extractor import Extractor
+from extraction.tokenizer import Tokenizer
+
+DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+DATA_DIRS = [os.path.join(DATA_ROOT, 'html_arxiv'), os.path.join(DATA_ROOT, 'html_pubmed')]
+
+# Small synthetic papers covering the tricky cases of context mapping and XML parsing:
+# repeated links, links with several '#', nested paragraphs, captions sharing keywords,
+# comments, CDATA, processing instructions, namespaced attributes, nested figures.
+SAMPLE_ARXIV = """<html><body><article class="ltx_document">
+<p>Speech recognition results are summarized in <a href="#S1.T1">Table 1</a> and <a href="#S1.T1">again</a>.</p>
+<figure class="ltx_table" id="S1.T1"><figcaption>Word error rate of speech recognition models</figcaption>
+<table class="ltx_table"><tr><td>WER</td><td>12.3</td></tr></table></figure>
+<figure class="ltx_figure" id="S2.F1"><img src="x1.png"/><figcaption>Attention weights of the transformer encoder</figcaption></figure>
+<p>The transformer encoder attention weights are shown in <a href="paper.html#S2.F1">Fig. 1</a>.</p>
+<p>See <a href="#other#S2.F1">this odd link</a> and <a href="#S1.T10">a different table</a>.</p>
+<p>Nothing relevant here, only error models.</p>
+<p>Recognition word error rate for speech <p>nested recognition models</p></p>
+</article></body></html>"""
+
+SAMPLE_PUBMED = """<?xml version="1.0" ?>
+<!DOCTYPE pmc-articleset PUBLIC "-//NLM//DTD ARTICLE SET 2.0//EN" "https://dtd.nlm.nih.gov/ncbi/pmc/articleset/nlm-articleset-2.0.dtd">
+<pmc-articleset><article xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:mml="http://www.w3.org/1998/Math/MathML" article-type="research-article">
+<front><article-meta><article-id pub-id-type="pmc">123</article-id><title-group><article-title>Coffee &amp; cancer</article-title></title-group>
+<abstract><p>Coffee <!-- note --> consumption <italic>reduces</italic> liver cancer risk.</p></abstract></article-meta></front>
+<body><sec><title>Results</title><p>Risk by coffee category is in <xref ref-type="table" rid="T1">Table 1</xref> and <a href="#T1">link</a>.
+<list><list-item><p>nested coffee cancer item</p></list-item></list></p>
+<table-wrap id="T1" position="float"><label>Table 1</label><caption><p>Cancer risk by coffee consumption category</p></caption>
+<?covid-table-note keep?><table frame="hsides"><thead><tr><th>Cups</th><th>HR <mml:math><mml:mi>x</mml:mi></mml:math></th></tr></thead><tbody><tr><td>1&lt;2</td><td><![CDATA[0.9 < 1]]></td></tr></tbody></table>
+<fig><caption><p>Inner <?render inline?>fig liver</p></caption><graphic xlink:href="inner"/></fig></table-wrap>
+<table-wrap><caption><title>No id table</title></caption></table-wrap>
+<fig id="F1" position="float"><label>Figure 1</label><caption><p>Hazard ratio of liver cancer</p></caption><graphic xlink:href="gr1" xlink:type="simple"/></fig>
+<p>The hazard ratio for liver cancer decreased with coffee consumption. <?pi stuff?>After pi.</p></sec></body>
+</article></pmc-articleset>"""
+
+
+class LegacyExtractor(Extractor):
+    """
+    Reference implementation of the original context mapping, which rescans every
+    paragraph for every table and figure. Used only to check that the indexed
+    implementation produces identical output.
+    """
+
+    def _post_process_context(self, paper_id, full_text, tables, figures, paragraphs):
+        for item in tables:
+            self._legacy_fill_context(item, paragraphs, is_table=True)
+
+        for item in figures:
+            self._legacy_fill_context(item, paragraphs, is_table=False)
+
+        return {
+            "paper_id": paper_id,
+            "full_text": full_text,
+            "tables": tables,
+            "figures": figures
+        }
+
+    def _legacy_fill_context(self, item, paragraphs, is_table=True):
+        item_id = item.get("table_id") if is_table else item.get("figure_id")
+        keywords = self.extract_keywords(item.get("caption", ""))
+
+        mentions = []
+        context_paragraphs = []
+
+        for p in paragraphs:
+            p_text = p.get_text(strip=True)
+
+            is_mentioned = False
+            for link in p.find_all('a', href=True):
+                href = link['href']
+                if href.endswith(f"#{item_id}") or href == f"#{item_id}":
+                    is_mentioned = True
+                    break
+
+            if is_mentioned:
+                mentions.append(p_text)
+
+            if len(keywords.intersection(self.extract_keywords(p_text))) >= 2:
+                context_paragraphs.append(p_text)
+
+        item["mentions"] = mentions
+        item["context_paragraphs"] = context_paragraphs
+
+
+def legacy_keywords(text, stop_words):
+    """
+    Original implementation of Extractor.extract_keywords.
+    """
+    if not text:
+        return set()
+    text = re.sub(r'[^\w\s]', '', text.lower())
+    return {t for t in text.split() if t not in stop_words and len(t) > 2}
+
+
+def check_tokenizer(limit=50):
+    """
+    Check that the Tokenizer (single and batch API) returns the same keyword sets
+    as the original extract_keywords, on tricky texts and on the corpus paragraphs.
+    """
+    print("\n--- Checking Keyword Tokenizer ---")
+    texts = [
+        "", "   ", "The Word-Error-Rate (WER) of speech recognition, e.g. 12.3%.",
+        "Naïve Bayes vs. α-β pruning — İstanbul ÉCOLE straße", "snake_case and CamelCase tokens; a an the il la",
+        "line\nbreaks\tand\u00a0non-breaking spaces", "control\x1echaracters\x00and digits 42 123",
+        "The Word-Error-Rate (WER) of speech recognition, e.g. 12.3%."
+    ]
+    for data_dir in DATA_DIRS:
+        if os.path.exists(data_dir):
+            for filename in sorted(os.listdir(data_dir))[:limit]:
+                with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+                    texts.extend(f.read().split("</p>"))
+    tokenizer = Tokenizer()
+    expected = [legacy_keywords(text, tokenizer.stop_words) for text in texts]
+    single = [tokenizer.keywords(text) for text in texts]
+    tokenizer.reset()
+    batch = tokenizer.keywords_batch(texts)
+    memoized = tokenizer.keywords_batch(texts)
+    ok = single == expected and batch == expected and memoized == expected
+    print(f"[{'✅' if ok else '❌'}] {len(texts)} texts: identical keyword sets (single, batch and memoized).")
+    return ok
+
+
+def reference_tfidf_context(extractor, captions, texts):
+    """
+    Straightforward per caption/paragraph cosine similarity of the TF-IDF keyword vectors,
+    to check the vectorized Extractor._tfidf_context.
+    """
+    paragraphs = [extractor.extract_keywords(text) for text in texts]
+    df = {}
+    for keywords in paragraphs:
+        for keyword in keywords:
+            df[keyword] = df.get(keyword, 0) + 1
+    idf = {keyword: math.log((1 + len(texts)) / (1 + count)) + 1 for keyword, count in df.items()}
+    ranked = []
+    for caption in captions:
+        query = {k for k in extractor.extract_keywords(caption) if k in idf}
+        query_norm = math.sqrt(sum(idf[k] ** 2 for k in query))
+        scores = []
+        for pos, keywords in enumerate(paragraphs):
+            norm = math.sqrt(sum(idf[k] ** 2 for k in keywords))
+            score = sum(idf[k] ** 2 for k in query & keywords) / (query_norm * norm) if query_norm and norm else 0.0
+            if score >= extractor.context_threshold and score > 0:
+                scores.append((-score, pos))
+        ranked.append([pos for _, pos in sorted(scores)[:extractor.context_top_k]])
+    return ranked
+
+
+def check_tfidf():
+    """
+    Compare the vectorized TF-IDF context scoring with the reference implementation.
+    """
+    print("\n--- Checking TF-IDF Context Scoring ---")
+    extractor = Extractor(context_mode="tfidf", context_top_k=2, context_threshold=0.05)
+    texts = [
+        "Speech recognition results are summarized in Table 1.",
+        "The transformer encoder attention weights are shown in Fig. 1.",
+        "Nothing relevant here, only error models.",
+        "Recognition word error rate for speech recognition models.",
+        "Word error rate of the speech models on noisy audio."
+    ]
+    records = [(text, []) for text in texts]
+    captions = ["Word error rate of speech recognition models", "Attention weights of the transformer encoder", "Unrelated"]
+    context_index = extractor._build_context_index(records)
+    ranked = extractor._tfidf_context(context_index, captions)
+    expected = reference_tfidf_context(extractor, captions, texts)
+    ok = ranked == expected
+    print(f"[{'✅' if ok else '❌'}] top-k paragraphs {ranked} (reference {expected}).")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, "2401.00001v1.html")
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_ARXIV)
+        table = extractor.process_file(filepath)["tables"][0]
+    # Best match first, mentions unaffected by the mode
+    best = table["context_paragraphs"][:1] == ["Recognition word error rate for speechnested recognition models"]
+    print(f"[{'✅' if best else '❌'}] ranked context of a sample table.")
+    return ok and best
+
+
+def compare_file(filepath, extractor, legacy):
+    """
+    Process a file with both implementations and compare the serialized output.
+
+    Returns:
+        bool: True if the outputs are byte-identical.
+    """
+    current = json.dumps(extractor.process_file(filepath), ensure_ascii=False, sort_keys=True)
+    expected = json.dumps(legacy.process_file(filepath), ensure_ascii=False, sort_keys=True)
+    return current == expected
+
+
+def check_samples(extractor, legacy):
+    """
+    Compare both implementations on the built-in synthetic papers.
+    """
+    print("--- Checking Context Mapping on Synthetic Samples ---")
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for filename, content in [("2401.00001v1.html", SAMPLE_ARXIV), ("PMC0000001.xml", SAMPLE_PUBMED)]:
+            filepath = os.path.join(tmp_dir, filename)
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(content)
+            if compare_file(filepath, extractor, legacy):
+                print(f"[✅] {filename}: identical output.")
+            else:
+                print(f"[❌] {filename}: output differs from the legacy implementation.")
+                all_ok = False
+    return all_ok
+
+
+def check_streaming(extractor, limit=50):
+    """
+    Compare the streaming PubMed XML extraction with the BeautifulSoup tree one.
+    """
+    print("\n--- Checking Streaming XML Extraction ---")
+    streaming = Extractor(stream_xml=True)
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample = os.path.join(tmp_dir, "PMC0000001.xml")
+        with open(sample, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_PUBMED)
+        files = [sample]
+        data_dir = DATA_DIRS[1]
+        if os.path.exists(data_dir):
+            files += [os.path.join(data_dir, f) for f in sorted(os.listdir(data_dir)) if f.endswith('.xml')][:limit]
+        mismatches = [f for f in files if not compare_file(f, streaming, extractor)]
+    if mismatches:
+        print(f"[❌] {len(mismatches)}/{len(files)} files differ (e.g. {os.path.basename(mismatches[0])}).")
+        all_ok = False
+    else:
+        print(f"[✅] {len(files)} files identical.")
+    return all_ok
+
+
+def check_corpus(extractor, legacy, limit=50):
+    """
+    Compare both implementations on (up to `limit` files per directory of) the local corpus.
+    """
+    print("\n--- Checking Context Mapping on Local Corpus ---")
+    all_ok = True
+    for data_dir in DATA_DIRS:
+        if not os.path.exists(data_dir):
+            print(f"[⚠️] Directory {data_dir} does not exist. Skipping.")
+            continue
+        files = sorted(f for f in os.listdir(data_dir) if f.endswith('.html') or f.endswith('.xml'))[:limit]
+        mismatches = [f for f in files if not compare_file(os.path.join(data_dir, f), extractor, legacy)]
+        if mismatches:
+            print(f"[❌] {os.path.basename(data_dir)}: {len(mismatches)}/{len(files)} files differ (e.g. {mismatches[0]}).")
+            all_ok = False
+        else:
+            print(f"[✅] {os.path.basename(data_dir)}: {len(files)} files identical.")
+    return all_ok
+
+
+def main():
+    """
+    Run the extraction regression checks.
+    """
+    print("=== EXTRACTION REGRESSION CHECK ===\n")
+
+    extractor = Extractor()
+    legacy = LegacyExtractor()
+
+    ok = check_samples(extractor, legacy)
+    ok = check_corpus(extractor, legacy) and ok
+    ok = check_streaming(extractor) and ok
+    ok = check_tfidf() and ok
+    ok = check_tokenizer() and ok
+
+    print("\n=== CHECK COMPLETE ===")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
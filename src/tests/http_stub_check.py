@@ -0,0 +1,302 @@
+import io
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scrapers.arxiv_scraper import scrape_arxiv
+from search.image_cache import ImageCache, AsyncImageCache
+from indexing.asset_store import AssetStore
+
+PAGE = b"<html><body><article class='ltx_document'><p>Stub paper</p></article></body></html>"
+
+def make_png(width=640, height=480):
+    """
+    Return a real (decodable) PNG image, used as the stub figure.
+    """
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (width, height), bytes(range(256)) * (width * height * 3 // 256)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+IMAGE = make_png()
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Local HTTP server emulating the arXiv HTML endpoints:
+    - /html/<id>           -> 200 HTML page
+    - /html/flaky-<id>     -> 503 on the first request, then 200
+    - /html/limited-<id>   -> 429 with Retry-After on the first request, then 200
+    - /html/noabs-<id>     -> redirect to /abs/<id> (HTML not available)
+    - /html/gone-<id>      -> 404
+    - /img/<name>          -> 200 image with ETag, 304 on a matching If-None-Match
+    - /img/dies-<name>     -> 200 image on the first request, then 500
+    - /img/gone-<name>     -> 404
+    - /img/changing-<name> -> 200 image without validators (downloaded again when stale)
+    - /img/moved-<name>    -> redirect to /img/<name> on the same host
+    - /img/escape-<name>   -> redirect to localhost (a host the image caches do not allow)
+    """
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+            first = self.hits[self.path] == 1
+        name = self.path.rsplit('/', 1)[-1]
+
+        if self.path.startswith("/img/"):
+            if name.startswith("dies-") and not first:
+                self._send(500)
+            elif name.startswith("gone-"):
+                self._send(404)
+            elif name.startswith("moved-"):
+                self._send(302, headers={"Location": f"/img/{name[len('moved-'):]}"})
+            elif name.startswith("escape-"):
+                self._send(302, headers={"Location": f"http://localhost:{self.server.server_address[1]}/img/escaped.png"})
+            elif name.startswith("changing-"):
+                self._send(200, IMAGE, {"Content-Type": "image/png"})
+            elif self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"'})
+            else:
+                self._send(200, IMAGE, {"Content-Type": "image/png", "ETag": '"v1"',
+                                        "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        elif self.path.startswith("/abs/"):
+            self._send(200, b"<html>abstract</html>", {"Content-Type": "text/html"})
+        elif name.startswith("flaky-") and first:
+            self._send(503)
+        elif name.startswith("limited-") and first:
+            self._send(429, headers={"Retry-After": "0"})
+        elif name.startswith("noabs-"):
+            self._send(302, headers={"Location": f"/abs/{name}"})
+        elif name.startswith("gone-"):
+            self._send(404)
+        else:
+            self._send(200, PAGE, {"Content-Type": "text/html; charset=utf-8"})
+
+# The image caches only fetch from the stub server
+STUB_HOSTS = ("127.0.0.1",)
+
+def start_stub_server():
+    """
+    Start the stub server on a free local port, returning (server, base_url).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def check_arxiv_downloader(base_url):
+    """
+    Run the concurrent arXiv downloader against the stub server.
+    """
+    print("--- Checking ArXiv Downloader ---")
+    ids = ["2401.00001v1", "flaky-2401.00002v1", "limited-2401.00003v1", "noabs-2401.00004v1", "gone-2401.00005v1"]
+    papers = [{"id": i, "title": i, "authors": [], "published": "", "abstract": "", "pdf_url": ""} for i in ids]
+    expected = {"2401.00001v1", "flaky-2401.00002v1", "limited-2401.00003v1"}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        count = scrape_arxiv(query="stub", concurrency=3, rate=50, base_url=f"{base_url}/html",
+                             data_dir=tmp_dir, papers=papers)
+        saved = {f[:-len(".html")] for f in os.listdir(tmp_dir) if f.endswith(".html")}
+        metas = {f[:-len("_meta.json")] for f in os.listdir(tmp_dir) if f.endswith("_meta.json")}
+
+    if count == len(expected) and saved == expected and metas == expected:
+        print("[✅] Retries, rate limiting and redirect detection behave as expected.")
+        return True
+    print(f"[❌] Unexpected downloads: {sorted(saved)} (count={count}).")
+    return False
+
+def check_image_cache(base_url):
+    """
+    Run the caching image proxy against the stub server.
+    """
+    print("\n--- Checking Image Proxy Cache ---")
+    hits = StubHandler.hits
+    checks = []
+
+    def fetch(cache, url, if_none_match=None, limit=None):
+        status, headers, body = cache.get(url, if_none_match)
+        chunks = []
+        for chunk in body:
+            chunks.append(chunk)
+            if limit and len(chunks) >= limit:
+                break
+        if hasattr(body, "close"):
+            body.close()
+        return status, headers, b"".join(chunks)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "fresh"), max_age=3600)
+        url = f"{base_url}/img/fig1.png"
+        status, headers, body = fetch(cache, url)
+        checks.append(("first request is downloaded and streamed", status == 200 and body == IMAGE))
+        status, headers, body = fetch(cache, url)
+        checks.append(("second request is served from disk", body == IMAGE and hits["/img/fig1.png"] == 1))
+        checks.append(("Cache-Control and ETag are sent", "max-age=3600" in headers["Cache-Control"] and "ETag" in headers))
+        status, _, _ = fetch(cache, url, if_none_match=headers["ETag"])
+        checks.append(("browser revalidation gets 304", status == 304))
+
+        status, _, _ = fetch(cache, "https://example.com/img/fig1.png")
+        checks.append(("URLs of other hosts are refused", status == 403 and not ImageCache(cache_dir=os.path.join(tmp_dir, "fresh")).allows(url)))
+        status, _, _ = fetch(cache, f"{base_url}/abs/page.html")
+        checks.append(("non-image responses are neither served nor cached", status == 502
+                       and not os.path.exists(cache._paths(f"{base_url}/abs/page.html")[0])))
+
+        status, _, body = fetch(cache, f"{base_url}/img/moved-fig5.png")
+        checks.append(("redirects within the allowed hosts are followed", status == 200 and body == IMAGE))
+        status, _, _ = fetch(cache, f"{base_url}/img/escape-fig6.png")
+        checks.append(("redirects to other hosts are not requested", status == 403 and "/img/escaped.png" not in hits))
+
+        stale = ImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "stale"), max_age=0)
+        url = f"{base_url}/img/changing-fig7.png"
+        fetch(stale, url)
+        fetch(stale, url)
+        checks.append(("replaced body counted once in the cache size", hits["/img/changing-fig7.png"] == 2 and stale.size == len(IMAGE)))
+        url = f"{base_url}/img/fig2.png"
+        fetch(stale, url)
+        status, _, body = fetch(stale, url)
+        checks.append(("stale copy is revalidated upstream (304)", body == IMAGE and hits["/img/fig2.png"] == 2))
+        url = f"{base_url}/img/dies-fig3.png"
+        fetch(stale, url)
+        status, _, body = fetch(stale, url)
+        checks.append(("stale copy is served if upstream fails", status == 200 and body == IMAGE))
+
+        aborted = ImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "aborted"))
+        fetch(aborted, f"{base_url}/img/fig4.png", limit=1)
+        checks.append(("aborted download is not cached", aborted.size == 0 and not list(aborted._entries())))
+
+        small = ImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "small"), max_bytes=len(IMAGE) * 2)
+        for i in range(3):
+            fetch(small, f"{base_url}/img/lru{i}.png")
+            time.sleep(0.01)
+        fetch(small, f"{base_url}/img/lru0.png")
+        checks.append(("size limit enforced", small.size <= len(IMAGE) * 2))
+        fetch(small, f"{base_url}/img/lru2.png")
+        checks.append(("least recently used entry evicted", hits["/img/lru0.png"] == 2 and hits["/img/lru2.png"] == 1))
+
+    for name, passed in checks:
+        print(f"[{'✅' if passed else '❌'}] {name}")
+    return all(passed for _, passed in checks)
+
+def check_async_image_cache(base_url):
+    """
+    Run the asyncio image proxy (used by asgi_app.py) against the stub server.
+    """
+    print("\n--- Checking Async Image Proxy Cache ---")
+    hits = StubHandler.hits
+    checks = []
+
+    async def fetch(cache, url, if_none_match=None):
+        status, headers, body = await cache.get(url, if_none_match)
+        if hasattr(body, "__aiter__"):
+            content = b"".join([chunk async for chunk in body])
+        else:
+            content = b"".join(body)
+        return status, headers, content
+
+    async def run(tmp_dir):
+        cache = AsyncImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "fresh"), max_age=3600)
+        url = f"{base_url}/img/async1.png"
+        status, headers, body = await fetch(cache, url)
+        checks.append(("first request is downloaded and streamed", status == 200 and body == IMAGE))
+        status, headers, body = await fetch(cache, url)
+        checks.append(("second request is served from disk", body == IMAGE and hits["/img/async1.png"] == 1))
+        status, _, _ = await fetch(cache, url, if_none_match=headers["ETag"])
+        checks.append(("browser revalidation gets 304", status == 304))
+
+        # The sync proxy reads what the async one stored
+        status, _, body = ImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "fresh"), max_age=3600).get(url)
+        checks.append(("cache directory shared with ImageCache", b"".join(body) == IMAGE and hits["/img/async1.png"] == 1))
+
+        stale = AsyncImageCache(allowed_hosts=STUB_HOSTS, cache_dir=os.path.join(tmp_dir, "stale"), max_age=0)
+        url = f"{base_url}/img/async2.png"
+        await fetch(stale, url)
+        status, _, body = await fetch(stale, url)
+        checks.append(("stale copy is revalidated upstream (304)", body == IMAGE and hits["/img/async2.png"] == 2))
+        status, _, _ = await fetch(stale, f"{base_url}/img/escape-async4.png")
+        checks.append(("redirects to other hosts are not requested", status == 403 and "/img/escaped.png" not in hits))
+        url = f"{base_url}/img/dies-async3.png"
+        await fetch(stale, url)
+        status, _, body = await fetch(stale, url)
+        checks.append(("stale copy is served if upstream fails", status == 200 and body == IMAGE))
+
+        results = await asyncio.gather(*[fetch(cache, f"{base_url}/img/burst{i}.png") for i in range(20)])
+        checks.append(("concurrent downloads", all(status == 200 and body == IMAGE for status, _, body in results)))
+        await cache.close()
+        await stale.close()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(run(tmp_dir))
+
+    for name, passed in checks:
+        print(f"[{'✅' if passed else '❌'}] {name}")
+    return all(passed for _, passed in checks)
+
+def check_asset_store(base_url):
+    """
+    Run the figure asset prefetch stage against the stub server.
+    """
+    print("\n--- Checking Figure Asset Store ---")
+    papers = [
+        {"paper_id": "PMC1", "figures": [{"url": f"{base_url}/img/a1.png"}, {"url": f"{base_url}/img/gone-a2.png"}]},
+        {"paper_id": "PMC2", "figures": []},
+        {"paper_id": "PMC3", "figures": [{"url": f"{base_url}/img/a3.png"}, {"url": f"{base_url}/img/a1.png"}]}
+    ]
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = AssetStore(root=tmp_dir, concurrency=4, rate=100)
+        out = list(store.attach(iter(papers), lookahead=1))
+        store.save()
+        figures = [fig for paper in out for fig in paper["figures"]]
+        checks.append(("papers keep their order", [p["paper_id"] for p in out] == ["PMC1", "PMC2", "PMC3"]))
+        checks.append(("missing image recorded as None", figures[1]["local_path"] is None))
+        checks.append(("identical images stored once", figures[0]["local_path"] == figures[2]["local_path"] == figures[3]["local_path"]))
+        checks.append(("each URL downloaded once", StubHandler.hits["/img/a1.png"] == 1 and store.downloaded == 2))
+        with Image.open(os.path.join(tmp_dir, figures[0]["thumbnail_path"])) as thumb:
+            checks.append(("thumbnail downscaled", max(thumb.size) == store.thumbnail_size))
+
+        cached = AssetStore(root=tmp_dir)
+        again = list(cached.attach(iter([{"paper_id": "PMC3", "figures": [{"url": f"{base_url}/img/a3.png"}]}]), download=False))
+        checks.append(("later runs reuse the store", again[0]["figures"][0]["local_path"] == figures[2]["local_path"]
+                       and StubHandler.hits["/img/a3.png"] == 1))
+
+    for name, passed in checks:
+        print(f"[{'✅' if passed else '❌'}] {name}")
+    return all(passed for _, passed in checks)
+
+def main():
+    """
+    Run the HTTP checks against a local stub server.
+    """
+    print("=== HTTP STUB CHECK ===\n")
+    server, base_url = start_stub_server()
+    try:
+        ok = check_arxiv_downloader(base_url)
+        ok = check_image_cache(base_url) and ok
+        ok = check_async_image_cache(base_url) and ok
+        ok = check_asset_store(base_url) and ok
+    finally:
+        server.shutdown()
+    print("\n=== CHECK COMPLETE ===")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from search.local_backend import LocalClient, AsyncLocalClient
+from search.search_engine import SearchEngine, AsyncSearchEngine, CursorExpiredError
+from search.stats_service import StatsService
+from indexing.index_manager import LocalIndexManager
+from indexing.embeddings import Embedder
+from indexing.indexer import extract_paper
+from extraction.extractor import Extractor
+
+def make_paper(paper_id, title, abstract, source="arxiv", tables=0, figures=0):
+    """
+    Return an extracted paper dictionary (as produced by the Extractor).
+    """
+    return {
+        "paper_id": paper_id, "title": title, "authors": ["A. Author"], "date": "2024-01-01",
+        "abstract": abstract, "full_text": f"{title}. {abstract}", "source": source,
+        "tables": [
+            {"table_id": f"T{i}", "caption": f"Results of {title}", "body": "accuracy 0.9",
+             "mentions": [f"Table {i} reports the accuracy"], "context_paragraphs": []}
+            for i in range(tables)
+        ],
+        "figures": [
+            {"figure_id": f"F{i}", "url": f"x{i}.png", "caption": f"Architecture of {title}",
+             "mentions": [], "context_paragraphs": []}
+            for i in range(figures)
+        ]
+    }
+
+PAPERS = [
+    make_paper("p1", "Speech recognition with transformers", "End-to-end speech recognition using attention.", tables=2, figures=1),
+    make_paper("p2", "Speech synthesis", "Neural text to speech synthesis.", figures=2),
+    make_paper("p3", "Coffee consumption and cancer", "A cohort study of coffee and cancer risk.", source="pubmed", tables=1),
+    make_paper("p4", "Entity resolution", "Matching records with neural networks.")
+] + [make_paper(f"bulk{i:02d}", f"Neural network study {i}", "Neural networks for images.") for i in range(25)]
+
+def ids(hits):
+    return sorted(hit["_id"] for hit in hits)
+
+def main():
+    """
+    Index a small synthetic corpus into the embedded backend and run the search
+    features of the UIs (SearchEngine, StatsService) against it.
+    """
+    print("=== LOCAL BACKEND CHECK ===\n")
+    checks = []
+    with tempfile.TemporaryDirectory() as root:
+        manager = LocalIndexManager(root=root)
+        manager.create_indices()
+        with manager.bulk_load():
+            results = list(manager.index_stream(iter(PAPERS), chunk_size=10))
+        checks.append(("every document stored", all(ok for _, ok, _ in results) and len(results) == 29 + 3 + 3))
+
+        client = LocalClient(root)
+        engine = SearchEngine(cache=False)
+        engine.es = client
+        search = lambda query, index="articles", **kw: engine.search(index, query, **kw)
+
+        checks.append(("AND semantics", ids(search("speech recognition")) == ["p1"]))
+        checks.append(("OR operator", ids(search("recognition OR synthesis")) == ["p1", "p2"]))
+        checks.append(("NOT operator", ids(search("speech NOT synthesis")) == ["p1"]))
+        checks.append(("phrase and field query", ids(search('title:"coffee consumption"')) == ["p3"]))
+        checks.append(("prefix query", ids(search("synth*")) == ["p2"]))
+        boosted = search("recognition^3 OR synthesis")
+        checks.append(("query-string boosts", ids(search("title:speech^2")) == ["p1", "p2"]
+                       and boosted[0]["_id"] == "p1" and boosted[0]["_score"] > 2 * boosted[1]["_score"]))
+        checks.append(("source filter", ids(search("speech OR coffee", filters={"source": "pubmed"})) == ["p3"]))
+        top = search("speech")
+        checks.append(("title boost ranks title matches first", top[0]["_id"] in ("p1", "p2") and top[0]["_score"] > 0))
+        checks.append(("highlight on profiled fields", "<em>Speech</em>" in " ".join(top[0]["highlight"].get("title", []))))
+        checks.append(("full_text excluded from _source", "full_text" not in top[0]["_source"]))
+        checks.append(("tables index", ids(search("accuracy", index="tables")) == ["p1:T0", "p1:T1", "p3:T0"]))
+
+        page = engine.search_page("articles", "neural", page=2, page_size=10)
+        checks.append(("offset paging and totals", page["total"] == 27 and len(page["hits"]) == 10))
+        seen = []
+        page = engine.search_page("articles", "neural", page_size=10, deep=True)
+        while True:
+            seen.extend(hit["_id"] for hit in page["hits"])
+            if not page["next_cursor"]:
+                break
+            page = engine.search_page("articles", "neural", page_size=10, cursor=page["next_cursor"])
+        checks.append(("cursor paging visits every hit once", len(seen) == 27 and len(set(seen)) == 27))
+        # The UI: an offset first page, then a scroll starting at page 2 ("Load more")
+        seen = [hit["_id"] for hit in engine.search_page("articles", "neural", page_size=10)["hits"]]
+        page = engine.search_page("articles", "neural", page=2, page_size=10, deep=True)
+        while True:
+            seen.extend(hit["_id"] for hit in page["hits"])
+            if not page["next_cursor"]:
+                break
+            page = engine.search_page("articles", "neural", page_size=10, cursor=page["next_cursor"])
+        checks.append(("scroll continues an offset first page", len(seen) == 27 and len(set(seen)) == 27))
+        cursor = engine.search_page("articles", "neural", page_size=10, deep=True)["next_cursor"]
+        try:
+            engine.search_page("tables", "neural", page_size=10, cursor=cursor)
+            checks.append(("cursor of another index rejected", False))
+        except ValueError:
+            checks.append(("cursor of another index rejected", True))
+        client.contexts.clear()
+        try:
+            engine.search_page("articles", "neural", page_size=10, cursor=cursor)
+            checks.append(("expired cursor raises an error", False))
+        except CursorExpiredError:
+            checks.append(("expired cursor raises an error", True))
+        checks.append(("search() is not limited to MAX_PAGE_SIZE", len(engine.search("articles", "neural", size=150)) == 27))
+
+        detail = engine.paper_detail("p1")
+        checks.append(("paper detail (msearch)", detail and len(detail["tables"]) == 2 and len(detail["figures"]) == 1))
+        checks.append(("missing paper", engine.paper_detail("nope") is None))
+
+        stats = StatsService(client, ttl=0).get()
+        checks.append(("corpus statistics", stats["papers"] == 29 and stats["tables"] == 3 and stats["by_source"]["papers"] == {"arxiv": 28, "pubmed": 1}))
+
+        # Incremental update: a changed paper replaces its children, deletions disappear
+        manager.index_data(make_paper("p1", "Speech recognition with transformers", "Updated.", tables=1))
+        manager.delete_documents({"articles": ["p4"]})
+        checks.append(("re-indexed paper drops stale children", len(engine.paper_detail("p1")["tables"]) == 1))
+        checks.append(("deleted document not found", search("entity resolution") == []))
+        # Tables sharing a table_id are numbered by content, as dedupe_children numbers them
+        repeated = make_paper("p5", "Repeated tables", "Two tables with the same id.", tables=2)
+        for i, table in enumerate(repeated["tables"]):
+            table.update(table_id="T0", body=f"variant {i}")
+        numbered = [{a["_id"]: a["_source"]["body"] for a in manager._paper_actions(paper) if a["_index"] == "tables"}
+                    for paper in (repeated, dict(repeated, tables=repeated["tables"][::-1]))]
+        checks.append(("repeated child IDs numbered independently of order", numbered[0] == numbered[1]
+                       == {"p5:T0": "variant 0", "p5:T0#1": "variant 1"}))
+
+        # Hybrid search: embeddings (hashing model, no download) stored as dense vectors
+        embedder = Embedder("hashing", cache_path=os.path.join(root, "embeddings.sqlite"))
+        manager = LocalIndexManager(root=root, embedding_dims=embedder.dims)
+        manager.create_indices()
+        list(manager.index_stream(embedder.attach(iter(PAPERS[1:])), chunk_size=10))
+        computed = embedder.computed
+        list(embedder.attach(iter(PAPERS[1:2])))
+        checks.append(("embeddings cached by content", computed > 0 and embedder.computed == computed and embedder.cached > 0))
+        # A paper as the indexer builds it: extracted file merged with the scraper's _meta.json
+        from tests.extraction_check import SAMPLE_PUBMED
+        data_dir = os.path.join(root, "html_pubmed")
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, "PMC123.xml"), 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_PUBMED)
+        meta = {"id": "PMC123", "title": "Coffee & cancer", "authors": ["A. Author"], "published": "2024-07-01",
+                "abstract": "Coffee consumption reduces liver cancer risk.", "source": "pubmed"}
+        with open(os.path.join(data_dir, "PMC123_meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        _, extracted, _ = extract_paper(Extractor(), os.path.join(data_dir, "PMC123.xml"), data_dir)
+        extracted = next(embedder.attach(iter([extracted])))
+        expected = embedder.embed([f"{meta['title']}\n{meta['abstract']}"])[0].tolist()
+        checks.append(("article embedded from title and abstract", extracted.get("abstract") == meta["abstract"]
+                       and extracted["embedding"] == expected))
+        engine.embedder = embedder
+        # 'synthesizer' misses the keyword match (AND), the rest of the query is close to p2's text
+        checks.append(("keyword search misses the paraphrase", search("text to speech synthesizer") == []))
+        hybrid = engine.search_page("articles", "text to speech synthesizer", hybrid=True)
+        checks.append(("hybrid search finds it by kNN", hybrid["hits"] and hybrid["hits"][0]["_id"] == "p2"))
+        checks.append(("embeddings excluded from _source", "embedding" not in hybrid["hits"][0]["_source"]))
+        hybrid = engine.search_page("articles", "speech", hybrid=True, filters={"source": "arxiv"})
+        checks.append(("hybrid fusion keeps BM25 hits and filters", {"p2"} <= {h["_id"] for h in hybrid["hits"]}
+                       and all(h["_source"]["source"] == "arxiv" for h in hybrid["hits"])))
+        try:
+            engine.search_page("articles", "speech", hybrid=True, deep=True)
+            checks.append(("hybrid search rejects cursors", False))
+        except ValueError:
+            checks.append(("hybrid search rejects cursors", True))
+        # A reindex run without --embeddings keeps the dense_vector field of the live index
+        LocalIndexManager(root=root).reindex("articles")
+        properties = manager.store.mapping("articles")["mappings"]["properties"]
+        hybrid = engine.search_page("articles", "text to speech synthesizer", hybrid=True)
+        checks.append(("reindex keeps the embedding mapping", properties.get("embedding", {}).get("type") == "dense_vector"
+                       and hybrid["hits"] and hybrid["hits"][0]["_id"] == "p2"))
+        # Query vectors stay in the in-memory LRU: the SQLite cache only holds document texts
+        rows = embedder.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        embedder.query_cache_size = 2
+        for query in ("speech", "cancer", "entity resolution", "speech"):
+            engine.search_page("articles", query, hybrid=True)
+        checks.append(("query embeddings not persisted", embedder.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == rows
+                       and list(embedder.query_vectors) == ["entity resolution", "speech"]))
+
+        async def run_async():
+            async_engine = AsyncSearchEngine(es=AsyncLocalClient(client), cache=False)
+            hits = await async_engine.search("articles", "speech recognition")
+            return ids(hits)
+        checks.append(("async client", asyncio.run(run_async()) == ["p1"]))
+
+    for name, passed in checks:
+        print(f"[{'✅' if passed else '❌'}] {name}")
+    print("\n=== CHECK COMPLETE ===")
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from indexing.shard_store import ShardStore
+from tests.local_backend_check import make_paper
+
+def dated(paper, date):
+    paper["date"] = date
+    return paper
+
+PAPERS = [
+    dated(make_paper("p1", "Speech recognition", "Attention models.", tables=2, figures=1), "2023-05-01"),
+    dated(make_paper("p2", "Speech synthesis", "Neural text to speech.", figures=2), "2024-02-10T08:00:00Z"),
+    dated(make_paper("p3", "Coffee and cancer", "A cohort study.", source="pubmed", tables=1), "2024-07-01"),
+    dated(make_paper("p4", "Entity resolution", "Matching records."), "")
+]
+
+def check_format(shard_format):
+    """
+    Write, update, delete, filter and compact papers in a store of the given format.
+    """
+    checks = []
+    with tempfile.TemporaryDirectory() as root:
+        # Small parts and row groups, so that every feature spans several files
+        with ShardStore(root, shard_format=shard_format, rows_per_shard=2, row_group_size=1) as store:
+            for paper in PAPERS:
+                store.add(paper, key=f"html_{paper['source']}/{paper['paper_id']}.html", fingerprint={"hash": paper["paper_id"]})
+        store = ShardStore(root, shard_format=shard_format)
+        papers = {data["paper_id"]: (data, key, fingerprint) for data, key, fingerprint in store.read()}
+        checks.append(("round trip", [papers[p["paper_id"]][0] for p in PAPERS] == PAPERS))
+        checks.append(("manifest key and fingerprint", papers["p3"][1:] == ("html_pubmed/p3.html", {"hash": "p3"})))
+
+        def read_ids(**filters):
+            return sorted(data["paper_id"] for data, _, _ in store.read(**filters))
+
+        checks.append(("source filter", read_ids(sources=["pubmed"]) == ["p3"]))
+        checks.append(("date filter", read_ids(since="2024-01-01") == ["p2", "p3"] and read_ids(before="2024-01-01") == ["p1", "p4"]))
+        checks.append(("source and date filters", read_ids(sources=["arxiv"], since="2024-01-01", before="2025-01-01") == ["p2"]))
+
+        # A new version moves p1 out of the date range: the old row must not resurface
+        updated = dict(PAPERS[0], title="Speech recognition v2", date="2022-01-01")
+        with store:
+            store.add(updated)
+            store.remove("p4", "arxiv")
+        latest = {data["paper_id"]: data for data, _, _ in store.read()}
+        checks.append(("latest version wins", latest["p1"]["title"] == "Speech recognition v2" and len(latest) == 3))
+        checks.append(("replaced row hidden by filters", read_ids(since="2023-01-01") == ["p2", "p3"]))
+        checks.append(("deleted paper hidden", "p4" not in latest))
+
+        parts = len(store._parts())
+        kept = store.compact()
+        checks.append(("compaction", kept == 3 and len(store._parts()) < parts
+                       and {data["paper_id"]: data for data, _, _ in store.read()} == latest))
+    return checks
+
+def main():
+    """
+    Exercise the ShardStore in both formats (Parquet only if pyarrow is installed).
+    """
+    print("=== SHARD STORE CHECK ===\n")
+    formats = ["jsonl"]
+    try:
+        import pyarrow
+        formats.insert(0, "parquet")
+    except ImportError:
+        print("pyarrow is not installed: checking the JSON lines format only.\n")
+    checks = []
+    for shard_format in formats:
+        checks.extend((f"{shard_format}: {name}", passed) for name, passed in check_format(shard_format))
+
+    for name, passed in checks:
+        print(f"[{'✅' if passed else '❌'}] {name}")
+    print("\n=== CHECK COMPLETE ===")
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 import requests
 import sys
 import os
-from elasticsearch import Elasticsearch
 
-def check_elasticsearch_connection(url="http://localhost:9200"):
+# Ensure internal modules can be imported
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from search.es_client import get_client, client_options, backend_name
+from search.local_backend import local_index_dir
+
+def check_elasticsearch_connection(url=None):
     """
     Verify connectivity to the Elasticsearch instance.
     """
+    url = url or client_options()["hosts"][0]
     print(f"--- Checking Elasticsearch Connection ({url}) ---")
     try:
         resp = requests.get(url, timeout=2)
@@ -76,10 +82,15 @@ def main():
     """
     print("=== SYSTEM HEALTH CHECK ===\n")
     
-    es_alive = check_elasticsearch_connection()
+    if backend_name() == "local":
+        # Embedded backend: no server to reach, only the index directory
+        print(f"--- Using the local backend ({local_index_dir()}) ---")
+        es_alive = True
+    else:
+        es_alive = check_elasticsearch_connection()
     
     if es_alive:
-        es = Elasticsearch("http://localhost:9200")
+        es = get_client()
         check_indices(es)
         
     check_image_access()
@@ -1,5 +1,4 @@
 import streamlit as st
-from elasticsearch import Elasticsearch
 import pandas as pd
 import sys
 import os
@@ -7,7 +6,10 @@ import os
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 # Attempt to import search engine, but we might just use ES directly for some tailored queries
-from search.search_engine import SearchEngine
+from search.search_engine import SearchEngine, DEFAULT_PAGE_SIZE, MAX_OFFSET_WINDOW
+from search.stats_service import StatsService
+from search.es_client import get_client
+from indexing.asset_paths import ASSETS_DIR, resolve_figure_url
 
 # Page Config
 st.set_page_config(
@@ -21,14 +23,25 @@ st.set_page_config(
 @st.cache_resource
 def get_es():
     try:
-        return Elasticsearch("http://localhost:9200")
+        return get_client()
     except:
         return None
 
 es = get_es()
 
-# Initialize Search Engine Wrapper
-engine = SearchEngine()
+# Corpus statistics: cached across reruns, refreshed at most every few seconds
+@st.cache_resource
+def get_stats_service():
+    return StatsService(es) if es else None
+
+stats_service = get_stats_service()
+
+# Initialize Search Engine Wrapper (once per server process, not on every rerun)
+@st.cache_resource
+def get_engine():
+    return SearchEngine()
+
+engine = get_engine()
 
 # Custom CSS
 st.markdown("""
@@ -79,18 +92,15 @@ with st.sidebar:
     st.divider()
     
     # Metriche
-    if es and es.ping():
-        c1, c2, c3 = st.columns(3)
-        try:
-            count_arts = es.count(index="articles")['count']
-            count_tabs = es.count(index="tables")['count']
-            count_figs = es.count(index="figures")['count']
-        except:
-            count_arts = count_tabs = count_figs = "-"
-            
-        st.metric("Papers", count_arts)
-        st.metric("Tables", count_tabs)
-        st.metric("Figures", count_figs)
+    try:
+        stats = stats_service.get() if stats_service else None
+    except Exception:
+        stats = None
+        
+    if stats:
+        for label, key in [("Papers", "papers"), ("Tables", "tables"), ("Figures", "figures")]:
+            by_source = stats["by_source"][key]
+            st.metric(label, stats[key], help=" • ".join(f"{source}: {count}" for source, count in sorted(by_source.items())) or None)
     else:
         st.error("Elasticsearch non connesso!")
     
@@ -103,6 +113,8 @@ with st.sidebar:
         index=0
     )
     
+    page_size = st.selectbox("Risultati per pagina", [DEFAULT_PAGE_SIZE, 20, 50], index=0)
+    
     st.markdown("---")
     st.info("💡 **Tip**: Use boolean operators like `speech AND text`.")
 
@@ -129,9 +141,32 @@ if search_clicked or query:
         st.warning("Please enter a query.")
     else:
         index_name = target_index_map[search_target]
-        results = engine.search(index=index_name, query=query)
         
-        st.markdown(f"### Found {len(results)} results for *'{query}'* in **{search_target}**")
+        # Back to the first page whenever the search changes
+        search_key = (query, index_name, page_size)
+        if st.session_state.get("search_key") != search_key:
+            st.session_state["search_key"] = search_key
+            st.session_state["page"] = 1
+        
+        page = engine.search_page(index=index_name, query=query, page=st.session_state["page"], page_size=page_size)
+        results = page["hits"]
+        total = page["total"]
+        last_page = max(1, min(-(-total // page_size), MAX_OFFSET_WINDOW // page_size))
+        
+        st.markdown(f"### Found {'more than ' if page['total_relation'] == 'gte' else ''}{total} results for *'{query}'* in **{search_target}**")
+        
+        # Paging controls
+        c_prev, c_page, c_next = st.columns([1, 2, 1])
+        with c_prev:
+            if st.button("← Precedente", disabled=page["page"] <= 1, use_container_width=True):
+                st.session_state["page"] -= 1
+                st.rerun()
+        with c_page:
+            st.markdown(f"<div style='text-align: center;'>Pagina {page['page']} di {last_page}</div>", unsafe_allow_html=True)
+        with c_next:
+            if st.button("Successiva →", disabled=page["page"] >= last_page, use_container_width=True):
+                st.session_state["page"] += 1
+                st.rerun()
         
         for hit in results:
             source = hit['_source']
@@ -186,7 +221,9 @@ if search_clicked or query:
                     fc1, fc2 = st.columns([1, 2])
                     
                     with fc1:
-                        url = source.get("url")
+                        # Local copy from the asset store (indexer --fetch-assets): no external fetch
+                        local_path = source.get("thumbnail_path") or source.get("local_path")
+                        url = os.path.join(ASSETS_DIR, local_path) if local_path else resolve_figure_url(source.get("paper_id"), source.get("url"))
                         if url:
                             # If local path or relative, might need fix. ArXiv scraper puts absolute URL?
                             # Scraper put "https://arxiv.org/html/..." images usually are relative "../image.png" or full.